@@ -4,6 +4,8 @@ https://exiftool.org/
 """
 
 import io
+import itertools
+import os
 import pathlib
 import re
 import sys
@@ -23,7 +25,7 @@ from cloup import (
     option_group,
     version_option,
 )
-from cloup.constraints import RequireAtLeast, mutually_exclusive
+from cloup.constraints import If, IsSet, RequireAtLeast, mutually_exclusive
 from osxmetadata import MDITEM_ATTRIBUTE_DATA, MDITEM_ATTRIBUTE_SHORT_NAMES
 from rich.console import Console
 from rich.markdown import Markdown
@@ -31,14 +33,28 @@ from yaspin import yaspin
 
 from ._version import __version__
 from .exiftofinder import (
+    DEFAULT_BATCH_SIZE,
     DEFAULT_GROUP_TAG_TEMPLATE,
     DEFAULT_TAG_TEMPLATE,
     EXTENDED_ATTRIBUTE_NAMES,
     EXTENDED_ATTRIBUTE_NAMES_QUOTED,
     ExifToFinder,
 )
-from .exiftool import get_exiftool_path
-from .phototemplate import TEMPLATE_SUBSTITUTIONS_ALL, get_template_help
+from .exiftool import ExifToolCaching, exiftool_version, get_exiftool_path
+from .file_filter import FileFilter
+from .files_from import read_paths
+from .metadata_cache import MetadataCache
+from .parallel import process_files_parallel
+from .phototemplate import (
+    TEMPLATE_SUBSTITUTIONS_ALL,
+    PhotoTemplateParser,
+    get_template_help,
+)
+from .shard import Shard
+from .stages import StagedPipeline
+from .walk import walk_files
+from .watch import DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE_TIME, watch_directories
+from .work_queue import DEFAULT_LEASE_TIME, WorkQueue, process_queue
 
 # if True, shows verbose output, controlled via --verbose flag
 VERBOSE = False
@@ -50,6 +66,16 @@ def verbose(message_str, **kwargs):
     print(message_str, **kwargs)
 
 
+def parse_shard(ctx, param, value):
+    """click callback that returns Shard for --shard value or None if not set"""
+    if value is None:
+        return None
+    try:
+        return Shard.parse(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+
+
 def print_help_msg(command):
     with Context(command) as ctx:
         click.echo(command.get_help(ctx))
@@ -263,7 +289,7 @@ formatter_settings = HelpFormatter.settings(
         "'--xattr-template' will overwrite any existing value for the specified attribute. "
         "See Extended Attributes below for additional details on this option.",
     ),
-    constraint=RequireAtLeast(1),
+    constraint=If(~IsSet("cache_prune") & ~IsSet("publish"), then=RequireAtLeast(1)),
 )
 @option_group(
     "Formatting options",
@@ -325,6 +351,239 @@ formatter_settings = HelpFormatter.settings(
         is_flag=True,
         help="Overwrite existing Finder comments (default is to append to existing).",
     ),
+    option(
+        "--batch-size",
+        metavar="N",
+        type=click.IntRange(min=1),
+        default=DEFAULT_BATCH_SIZE,
+        show_default=True,
+        help="Number of files to read metadata for with a single call to exiftool.",
+    ),
+    option(
+        "--jobs",
+        "-j",
+        metavar="N",
+        type=click.IntRange(min=1),
+        default=1,
+        show_default=True,
+        help="Number of worker processes used to process files in parallel; "
+        "each worker runs its own exiftool process.",
+    ),
+    option(
+        "--incremental",
+        metavar="STATE_DB",
+        type=click.Path(dir_okay=False, writable=True),
+        help="Record each processed file in database STATE_DB and skip files that have not "
+        "changed since they were processed with the same settings. Changing any option that "
+        "affects the Finder tags, comments, or extended attributes written causes all files "
+        "to be processed again. STATE_DB will be created if it does not exist.",
+    ),
+    option(
+        "--resume",
+        metavar="JOURNAL",
+        type=click.Path(dir_okay=False, writable=True),
+        help="Record each file as it is completed in journal file JOURNAL and skip files "
+        "already recorded in JOURNAL, so that an interrupted run can be resumed by running "
+        "the same command again. Directories are walked in sorted order. "
+        "JOURNAL will be created if it does not exist; delete it to start over.",
+    ),
+    option(
+        "--shard",
+        metavar="i/N",
+        callback=parse_shard,
+        help="Split the files to process into N shards and only process shard i (1 to N), "
+        "e.g. '--shard 1/4'. Run the same command with '--shard 1/N' through '--shard N/N', "
+        "for example on N machines, to process every file exactly once. Files found with --walk "
+        "are assigned to a shard by their path relative to the directory being walked, "
+        "other files by their path as given.",
+    ),
+    option(
+        "--stamp",
+        is_flag=True,
+        help="After processing each file, write a stamp with the version of exif2findertags, "
+        "the settings used, and the file's size and modification time to an extended attribute "
+        "of the file, and skip files whose stamp shows they have not changed since they were "
+        "processed with the same settings. The stamp is copied with the file by tools that "
+        "preserve extended attributes, e.g. ditto or rsync -X.",
+    ),
+)
+@option_group(
+    "Input options",
+    option(
+        "--files-from",
+        metavar="FILE",
+        type=click.File("rb"),
+        help="Process files and directories listed in FILE, one per line, in addition to FILES; "
+        "use '-' to read the list from stdin, e.g. 'find . -name \"*.jpg\" | exif2findertags --files-from - ...'. "
+        "The list is read as files are processed so it may be of any length.",
+    ),
+    option(
+        "--null",
+        "-0",
+        is_flag=True,
+        help="Paths in the --files-from list are separated by NUL characters instead of newlines, "
+        "e.g. for use with 'find -print0'.",
+    ),
+)
+@option_group(
+    "Watch options",
+    option(
+        "--watch",
+        metavar="DIR",
+        multiple=True,
+        type=click.Path(exists=True, file_okay=False),
+        help="After processing FILES, if any, keep running and process files as they are created "
+        "or changed in directory DIR and its subdirectories; press Ctrl-C to stop. "
+        "May be repeated to watch more than one directory. "
+        "Uses inotify if available (Linux) otherwise scans DIR periodically.",
+    ),
+    option(
+        "--settle-time",
+        metavar="SECONDS",
+        type=click.FloatRange(min=0),
+        default=DEFAULT_SETTLE_TIME,
+        show_default=True,
+        help="With --watch, number of seconds a file's size and modification time must stay "
+        "unchanged before the file is processed.",
+    ),
+    option(
+        "--poll-interval",
+        metavar="SECONDS",
+        type=click.FloatRange(min=0.1),
+        default=DEFAULT_POLL_INTERVAL,
+        show_default=True,
+        help="With --watch, number of seconds between scans of the watched directories "
+        "when inotify is not available.",
+    ),
+)
+@option_group(
+    "Work queue options",
+    option(
+        "--publish",
+        metavar="QUEUE_DB",
+        type=click.Path(dir_okay=False, writable=True),
+        help="Coordinator: add FILES, walking directories with --walk, to work queue database "
+        "QUEUE_DB instead of processing them. Run exif2findertags with --work QUEUE_DB, "
+        "for example on several machines with QUEUE_DB on a shared file system, to process them. "
+        "Files are stored by absolute path so every worker must see them at the same path. "
+        "Files already in QUEUE_DB are not added again. QUEUE_DB will be created if it does not exist.",
+    ),
+    option(
+        "--work",
+        metavar="QUEUE_DB",
+        type=click.Path(dir_okay=False, writable=True),
+        help="Worker: repeatedly lease a batch of --batch-size files from work queue database "
+        "QUEUE_DB, process them, and mark them done, until the coordinator has finished "
+        "adding files and none are left. Any number of workers may use the same QUEUE_DB. "
+        "May be used without any FILES.",
+    ),
+    option(
+        "--lease-time",
+        metavar="SECONDS",
+        type=click.FloatRange(min=1),
+        default=DEFAULT_LEASE_TIME,
+        show_default=True,
+        help="With --work, number of seconds a worker holds a batch of files; "
+        "files leased by a worker that stopped are leased again by another worker after this time.",
+    ),
+)
+@option_group(
+    "Staged pipeline options",
+    option(
+        "--staged",
+        is_flag=True,
+        help="Process files in a pipeline of three concurrent stages: "
+        "read metadata with exiftool, render Finder tags, comments, and extended attributes, "
+        "and write them to the files. While one batch of files is read, the previous batch is "
+        "rendered and the batch before that is written. Use --verbose to show statistics for each stage.",
+    ),
+    option(
+        "--read-workers",
+        metavar="N",
+        type=click.IntRange(min=1),
+        default=1,
+        show_default=True,
+        help="Number of threads reading metadata with --staged; each uses its own exiftool process.",
+    ),
+    option(
+        "--render-workers",
+        metavar="N",
+        type=click.IntRange(min=1),
+        default=1,
+        show_default=True,
+        help="Number of threads rendering metadata with --staged.",
+    ),
+    option(
+        "--write-workers",
+        metavar="N",
+        type=click.IntRange(min=1),
+        default=1,
+        show_default=True,
+        help="Number of threads writing metadata to files with --staged.",
+    ),
+)
+@option_group(
+    "File filter options (apply to files found with --walk)",
+    option(
+        "--include-ext",
+        metavar="EXT",
+        multiple=True,
+        help="Only process files with extension EXT (case-insensitive), e.g. '--include-ext jpg'; "
+        "may be repeated, e.g. '--include-ext jpg --include-ext heic'.",
+    ),
+    option(
+        "--exclude-ext",
+        metavar="EXT",
+        multiple=True,
+        help="Do not process files with extension EXT (case-insensitive), e.g. '--exclude-ext aae'; "
+        "may be repeated.",
+    ),
+    option(
+        "--include-glob",
+        metavar="PATTERN",
+        multiple=True,
+        help="Only process files whose name matches glob PATTERN, e.g. '--include-glob \"IMG_*\"'; "
+        "patterns containing '/' are matched against the full path. May be repeated.",
+    ),
+    option(
+        "--exclude-glob",
+        metavar="PATTERN",
+        multiple=True,
+        help="Do not process files or walk directories whose name matches glob PATTERN, "
+        "e.g. '--exclude-glob \"Render Files\"'; "
+        "patterns containing '/' are matched against the full path. May be repeated.",
+    ),
+    option(
+        "--media-only",
+        is_flag=True,
+        help="Only process files whose content is recognized as an image, video, or audio file "
+        "(for example JPEG, HEIC, TIFF, RAW, QuickTime, MP4); "
+        "determined by reading the first few bytes of each file.",
+    ),
+)
+@option_group(
+    "Metadata cache options",
+    option(
+        "--cache",
+        metavar="CACHE_FILE",
+        type=click.Path(dir_okay=False, writable=True),
+        help="Store metadata read by exiftool in database CACHE_FILE and reuse it on subsequent runs "
+        "for files whose size and modification time have not changed. "
+        "CACHE_FILE will be created if it does not exist.",
+    ),
+    option(
+        "--cache-max-size",
+        metavar="MB",
+        type=click.IntRange(min=1),
+        help="Maximum size in megabytes of metadata stored in the cache; "
+        "least recently used entries are removed when the cache exceeds this size.",
+    ),
+    option(
+        "--cache-prune",
+        is_flag=True,
+        help="Remove entries for files that no longer exist or have changed from the cache "
+        "then compact the cache database. May be used without any FILES.",
+    ),
 )
 @version_option(version=__version__)
 @argument("files", nargs=-1, type=click.Path(exists=True))
@@ -350,18 +609,142 @@ def cli(
     overwrite_tags,
     overwrite_fc,
     xattr_template,
+    batch_size,
+    cache,
+    cache_max_size,
+    cache_prune,
+    include_ext,
+    exclude_ext,
+    include_glob,
+    exclude_glob,
+    media_only,
+    jobs,
+    staged,
+    read_workers,
+    render_workers,
+    write_workers,
+    incremental,
+    stamp,
+    resume,
+    shard,
+    watch,
+    settle_time,
+    poll_interval,
+    files_from,
+    null,
+    publish,
+    work,
+    lease_time,
 ):
     """Create Finder tags and/or Finder comments from EXIF and other metadata in media files."""
     global VERBOSE
     VERBOSE = verbose_
 
-    if not files:
+    if (cache_max_size or cache_prune) and not cache:
+        click.echo("--cache-max-size and --cache-prune require --cache", err=True)
+        sys.exit(1)
+
+    if staged and jobs > 1:
+        click.echo("--staged and --jobs may not be used together", err=True)
+        sys.exit(1)
+
+    if watch and (staged or jobs > 1):
+        click.echo("--watch may not be used with --staged or --jobs", err=True)
+        sys.exit(1)
+
+    if null and not files_from:
+        click.echo("--null requires --files-from", err=True)
+        sys.exit(1)
+
+    if publish and work:
+        click.echo("--publish and --work may not be used together", err=True)
+        sys.exit(1)
+
+    if (publish or work) and (staged or jobs > 1 or watch):
+        click.echo(
+            "--publish and --work may not be used with --staged, --jobs, or --watch",
+            err=True,
+        )
+        sys.exit(1)
+
+    file_filter = FileFilter(
+        include_ext=include_ext,
+        exclude_ext=exclude_ext,
+        include_glob=include_glob,
+        exclude_glob=exclude_glob,
+        media_only=media_only,
+    )
+
+    if publish:
+        if not files and not files_from:
+            print_help_msg(cli)
+            sys.exit(1)
+        if files_from:
+            files = itertools.chain(files, paths_from(files_from, null=null))
+        queue = WorkQueue(publish)
+        try:
+            queue.start_publishing()
+            try:
+                published = queue.publish(
+                    iter_files(
+                        files,
+                        walk,
+                        file_filter=file_filter or None,
+                        shard=shard,
+                    )
+                )
+            finally:
+                # workers exit once the files already published are done even if publishing
+                # failed; publishing again adds the files that were not published
+                queue.finish_publishing()
+            stats = queue.stats()
+        finally:
+            queue.close()
+        click.echo(
+            f"Published {published} {'file' if published == 1 else 'files'} to {publish}, "
+            f"{stats['pending']} pending, {stats['done']} done, {stats['failed']} failed."
+        )
+        return
+
+    if not files and not cache_prune and not watch and not files_from and not work:
         print_help_msg(cli)
         sys.exit(1)
 
+    # report template syntax errors once instead of for every file
+    parser = PhotoTemplateParser()
+    for template in [
+        tag_format,
+        fc_format,
+        *tag_template,
+        *fc_template,
+        *[template for _, template in xattr_template],
+    ]:
+        if not template:
+            continue
+        try:
+            parser.validate(template)
+        except ValueError as e:
+            click.echo(str(e), err=True)
+            sys.exit(1)
+
     exiftool_path = exiftool_path or get_exiftool_path()
     verbose(f"exiftool path: {exiftool_path}")
 
+    cache_max_size = cache_max_size * 1024 * 1024 if cache_max_size else None
+    if cache_prune:
+        metadata_cache = MetadataCache(
+            cache, exiftool_version(exiftool_path), max_size=cache_max_size
+        )
+        removed = metadata_cache.prune()
+        stats = metadata_cache.stats()
+        metadata_cache.close()
+        click.echo(
+            f"Pruned {removed} {'entry' if removed == 1 else 'entries'} from metadata cache, "
+            f"{stats['entries']} {'entry' if stats['entries'] == 1 else 'entries'} remaining."
+        )
+        if not files and not watch and not files_from and not work:
+            return
+
     # create nice looking text for status
     filenames = [file for file in files if pathlib.Path(file).is_file()]
     dirnames = [file for file in files if pathlib.Path(file).is_dir()]
@@ -370,13 +753,27 @@ def cli(
         f' and {len(dirnames)} {"directory" if len(dirnames) == 1 else "directories"}'
     )
     text = text + dirtext if walk else text
-    if dirnames and not walk and not filenames:
+    if files_from:
+        text += f" and files listed in {files_from.name}"
+    if work:
+        text += f" and files in work queue {work}"
+    if (
+        dirnames
+        and not walk
+        and not filenames
+        and not watch
+        and not files_from
+        and not work
+    ):
         click.echo(
             f"Found 0 files{dirtext} but --walk was not specified, nothing to do"
         )
         print_help_msg(cli)
         sys.exit(1)
 
+    if files_from:
+        files = itertools.chain(files, paths_from(files_from, null=null))
+
     process_files_ = partial(
         process_files,
         files=files,
@@ -399,9 +796,26 @@ def cli(
         tag_template=tag_template,
         fc_template=fc_template,
         xattr_template=xattr_template,
+        batch_size=batch_size,
+        cache=cache,
+        cache_max_size=cache_max_size,
+        incremental=incremental,
+        stamp=stamp,
+        resume=resume,
+        shard=shard,
+        watch=watch,
+        settle_time=settle_time,
+        poll_interval=poll_interval,
+        work=work,
+        lease_time=lease_time,
+        file_filter=file_filter,
+        jobs=jobs,
+        stage_workers=(read_workers, render_workers, write_workers)
+        if staged
+        else None,
     )
 
-    if not VERBOSE:
+    if not VERBOSE and not watch:
         with yaspin(text=text):
             files_updated = process_files_()
     else:
@@ -411,6 +825,10 @@ def cli(
     click.echo(
         f"Done. Updated metadata for {files_updated} {'file' if files_updated == 1 else 'files'}."
     )
+    if shard:
+        click.echo(
+            f"Shard {shard}: {shard.assigned} of {shard.found} files found were in this shard."
+        )
 
 
 def process_files(
@@ -434,14 +852,35 @@ def process_files(
     tag_template,
     fc_template,
     xattr_template,
+    batch_size=DEFAULT_BATCH_SIZE,
+    cache=None,
+    cache_max_size=None,
+    incremental=None,
+    stamp=False,
+    resume=None,
+    shard=None,
+    watch=None,
+    settle_time=DEFAULT_SETTLE_TIME,
+    poll_interval=DEFAULT_POLL_INTERVAL,
+    work=None,
+    lease_time=DEFAULT_LEASE_TIME,
+    file_filter=None,
+    jobs=1,
+    stage_workers=None,
 ) -> int:
-    """Process files with ExifToFinder"""
-    e2f = ExifToFinder(
+    """Process files with ExifToFinder
+
+    If jobs > 1, files are processed in jobs worker processes; if stage_workers is set to a tuple of
+    (read workers, render workers, write workers), files are processed with a StagedPipeline.
+    If watch is set to a list of directories, files created or changed in them are processed
+    after files until interrupted with Ctrl-C. If work is set to the path of a work queue database,
+    files leased from the queue are processed after files until the queue is finished.
+    """
+    e2f_kwargs = dict(
         tags=tag,
         tag_values=tag_value,
         exiftool_path=exiftool_path,
         walk=walk,
-        verbose=verbose,
         all_tags=all_tags,
         group=group,
         value=value,
@@ -457,21 +896,208 @@ def process_files(
         tag_template=tag_template,
         fc_template=fc_template,
         xattr_template=xattr_template,
+        cache_path=cache,
+        cache_max_size=cache_max_size,
+        state_path=incremental,
+        stamp=stamp,
+        journal_path=resume,
+    )
+    if jobs > 1:
+        return process_files_parallel(
+            iter_files(
+                files,
+                walk,
+                file_filter=file_filter or None,
+                sort=bool(resume),
+                shard=shard,
+            ),
+            jobs=jobs,
+            batch_size=batch_size,
+            verbose=VERBOSE,
+            on_error=lambda filename, error: click.echo(
+                f"Error processing file {filename}: {error}", err=True
+            ),
+            **e2f_kwargs,
+        )
+
+    if stage_workers:
+        e2f = ExifToFinder(verbose=verbose, batch_size=batch_size, **e2f_kwargs)
+        read_workers, render_workers, write_workers = stage_workers
+        pipeline = StagedPipeline(
+            e2f,
+            read_workers=read_workers,
+            render_workers=render_workers,
+            write_workers=write_workers,
+        )
+        try:
+            return pipeline.run(
+                iter_files(
+                    files,
+                    walk,
+                    file_filter=file_filter or None,
+                    sort=bool(resume),
+                    shard=shard,
+                ),
+                batch_size,
+            )
+        finally:
+            e2f.close()
+            for stats in pipeline.stats:
+                verbose(f"Stage {stats}")
+
+    e2f = ExifToFinder(
+        verbose=verbose,
+        batch_size=batch_size,
+        file_filter=file_filter or None,
+        shard=shard,
+        **e2f_kwargs,
     )
 
     files_processed = 0
+    batch = []
+    try:
+        for filename in files:
+            file = pathlib.Path(filename)
+            if file.is_dir():
+                if walk:
+                    verbose(f"Processing directory {file}")
+                    files_processed += e2f.process_directory(file)
+                else:
+                    verbose(f"Skipping directory {file}")
+            elif shard and not shard.contains(filename):
+                verbose(f"Skipping file {file} in another shard")
+            else:
+                verbose(f"Processing file {file}")
+                batch.append(file)
+                if len(batch) >= batch_size:
+                    files_processed += e2f.submit_batch(batch)
+                    batch = []
+        if batch:
+            files_processed += e2f.submit_batch(batch)
+        files_processed += e2f.flush()
+        if work:
+            files_processed += process_work_queue(
+                e2f, work, batch_size=batch_size, lease_time=lease_time
+            )
+        if watch:
+            files_processed += process_watched(
+                e2f,
+                watch,
+                file_filter=file_filter or None,
+                settle_time=settle_time,
+                poll_interval=poll_interval,
+                shard=shard,
+            )
+    finally:
+        e2f.close()
+    return files_processed
+
+
+def process_watched(
+    e2f,
+    dirs,
+    file_filter=None,
+    settle_time=DEFAULT_SETTLE_TIME,
+    poll_interval=DEFAULT_POLL_INTERVAL,
+    shard=None,
+):
+    """Process files created or changed in dirs with ExifToFinder e2f until interrupted with Ctrl-C;
+    if shard is set, only files in the shard are processed
+
+    Returns: number of files updated
+    """
+    click.echo(
+        f"Watching {', '.join(str(d) for d in dirs)} for new or changed files, press Ctrl-C to stop"
+    )
+    files_processed = 0
+    try:
+        for batch in watch_directories(
+            dirs,
+            file_filter=file_filter,
+            settle_time=settle_time,
+            poll_interval=poll_interval,
+            on_error=lambda e: verbose(f"Error watching directory: {e}"),
+            shard=shard,
+        ):
+            for file in batch:
+                verbose(f"Processing file {file}")
+                # file was changed so metadata read earlier in this session is stale
+                ExifToolCaching.evict(file)
+            try:
+                files_updated = e2f.process_batch(batch)
+            except Exception as e:
+                click.echo(f"Error processing files: {e}", err=True)
+                continue
+            files_processed += files_updated
+            click.echo(
+                f"Updated metadata for {files_updated} {'file' if files_updated == 1 else 'files'}."
+            )
+    except KeyboardInterrupt:
+        verbose("Stopped watching")
+    return files_processed
+
+
+def process_work_queue(e2f, queue_path, batch_size, lease_time=DEFAULT_LEASE_TIME):
+    """Process files leased from work queue database queue_path with ExifToFinder e2f
+    until the coordinator has finished publishing and the queue is empty
+
+    Returns: number of files updated
+    """
+    queue = WorkQueue(queue_path)
+    try:
+        files_processed = process_queue(
+            e2f,
+            queue,
+            batch_size=batch_size,
+            lease_time=lease_time,
+            on_error=lambda filename, error: click.echo(
+                f"Error processing file {filename}: {error}", err=True
+            ),
+        )
+        stats = queue.stats()
+    finally:
+        queue.close()
+    verbose(
+        f"Work queue {queue_path}: {stats['done']} done, {stats['failed']} failed"
+    )
+    return files_processed
+
+
+def paths_from(fd, null=False):
+    """Yield each path listed in fd that exists, reporting those that do not"""
+    for path in read_paths(fd, null=null):
+        if os.path.lexists(path):
+            yield path
+        else:
+            click.echo(f"File not found: {path}", err=True)
+
+
+def iter_files(files, walk, file_filter=None, sort=False, shard=None):
+    """Yield path of each file in files, walking directories if walk is True
+    (in sorted order if sort is True); if shard is set, only files in the shard are yielded"""
+    seen = set()
     for filename in files:
         file = pathlib.Path(filename)
-        if file.is_dir():
-            if walk:
-                verbose(f"Processing directory {file}")
-                files_processed += e2f.process_directory(file)
-            else:
-                verbose(f"Skipping directory {file}")
+        if not file.is_dir():
+            if shard is None or shard.contains(filename):
+                yield file
+        elif walk:
+            verbose(f"Processing directory {file}")
+            yield from walk_files(
+                file,
+                seen=seen,
+                on_directory=lambda dirpath: verbose(
+                    f"Processing directory {dirpath}"
+                ),
+                on_error=lambda e: verbose(f"Error reading directory: {e}"),
+                file_filter=file_filter,
+                sort=sort,
+                shard=shard,
+            )
         else:
-            verbose(f"Processing file {file}")
-            files_processed += e2f.process_file(file)
-    return files_processed
+            verbose(f"Skipping directory {file}")
+    if file_filter:
+        verbose(f"Skipped {file_filter.rejected} files not matching file filters")
 
 
 def rich_text(text, width=78):
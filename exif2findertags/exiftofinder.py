@@ -1,12 +1,29 @@
 """ ExifToFinder class """
 
+import asyncio
+import collections
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Tuple
 
 import osxmetadata
 from osxmetadata import MDITEM_ATTRIBUTE_DATA, MDITEM_ATTRIBUTE_SHORT_NAMES
 
-from .exiftool import ExifToolCaching, get_exiftool_path
-from .phototemplate import PhotoTemplate, RenderOptions
+from .exiftool import (
+    AsyncExifTool,
+    ExifToolCaching,
+    ExifToolPipeline,
+    exiftool_version,
+    get_exiftool_path,
+)
+from .journal import Journal
+from .metadata_cache import MetadataCache
+from .phototemplate import PhotoTemplate, PhotoTemplateParser, RenderOptions
+from .stamp import is_stamped, write_stamp
+from .state_db import ProcessedFilesDB, config_hash
+from .tag_planner import plan_read_args
+from .walk import walk_files
 
 
 def noop():
@@ -17,6 +34,9 @@ def noop():
 DEFAULT_GROUP_TAG_TEMPLATE = "{GROUP}:{TAG}: {VALUE}"
 DEFAULT_TAG_TEMPLATE = "{TAG}: {VALUE}"
 
+# number of files to read with a single exiftool call
+DEFAULT_BATCH_SIZE = 100
+
 # supported attributes for xattr_template
 EXTENDED_ATTRIBUTE_NAMES = [
     "authors",
@@ -37,6 +57,20 @@ EXTENDED_ATTRIBUTE_NAMES = [
 EXTENDED_ATTRIBUTE_NAMES_QUOTED = [f"'{x}'" for x in EXTENDED_ATTRIBUTE_NAMES]
 
 
+@dataclass
+class RenderedMetadata:
+    """Finder metadata rendered for a file by ExifToFinder.render_file
+
+    finder_tags: list of Finder tags
+    finder_comment: Finder comment, empty if none
+    xattrs: list of (attribute, list of values) for extended attributes
+    """
+
+    finder_tags: List[str] = field(default_factory=list)
+    finder_comment: str = ""
+    xattrs: List[Tuple[str, List[str]]] = field(default_factory=list)
+
+
 class ExifToFinder:
     """Read EXIF and other photo/video metadata with exiftool and write to Finder tags"""
 
@@ -62,6 +96,14 @@ class ExifToFinder:
         tag_template=None,
         fc_template=None,
         xattr_template=None,
+        batch_size=DEFAULT_BATCH_SIZE,
+        cache_path=None,
+        cache_max_size=None,
+        file_filter=None,
+        state_path=None,
+        stamp=False,
+        journal_path=None,
+        shard=None,
     ) -> None:
         """Args:
         tags: list of tags to read from EXIF
@@ -84,6 +126,17 @@ class ExifToFinder:
         tag_template: list of template strings for writing Finder tags
         fc_template: list of template strings for writing Finder comments
         xattr_template: list of template tuples (attribute, template) for writing extended attributes
+        batch_size: number of files to read metadata for with a single exiftool call
+        cache_path: optional path to persistent metadata cache database
+        cache_max_size: optional maximum size in bytes of metadata stored in the persistent cache
+        file_filter: optional FileFilter selecting which files found by process_directory are processed
+        state_path: optional path to database of processed files; files processed with the same
+            configuration that have not changed since are skipped
+        stamp: if True, write a stamp to an extended attribute of each processed file and skip
+            files whose stamp shows they were processed with the same configuration and have not changed since
+        journal_path: optional path to journal of completed files used to resume an interrupted run;
+            files in the journal are skipped, files processed are added to it, and directories are walked in sorted order
+        shard: optional Shard; only files in the shard are processed by process_directory
         """
 
         self.tags = tags
@@ -108,59 +161,385 @@ class ExifToFinder:
         self.tag_template = tag_template
         self.fc_template = fc_template
         self.xattr_template = xattr_template
+        self.batch_size = batch_size
+        self.file_filter = file_filter
+        self.stamp = stamp
+        self.shard = shard
 
         if not callable(verbose):
             raise ValueError("verbose must be callable")
 
-    def process_directory(self, dir, _files_processed=0):
-        """Process each directory applying exif metadata to extended attributes"""
-        for path_object in pathlib.Path(dir).glob("**/*"):
-            if path_object.is_file():
-                self.verbose(f"Processing file {path_object}")
-                self.process_file(path_object)
-                _files_processed += 1
-            elif path_object.is_dir():
-                self.verbose(f"Processing directory {path_object}")
-                self.process_directory(path_object, _files_processed)
-        return _files_processed
+        # parse every template now so syntax errors are reported once, before any file is processed
+        parser = PhotoTemplateParser()
+        for template in self.templates():
+            parser.validate(template)
+
+        # only read the tags needed for the requested Finder tags, comments, and templates
+        self.read_args = plan_read_args(
+            tags=self.tags,
+            tag_values=self.tag_values,
+            fc_tags=self.fc_tags,
+            fc_tag_values=self.fc_tag_values,
+            tag_groups=self.tag_groups,
+            all_tags=self.all_tags,
+            tag_match=self.tag_match,
+            format_templates=[
+                template for template in [self.tag_format, self.fc_format] if template
+            ],
+            templates=[
+                *(self.tag_template or []),
+                *(self.fc_template or []),
+                *[template for _, template in self.xattr_template or []],
+            ],
+        )
+        if self.read_args is None:
+            self.verbose("Reading all tags with exiftool")
+        else:
+            self.verbose(f"Reading tags with exiftool: {' '.join(self.read_args)}")
+
+        # batches whose metadata is being read in the background, see submit_batch()
+        self._pipeline = None
+        self._pending_batches = collections.deque()
+
+        # (st_dev, st_ino) of files and directories already walked by process_directory()
+        self._walk_seen = set()
+
+        # exiftool client used by process_files_async()
+        self._async_exiftool = None
+        # thread used by process_files_async() to render and write files off the event loop
+        self._async_executor = None
+
+        self.metadata_cache = None
+        if cache_path:
+            self.metadata_cache = MetadataCache(
+                cache_path,
+                exiftool_version(self.exiftool_path),
+                max_size=cache_max_size,
+            )
+            ExifToolCaching.set_metadata_cache(self.metadata_cache)
+            self.verbose(f"Using metadata cache {cache_path}")
+
+        self._config_hash = self.config_hash()
+        self.state_db = None
+        if state_path:
+            self.state_db = ProcessedFilesDB(state_path, self._config_hash)
+            self.verbose(f"Using incremental state database {state_path}")
+
+        # number of files skipped because of their processing stamp
+        self.stamp_skipped = 0
+
+        self.journal = None
+        if journal_path:
+            self.journal = Journal(journal_path)
+            self.verbose(
+                f"Resuming with journal {journal_path}: {len(self.journal)} files already completed"
+            )
+
+    def templates(self):
+        """Return list of the template strings used: --tag-format, --fc-format, and the
+        --tag-template, --fc-template, and --xattr-template templates"""
+        return [
+            template
+            for template in [
+                self.tag_format,
+                self.fc_format,
+                *(self.tag_template or []),
+                *(self.fc_template or []),
+                *[template for _, template in self.xattr_template or []],
+            ]
+            if template
+        ]
+
+    def config_hash(self):
+        """Return hash of the settings that determine what is written to each file"""
+        return config_hash(
+            {
+                "tags": self.tags,
+                "tag_values": self.tag_values,
+                "all_tags": self.all_tags,
+                "group": self.group,
+                "value": self.value,
+                "tag_groups": self.tag_groups,
+                "tag_match": self.tag_match,
+                "fc_tags": self.fc_tags,
+                "fc_tag_values": self.fc_tag_values,
+                "tag_format": self.tag_format,
+                "fc_format": self.fc_format,
+                "overwrite_tags": self.overwrite_tags,
+                "overwrite_fc": self.overwrite_fc,
+                "tag_template": self.tag_template,
+                "fc_template": self.fc_template,
+                "xattr_template": self.xattr_template,
+            }
+        )
+
+    def unprocessed_files(self, filenames):
+        """Return list of filenames that need to be processed: all of them unless resuming
+        with a journal, in which case completed files are left out, or using processing stamps
+        or an incremental state database, in which case unchanged files already processed
+        with the same configuration are left out"""
+        filenames = list(filenames)
+        unprocessed = filenames
+        if self.journal is not None:
+            unprocessed = [
+                filename
+                for filename in unprocessed
+                if not self.journal.completed(filename)
+            ]
+        if self.stamp:
+            stamped = len(unprocessed)
+            unprocessed = [
+                filename
+                for filename in unprocessed
+                if not is_stamped(filename, self._config_hash)
+            ]
+            self.stamp_skipped += stamped - len(unprocessed)
+        if self.state_db is not None:
+            unprocessed = self.state_db.unprocessed(unprocessed)
+        if len(unprocessed) < len(filenames):
+            self.verbose(
+                f"Skipping {len(filenames) - len(unprocessed)} files already processed"
+            )
+        return unprocessed
+
+    def close(self):
+        """Stop the exiftool pipeline and close the persistent metadata cache, if any;
+        batches submitted but not yet processed with flush() are discarded"""
+        self._pending_batches.clear()
+        self._close_pipeline()
+
+        if self.file_filter:
+            self.verbose(
+                f"Skipped {self.file_filter.rejected} files not matching file filters"
+            )
+
+        if self.journal is not None:
+            self.verbose(
+                f"Journal: skipped {self.journal.skipped} completed files, "
+                f"{len(self.journal)} files completed"
+            )
+            self.journal.close()
+            self.journal = None
+
+        if self.stamp:
+            self.verbose(
+                f"Processing stamps: skipped {self.stamp_skipped} unchanged files"
+            )
+
+        if self.state_db is not None:
+            stats = self.state_db.stats()
+            self.verbose(
+                f"Incremental state: skipped {stats['skipped']} unchanged files, "
+                f"recorded {stats['recorded']} processed files, {stats['entries']} entries"
+            )
+            self.state_db.close()
+            self.state_db = None
+
+        stats = PhotoTemplateParser().cache_stats()
+        self.verbose(
+            f"Template cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['evictions']} evictions"
+        )
+
+        stats = ExifToolCaching.cache_stats()
+        self.verbose(
+            f"Metadata memory cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['evictions']} evictions"
+        )
+        if self.metadata_cache is None:
+            return
+        stats = self.metadata_cache.stats()
+        self.verbose(
+            f"Metadata cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['evictions']} evictions, {stats['entries']} entries"
+        )
+        ExifToolCaching.set_metadata_cache(None)
+        self.metadata_cache.close()
+        self.metadata_cache = None
+
+    def process_directory(self, dir):
+        """Process each file in directory dir and its subdirectories applying exif metadata to extended attributes
+
+        Files are processed in batches while the directory tree is still being walked
+
+        Returns: number of files updated
+        """
+        files_updated = 0
+        batch = []
+        for path_object in walk_files(
+            dir,
+            seen=self._walk_seen,
+            on_directory=lambda dirpath: self.verbose(
+                f"Processing directory {dirpath}"
+            ),
+            on_error=lambda e: self.verbose(f"Error reading directory: {e}"),
+            file_filter=self.file_filter,
+            sort=self.journal is not None,
+            shard=self.shard,
+        ):
+            self.verbose(f"Processing file {path_object}")
+            batch.append(path_object)
+            if len(batch) >= self.batch_size:
+                files_updated += self.submit_batch(batch)
+                batch = []
+        if batch:
+            files_updated += self.submit_batch(batch)
+        files_updated += self.flush()
+        return files_updated
+
+    def process_batch(self, filenames):
+        """Process a batch of files, reading metadata for all files with a single exiftool call
+
+        Returns: number of files updated
+        """
+        filenames = self.unprocessed_files(filenames)
+        if not filenames:
+            return 0
+        ExifToolCaching.prefetch(
+            filenames, exiftool=self.exiftool_path, read_args=self.read_args
+        )
+        return sum(self.process_file(filename) for filename in filenames)
+
+    def submit_batch(self, filenames):
+        """Start reading metadata for a batch of files in the background and process
+        the previously submitted batch while exiftool reads this one
+
+        Returns: number of files updated in previously submitted batches; call flush() to process the last batch
+        """
+        filenames = self.unprocessed_files(filenames)
+        if self._pipeline is not None and self._pipeline.failed:
+            # start a new exiftool process in place of the one that failed
+            self._close_pipeline()
+        if self._pipeline is None:
+            self._pipeline = ExifToolPipeline(exiftool=self.exiftool_path)
+        try:
+            future = ExifToolCaching.prefetch_async(
+                filenames,
+                self._pipeline,
+                exiftool=self.exiftool_path,
+                read_args=self.read_args,
+            )
+        except OSError as e:
+            # files will be read individually
+            self.verbose(f"Error reading metadata with exiftool pipeline: {e}")
+            self._close_pipeline()
+            future = None
+        self._pending_batches.append((filenames, future))
+        files_updated = 0
+        while len(self._pending_batches) > 1:
+            files_updated += self._process_pending_batch()
+        return files_updated
+
+    def _close_pipeline(self):
+        """Stop the exiftool pipeline, if any; a new one is started by the next submit_batch()"""
+        if self._pipeline is not None:
+            self._pipeline.close()
+            self._pipeline = None
+
+    def flush(self):
+        """Process all batches submitted with submit_batch()
+
+        Returns: number of files updated
+        """
+        files_updated = 0
+        while self._pending_batches:
+            files_updated += self._process_pending_batch()
+        return files_updated
+
+    async def process_files_async(self, filenames):
+        """Process files without blocking the event loop
+
+        Batches of batch_size files are read concurrently, one per exiftool process;
+        files are then rendered and written one at a time on a separate thread;
+        call aclose() when done
+
+        Returns: number of files updated
+        """
+        filenames = list(filenames)
+        if self._async_exiftool is None:
+            self._async_exiftool = AsyncExifTool(exiftool=self.exiftool_path)
+        if self._async_executor is None:
+            self._async_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="exif2findertags-write"
+            )
+        loop = asyncio.get_running_loop()
+        chunk_size = self.batch_size * self._async_exiftool.size
+        files_updated = 0
+        for i in range(0, len(filenames), chunk_size):
+            batch = self.unprocessed_files(filenames[i : i + chunk_size])
+            await ExifToolCaching.aprefetch(
+                batch, self._async_exiftool, read_args=self.read_args
+            )
+            for filename in batch:
+                rendered = await loop.run_in_executor(
+                    self._async_executor, self.render_file, filename
+                )
+                files_updated += await loop.run_in_executor(
+                    self._async_executor, self.write_file, filename, rendered
+                )
+        return files_updated
+
+    async def aclose(self):
+        """Stop exiftool processes and thread used by process_files_async() then close as with close()"""
+        if self._async_exiftool is not None:
+            await self._async_exiftool.close()
+            self._async_exiftool = None
+        if self._async_executor is not None:
+            self._async_executor.shutdown()
+            self._async_executor = None
+        self.close()
+
+    def _process_pending_batch(self):
+        """Wait for metadata of the oldest submitted batch to be read then process it"""
+        filenames, future = self._pending_batches.popleft()
+        try:
+            if future is not None:
+                future.result()
+        except OSError as e:
+            # files will be read individually
+            self.verbose(f"Error reading metadata with exiftool pipeline: {e}")
+        return sum(self.process_file(filename) for filename in filenames)
 
     def process_file(self, filename):
-        """Process each filename applying exif metadata to extended attributes"""
-        exiftool = ExifToolCaching(filename, exiftool=self.exiftool_path)
-        exifdict_no_groups = exiftool.asdict(tag_groups=False)
-        exifdict_groups = exiftool.asdict()
-        exifdict = exifdict_no_groups.copy()
-        exifdict.update(exifdict_groups)
-        exifdict_lc = {k.lower(): k for k in exifdict}
+        """Process each filename applying exif metadata to extended attributes
+
+        Returns: 1 if file was updated, otherwise 0
+        """
+        return self.write_file(filename, self.render_file(filename))
 
-        # ExifTool returns dict with tag group names (e.g. IPTC:Keywords)
-        # also add the tag names without group name
+    def render_file(self, filename):
+        """Render the Finder tags, Finder comment, and extended attributes for filename from its metadata
 
-        # "(Binary data " below is hack workaround for "(Binary data 0 bytes, use -b option to extract)" error that happens
-        # when exporting video with keywords on Photos 5.0 / Catalina
+        Returns: RenderedMetadata
+        """
+        exiftool = ExifToolCaching(
+            filename, exiftool=self.exiftool_path, read_args=self.read_args
+        )
+        # single view of the metadata, indexed by tag with and without group name (e.g. IPTC:Keywords and Keywords),
+        # shared with every template rendered for this file
+        metadata = exiftool.metadata_view()
 
-        # TODO: refactor out the duplicate code
+        # all templates for the file are rendered by one PhotoTemplate as (template, tag) pairs
+        phototemplate = PhotoTemplate(filename)
+        options = RenderOptions(exiftool=exiftool, filepath=filename)
 
         finder_tags = []
+        tag_templates = []
         for tag in self.tags:
-            if tag_name := exifdict_lc.get(tag.lower()):
-                rendered = self.format_tag_value(filename, tag_name, exiftool)
-                finder_tags.extend(rendered)
+            if tag_name := metadata.tag_name(tag):
+                tag_templates.append((self.tag_format_template(tag_name), tag_name))
 
         for tag_value in self.tag_values:
-            if tag_name := exifdict_lc.get(tag_value.lower()):
-                value = exifdict[tag_name]
-                finder_tags.extend(exif_values_to_list(value))
+            finder_tags.extend(metadata.values(tag_value))
 
         if self.all_tags or self.tag_groups or self.tag_match:
             # process all tags or specific tag groups
-            for tag in exifdict_groups:
+            for tag, values in metadata.grouped_items():
                 if tag == "SourceFile":
                     continue
                 group, tag_name = tag.split(":", 1)
                 if group in ["File", "ExifTool"]:
                     continue
-                value = exifdict_groups[tag]
 
                 if self.tag_groups and group.lower() not in self.tag_groups:
                     continue
@@ -169,57 +548,87 @@ class ExifToFinder:
                     continue
 
                 if self.group:
-                    rendered = self.format_tag_value(filename, tag, exiftool)
-                    finder_tags.extend(rendered)
+                    tag_templates.append((self.tag_format_template(tag), tag))
                 elif self.value:
-                    finder_tags.extend(exif_values_to_list(value))
+                    finder_tags.extend(values)
                 else:
-                    rendered = self.format_tag_value(filename, tag_name, exiftool)
-                    finder_tags.extend(rendered)
+                    tag_templates.append((self.tag_format_template(tag_name), tag_name))
+
+        tag_templates.extend((template, None) for template in self.tag_template or [])
+        for rendered in phototemplate.render_many(tag_templates, options):
+            finder_tags.extend(rendered)
+
+        fc_tag_templates = [
+            (self.fc_format_template(tag_name), tag_name)
+            for tag in self.fc_tags
+            if (tag_name := metadata.tag_name(tag))
+        ]
+        fc_rendered = phototemplate.render_many(
+            fc_tag_templates
+            + [(template, None) for template in self.fc_template or []],
+            options,
+        )
+        finder_comment = []
+        for rendered in fc_rendered[: len(fc_tag_templates)]:
+            finder_comment.extend(rendered)
 
-        if self.tag_template:
-            for template in self.tag_template:
-                rendered = self.render_template(template, filename, exiftool)
-                finder_tags.extend(rendered)
+        for tag_value in self.fc_tag_values:
+            finder_comment.extend(metadata.values(tag_value))
+
+        for rendered in fc_rendered[len(fc_tag_templates) :]:
+            finder_comment.extend(rendered)
+
+        xattr_rendered = phototemplate.render_many(
+            [(template, None) for _, template in self.xattr_template or []], options
+        )
+        xattrs = [
+            (xattr, rendered)
+            for (xattr, _), rendered in zip(self.xattr_template or [], xattr_rendered)
+        ]
+
+        return RenderedMetadata(
+            finder_tags=list(set(finder_tags)),
+            finder_comment="\n".join(finder_comment),
+            xattrs=xattrs,
+        )
 
+    def write_file(self, filename, rendered):
+        """Write RenderedMetadata rendered by render_file() to filename
+
+        Returns: 1 if file was updated, otherwise 0
+        """
         file_count = 0
-        if finder_tags := list(set(finder_tags)):
+        if finder_tags := rendered.finder_tags:
             self.verbose(f"Writing Finder tags {finder_tags} to {filename}")
             self.write_finder_tags(filename, finder_tags)
             file_count = 1
         else:
             self.verbose(f"No Finder tags to write to {filename}")
 
-        finder_comment = []
-        for tag in self.fc_tags:
-            if tag_name := exifdict_lc.get(tag.lower()):
-                value = exifdict[tag_name]
-                rendered = self.format_fc_value(filename, tag_name, exiftool)
-                finder_comment.extend(rendered)
-
-        for tag_value in self.fc_tag_values:
-            if tag_name := exifdict_lc.get(tag_value.lower()):
-                value = exifdict[tag_name]
-                finder_comment.extend(exif_values_to_list(value))
-
-        if self.fc_template:
-            for template in self.fc_template:
-                rendered = self.render_template(template, filename, exiftool)
-                finder_comment.extend(rendered)
-
-        if comment := "\n".join(finder_comment):
+        if comment := rendered.finder_comment:
             self.verbose(f"Writing Finder comment {comment} to {filename}")
             self.write_finder_comment(filename, comment)
             file_count = 1
 
-        for xattr, template in self.xattr_template:
-            rendered = self.render_template(template, filename, exiftool)
+        for xattr, value in rendered.xattrs:
             file_count = (
                 1
-                if self.write_extended_attributes(filename, xattr, rendered)
+                if self.write_extended_attributes(filename, xattr, value)
                 else file_count
             )
 
+        if self.state_db is not None and not self.dry_run:
+            self.state_db.record(filename)
+
+        if self.stamp and not self.dry_run:
+            try:
+                write_stamp(filename, self._config_hash)
+            except OSError as e:
+                self.verbose(f"Error writing processing stamp to {filename}: {e}")
+
+        if self.journal is not None and not self.dry_run:
+            self.journal.record(filename)
+
         return file_count
 
     def write_finder_tags(self, filename, finder_tags):
@@ -285,49 +694,14 @@ class ExifToFinder:
         else:
             md.findercomment = fc + "\n" + comment if fc else comment
 
-    def format_tag_value(self, filename, tag, exiftool):
-        """Format a tag value with a template"""
-        template = self.tag_format or (
+    def tag_format_template(self, tag):
+        """Return template used to format the value of tag as a Finder tag"""
+        return self.tag_format or (
             DEFAULT_GROUP_TAG_TEMPLATE if ":" in tag else DEFAULT_TAG_TEMPLATE
         )
-        return self._format_value_with_template(template, filename, tag, exiftool)
 
-    def format_fc_value(self, filename, tag, exiftool):
-        """Format a Finder comment value with a template"""
-        template = self.fc_format or (
+    def fc_format_template(self, tag):
+        """Return template used to format the value of tag in the Finder comment"""
+        return self.fc_format or (
             DEFAULT_GROUP_TAG_TEMPLATE if ":" in tag else DEFAULT_TAG_TEMPLATE
         )
-        return self._format_value_with_template(template, filename, tag, exiftool)
-
-    def _format_value_with_template(self, template, filename, tag, exiftool):
-        """Format a tag value with a template"""
-        phototemplate = PhotoTemplate(filename)
-        options = RenderOptions(tag=tag, exiftool=exiftool, filepath=filename)
-        try:
-            rendered, _ = phototemplate.render(template, options)
-            return rendered
-        except ValueError as e:
-            raise ValueError(
-                f"Invalid template syntax for template '{template}': {e}"
-            ) from e
-
-    def render_template(self, template, filename, exiftool):
-        """Render a template"""
-        phototemplate = PhotoTemplate(filename)
-        options = RenderOptions(tag=None, exiftool=exiftool, filepath=filename)
-        try:
-            rendered, _ = phototemplate.render(template, options)
-            return rendered
-        except ValueError as e:
-            raise ValueError(
-                f"Invalid template syntax for template '{template}': {e}"
-            ) from e
-
-
-def exif_values_to_list(value):
-    """Convert a value returned by ExifTool to a list if it is not already and filter out bad data"""
-    if isinstance(value, list):
-        value = [v for v in value if not str(v).startswith("(Binary data ")]
-        return [str(v) for v in value]
-    elif not str(value).startswith("(Binary data "):
-        return [str(value)]
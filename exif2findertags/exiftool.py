@@ -1,29 +1,65 @@
 """ Yet another simple exiftool wrapper 
     I rolled my own for following reasons: 
     1. I wanted something under MIT license (best alternative was licensed under GPL/BSD)
-    2. I wanted singleton behavior so only a single exiftool process was ever running
+    2. I wanted a shared pool of long-running exiftool processes instead of starting exiftool for every call
     3. When used as a context manager, I wanted the operations to batch until exiting the context (improved performance)
     If these aren't important to you, I highly recommend you use Sven Marnach's excellent 
     pyexiftool: https://github.com/smarnach/pyexiftool which provides more functionality """
 
+import asyncio
 import atexit
+import collections
+import concurrent.futures
+import contextlib
 import html
+import itertools
 import json
 import logging
 import os
+import queue
 import re
 import shutil
 import subprocess
+import threading
+import unicodedata
 from abc import ABC, abstractmethod
 from functools import lru_cache  # pylint: disable=syntax-error
 
+from .metadata_view import MetadataView
+
 # exiftool -stay_open commands outputs this EOF marker after command is run
 EXIFTOOL_STAYOPEN_EOF = "{ready}"
 EXIFTOOL_STAYOPEN_EOF_LEN = len(EXIFTOOL_STAYOPEN_EOF)
 
+# arguments used to start exiftool in batch mode
+EXIFTOOL_STAYOPEN_ARGS = [
+    "-stay_open",  # keep process open in batch mode
+    "True",  # -stay_open=True, keep process open in batch mode
+    "-@",  # read command-line arguments from file
+    "-",  # read from stdin
+    "-common_args",  # specifies args common to all commands subsequently run
+    "-n",  # no print conversion (e.g. print tag values in machine readable format)
+    "-P",  # Preserve file modification date/time
+    "-G",  # print group name for each tag
+    "-E",  # escape tag values for HTML (allows use of HTML &#xa; for newlines)
+]
+
+# number of bytes to read from the exiftool process at a time
+EXIFTOOL_READ_SIZE = 65536
+
+# number of commands ExifToolPipeline keeps in flight by default
+EXIFTOOL_PIPELINE_DEPTH = 2
+
+# whitespace stripped from start/end of exiftool output
+_WHITESPACE = b" \t\r\n"
+
 # list of exiftool processes to cleanup when exiting or when terminate is called
 EXIFTOOL_PROCESSES = []
 
+# default limits for the number of files and approximate bytes of metadata held by ExifToolCaching
+EXIFTOOL_CACHE_MAX_ENTRIES = 10000
+EXIFTOOL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
 
 def escape_str(s):
     """escape string for use with exiftool -E"""
@@ -63,29 +99,192 @@ def get_exiftool_path():
         )
 
 
-class _ExifToolProc:
-    """Runs exiftool in a subprocess via Popen
-    Creates a singleton object"""
+def exiftool_version(exiftool=None):
+    """Return version of exiftool as str
+
+    Args:
+        exiftool: path to exiftool, if not specified will look in path
+    """
+    with ExifToolPool(exiftool=exiftool).checkout() as exiftoolproc:
+        output, _, _ = exiftoolproc.execute(b"-ver\n-execute\n")
+    return output.decode("utf-8").strip()
+
+
+def _load_exiftool_json(json_str):
+    """Decode the JSON output of exiftool -json -E into a list of dicts, one per file
+
+    Returns empty list if json_str is empty or cannot be decoded
+    """
+    if not json_str:
+        return []
+    json_str = unescape_str(json_str.decode("utf-8"))
+    try:
+        return json.loads(json_str)
+    except Exception as e:
+        # will fail with some commands, e.g --ext AVI which produces
+        # 'No file with specified extension' instead of json
+        return []
+
+
+def _exifdict_view(exifdict, tag_groups=True, normalized=False):
+    """return view of exifdict (with tag groups as returned by exiftool) as used by ExifTool.asdict()
+
+    Args:
+        exifdict: dict of EXIF tags and values with tag groups, e.g. "IPTC:Keywords"
+        tag_groups: if True (default), dict keys have tag groups; if False, drops groups from keys, e.g. "Keywords"
+        normalized: if True, dict keys are all normalized to lower case (default is False)
+    """
+    if not tag_groups:
+        # strip tag groups
+        exif_new = {}
+        for k, v in exifdict.items():
+            k = re.sub(r".*:", "", k)
+            exif_new[k] = v
+        exifdict = exif_new
+
+    if normalized:
+        exifdict = {k.lower(): v for (k, v) in exifdict.items()}
+
+    return exifdict
+
+
+def _exifdict_merged(exifdict_no_groups, exifdict_groups):
+    """return new dict containing the keys of both exifdict_no_groups and exifdict_groups"""
+    exifdict = exifdict_no_groups.copy()
+    exifdict.update(exifdict_groups)
+    return exifdict
+
+
+def _split_exiftool_output(buffer, end):
+    """Split warning and error lines out of exiftool output
+
+    Args:
+        buffer: bytearray containing exiftool output
+        end: index in buffer of the end of the output (e.g. start of the {ready} marker)
+
+    Returns:
+        (output, warning, error) as bytes; output has leading/trailing whitespace removed,
+        warning and error contain the stripped lines starting with "Warning" or "Error"
+    """
+    if not any(
+        buffer.startswith(prefix, 0, end) or buffer.find(b"\n" + prefix, 0, end) != -1
+        for prefix in (b"Warning", b"Error")
+    ):
+        # fast path: no warnings or errors so output is the whole response
+        # which is copied from the buffer exactly once
+        begin = 0
+        while begin < end and buffer[begin] in _WHITESPACE:
+            begin += 1
+        while end > begin and buffer[end - 1] in _WHITESPACE:
+            end -= 1
+        with memoryview(buffer) as view:
+            return bytes(view[begin:end]), b"", b""
+
+    output = []
+    warning = b""
+    error = b""
+    for line in buffer[:end].split(b"\n"):
+        if line.startswith(b"Warning"):
+            warning += line.strip()
+        elif line.startswith(b"Error"):
+            error += line.strip()
+        else:
+            output.append(line)
+    return bytes(b"\n".join(output).strip()), warning, error
+
+
+def _find_marker_line(buffer, marker, start):
+    """Search buffer from start for a complete line beginning with marker (e.g. b"{ready}")
+
+    Returns:
+        (pos, eol, start): position of marker and of the newline ending its line if found,
+        otherwise (-1, -1, start) where start is the position to resume searching from
+        once more data has been added to buffer
+    """
+    marker_len = len(marker)
+    pos = buffer.find(marker, start)
+    # marker must be at the start of a line
+    while pos > 0 and buffer[pos - 1] != 0x0A:
+        pos = buffer.find(marker, pos + 1)
+    if pos != -1:
+        eol = buffer.find(b"\n", pos + marker_len)
+        if eol != -1:
+            return pos, eol, start
+        # have the marker but not the end of its line
+        return -1, -1, pos
+    # marker may straddle the end of the data read so far
+    return -1, -1, max(0, len(buffer) - marker_len + 1)
+
+
+def _normalize_path_key(filepath):
+    """Return str key for filepath used to match the SourceFile returned by exiftool;
+    paths are normalized to Unicode NFC form as exiftool may return a path whose
+    Unicode normalization differs from the path it was given (e.g. NFD on macOS)"""
+    return unicodedata.normalize("NFC", os.fsdecode(filepath))
+
+
+def _canonical_path(filepath):
+    """Return absolute, normalized str path for filepath (str, bytes, or os.PathLike)"""
+    return os.path.abspath(os.fsdecode(filepath))
+
+
+def _exifdict_nbytes(exifdict):
+    """Return approximate number of bytes used to hold exifdict"""
+    return sum(len(str(k)) + len(str(v)) for k, v in exifdict.items())
+
+
+def exiftool_read_batch(filepaths, exiftool=None, read_args=None):
+    """Read metadata for multiple files with a single exiftool -json call
+
+    Args:
+        filepaths: list of paths to files to read
+        exiftool: optional path to exiftool, if not specified will look in path
+        read_args: optional list of exiftool arguments selecting the tags to read (see ExifTool)
+
+    Returns:
+        dict mapping each path in filepaths to dict of EXIF tags and values (with tag groups)
+        as returned by ExifTool.asdict(); files that exiftool could not read are omitted
+    """
+    if not filepaths:
+        return {}
+
+    with ExifToolPool(exiftool=exiftool).checkout() as exiftoolproc:
+        json_str, _, _ = exiftoolproc.execute(
+            _read_batch_command(filepaths, read_args) + b"-execute\n"
+        )
+    return _read_batch_results(json_str, filepaths)
 
-    def __new__(cls, *args, **kwargs):
-        """create new object or return instance of already created singleton"""
-        if not hasattr(cls, "instance") or not cls.instance:
-            cls.instance = super().__new__(cls)
 
-        return cls.instance
+def _read_batch_command(filepaths, read_args=None):
+    """Return exiftool command (without -execute) to read metadata for filepaths as JSON"""
+    return (
+        b"-json\n"
+        + b"".join(f"{arg}\n".encode("utf-8") for arg in read_args or [])
+        + b"".join(os.fsencode(filepath) + b"\n" for filepath in filepaths)
+    )
 
-    def __init__(self, exiftool=None):
-        """construct _ExifToolProc singleton object or return instance of already created object
-        exiftool: optional path to exiftool binary (if not provided, will search path to find it)"""
 
-        if hasattr(self, "_process_running") and self._process_running:
-            # already running
-            if exiftool is not None and exiftool != self._exiftool:
-                logging.warning(
-                    f"exiftool subprocess already running, "
-                    f"ignoring exiftool={exiftool}"
-                )
-            return
+def _read_batch_results(json_str, filepaths):
+    """Return dict mapping each path in filepaths to its metadata in exiftool JSON output json_str"""
+    paths = {_normalize_path_key(filepath): filepath for filepath in filepaths}
+    results = {}
+    for exifdict in _load_exiftool_json(json_str):
+        source_file = exifdict.get("SourceFile")
+        if source_file is None:
+            continue
+        filepath = paths.get(_normalize_path_key(source_file))
+        if filepath is not None:
+            results[filepath] = exifdict
+    return results
+
+
+class _ExifToolProc:
+    """Runs exiftool in a subprocess via Popen"""
+
+    def __init__(self, exiftool=None):
+        """construct _ExifToolProc object and start the exiftool process
+        exiftool: optional path to exiftool binary (if not provided, will search path to find it)
+        """
 
         self._process_running = False
         self._exiftool = exiftool or get_exiftool_path()
@@ -110,6 +309,16 @@ class _ExifToolProc:
         """return path to exiftool process"""
         return self._exiftool
 
+    @property
+    def is_alive(self):
+        """return True if the exiftool process is running, otherwise False"""
+        return self._process_running and self._process.poll() is None
+
+    def restart(self):
+        """stop the exiftool process if it's running then start a new one"""
+        self._stop_proc()
+        self._start_proc()
+
     def _start_proc(self):
         """start exiftool in batch mode"""
 
@@ -119,25 +328,59 @@ class _ExifToolProc:
 
         # open exiftool process
         self._process = subprocess.Popen(
-            [
-                self._exiftool,
-                "-stay_open",  # keep process open in batch mode
-                "True",  # -stay_open=True, keep process open in batch mode
-                "-@",  # read command-line arguments from file
-                "-",  # read from stdin
-                "-common_args",  # specifies args common to all commands subsequently run
-                "-n",  # no print conversion (e.g. print tag values in machine readable format)
-                "-P",  # Preserve file modification date/time
-                "-G",  # print group name for each tag
-                "-E",  # escape tag values for HTML (allows use of HTML &#xa; for newlines)
-            ],
+            [self._exiftool, *EXIFTOOL_STAYOPEN_ARGS],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
         )
         self._process_running = True
+        self._buffer = bytearray()
+
+        if self not in EXIFTOOL_PROCESSES:
+            EXIFTOOL_PROCESSES.append(self)
 
-        EXIFTOOL_PROCESSES.append(self)
+    def execute(self, command_str):
+        """Send command_str to the exiftool process and read the response
+
+        Args:
+            command_str: bytes containing newline separated exiftool arguments, terminated with -execute
+
+        Returns:
+            (output, warning, error)
+            output: bytes containing output of exiftool commands
+            warning: bytes containing any warnings generated by exiftool
+            error: bytes containing any errors generated by exiftool
+        """
+        process = self.process
+        process.stdin.write(command_str)
+        process.stdin.flush()
+        return self._read_response(EXIFTOOL_STAYOPEN_EOF.encode("utf-8"))
+
+    def _read_response(self, marker):
+        """Read response from exiftool up to the line containing marker (e.g. b"{ready}")
+
+        Output is read in large chunks into a buffer that is reused between calls and
+        only newly read data is searched for marker so reading is linear in the size of the response.
+        Any data following the marker line is left in the buffer for the next response.
+
+        Returns:
+            (output, warning, error) as described in execute()
+        """
+        buffer = self._buffer
+        fd = self._process.stdout.fileno()
+        start = 0
+        while True:
+            pos, eol, start = _find_marker_line(buffer, marker, start)
+            if pos != -1:
+                break
+            chunk = os.read(fd, EXIFTOOL_READ_SIZE)
+            if not chunk:
+                raise OSError("exiftool process terminated unexpectedly")
+            buffer += chunk
+
+        output, warning, error = _split_exiftool_output(buffer, pos)
+        del buffer[: eol + 1]
+        return output, warning, error
 
     def _stop_proc(self):
         """stop the exiftool process if it's running, otherwise, do nothing"""
@@ -162,10 +405,597 @@ class _ExifToolProc:
         self._process_running = False
 
 
+class ExifToolPool:
+    """Pool of long-running exiftool processes shared by all ExifTool objects
+    Creates a singleton object
+
+    exiftool processes are started lazily as needed, up to size processes;
+    each process is checked out by a single thread at a time via checkout()
+    """
+
+    def __new__(cls, *args, **kwargs):
+        """create new object or return instance of already created singleton"""
+        if not hasattr(cls, "instance") or not cls.instance:
+            cls.instance = super().__new__(cls)
+
+        return cls.instance
+
+    def __init__(self, exiftool=None, size=None):
+        """construct ExifToolPool singleton object or return instance of already created object
+
+        Args:
+            exiftool: optional path to exiftool binary (if not provided, will search path to find it)
+            size: maximum number of exiftool processes to run (default is number of CPUs)
+        """
+
+        if hasattr(self, "_procs"):
+            # already initialized
+            if exiftool is not None and exiftool != self._exiftool:
+                logging.warning(
+                    f"exiftool pool already created, ignoring exiftool={exiftool}"
+                )
+            if size is not None and size != self._size:
+                self.size = size
+            return
+
+        self._exiftool = exiftool or get_exiftool_path()
+        self._size = size or os.cpu_count() or 1
+        self._procs = []
+        self._idle = []
+        self._condition = threading.Condition()
+
+    @property
+    def exiftool(self):
+        """return path to exiftool process"""
+        return self._exiftool
+
+    @property
+    def size(self):
+        """return maximum number of exiftool processes in the pool"""
+        return self._size
+
+    @size.setter
+    def size(self, size):
+        """set maximum number of exiftool processes in the pool"""
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        with self._condition:
+            self._size = size
+            # stop any idle processes that are now in excess of size
+            while len(self._procs) > size and self._idle:
+                proc = self._idle.pop()
+                self._procs.remove(proc)
+                proc._stop_proc()
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def checkout(self):
+        """Context manager that checks out an exiftool process for exclusive use by caller
+
+        Yields: _ExifToolProc
+
+        If the process fails while checked out, it is stopped and will be restarted
+        the next time it is checked out
+        """
+        proc = self._acquire()
+        try:
+            yield proc
+        except (OSError, ValueError):
+            # broken pipe or closed file; stop process so it gets restarted
+            proc._stop_proc()
+            raise
+        finally:
+            self._release(proc)
+
+    def _acquire(self):
+        """get an idle exiftool process, starting a new one if needed, and
+        wait for a process to become available if pool is at capacity"""
+        with self._condition:
+            while True:
+                if self._idle:
+                    proc = self._idle.pop()
+                    break
+                if len(self._procs) < self._size:
+                    proc = _ExifToolProc(exiftool=self._exiftool)
+                    self._procs.append(proc)
+                    break
+                self._condition.wait()
+
+        # health check
+        if not proc.is_alive:
+            logging.debug(f"restarting exiftool process {proc}")
+            proc.restart()
+        return proc
+
+    def _release(self, proc):
+        """return proc to the pool"""
+        with self._condition:
+            if len(self._procs) > self._size:
+                # pool was resized while proc was checked out
+                self._procs.remove(proc)
+                proc._stop_proc()
+            else:
+                self._idle.append(proc)
+            self._condition.notify()
+
+
+class ExifToolPipeline:
+    """Pipelined client for a dedicated exiftool process
+
+    Keeps up to depth commands in flight on a single exiftool process using numbered
+    -executeNUM commands; each response is matched to its command by the {readyNUM} marker
+    exiftool prints after it and is delivered via a concurrent.futures.Future.
+    This keeps exiftool busy with the next command while the caller works on the results of the last one.
+    """
+
+    def __init__(self, exiftool=None, depth=EXIFTOOL_PIPELINE_DEPTH):
+        """Start exiftool process for the pipeline
+
+        Args:
+            exiftool: optional path to exiftool binary (if not provided, will search path to find it)
+            depth: maximum number of commands in flight; submit() blocks while depth commands are pending
+        """
+        if depth < 1:
+            raise ValueError("depth must be >= 1")
+        self._proc = _ExifToolProc(exiftool=exiftool)
+        self._slots = threading.BoundedSemaphore(depth)
+        self._write_lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._pending = queue.Queue()
+        self._error = None
+        self._closed = False
+        self._reader = threading.Thread(
+            target=self._read_responses, name="ExifToolPipeline", daemon=True
+        )
+        self._reader.start()
+
+    @property
+    def pid(self):
+        """return process id (PID) of the exiftool process"""
+        return self._proc.pid
+
+    @property
+    def failed(self):
+        """return True if the exiftool process failed; a failed pipeline cannot be used
+        for further commands and should be closed and replaced"""
+        return self._error is not None
+
+    def submit(self, command_str):
+        """Send command to exiftool without waiting for the response
+
+        Args:
+            command_str: bytes containing newline separated exiftool arguments, without -execute
+
+        Returns:
+            concurrent.futures.Future resolving to (output, warning, error) as returned by _ExifToolProc.execute()
+
+        Raises:
+            ValueError if pipeline is closed
+            OSError if exiftool process has failed
+        """
+        self._slots.acquire()
+        try:
+            with self._write_lock:
+                if self._closed:
+                    raise ValueError("ExifToolPipeline is closed")
+                if self._error is not None:
+                    raise OSError(f"exiftool process failed: {self._error}")
+                num = next(self._sequence)
+                process = self._proc.process
+                try:
+                    process.stdin.write(
+                        command_str + f"-execute{num}\n".encode("utf-8")
+                    )
+                    process.stdin.flush()
+                except (OSError, ValueError) as e:
+                    self._error = e
+                    raise
+                future = concurrent.futures.Future()
+                self._pending.put((num, future))
+        except BaseException:
+            self._slots.release()
+            raise
+        return future
+
+    def read_batch(self, filepaths, read_args=None):
+        """Read metadata for filepaths without waiting for the response
+
+        Args:
+            filepaths: list of paths to files to read
+            read_args: optional list of exiftool arguments selecting the tags to read (see ExifTool)
+
+        Returns:
+            concurrent.futures.Future resolving to dict as returned by exiftool_read_batch()
+        """
+        future = concurrent.futures.Future()
+        if not filepaths:
+            future.set_result({})
+            return future
+
+        def _done(response):
+            try:
+                json_str, _, _ = response.result()
+                future.set_result(_read_batch_results(json_str, filepaths))
+            except Exception as e:
+                future.set_exception(e)
+
+        self.submit(_read_batch_command(filepaths, read_args)).add_done_callback(_done)
+        return future
+
+    def close(self):
+        """Wait for commands in flight to complete then stop the exiftool process"""
+        with self._write_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending.put(None)
+        self._reader.join()
+        self._proc._stop_proc()
+
+    def _read_responses(self):
+        """Read responses from exiftool in the order commands were sent and resolve their futures"""
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            num, future = item
+            try:
+                response = self._proc._read_response(f"{{ready{num}}}".encode("utf-8"))
+            except Exception as e:
+                self._fail(future, e)
+                continue
+            future.set_result(response)
+            self._slots.release()
+
+    def _fail(self, future, error):
+        """Fail future and all commands in flight after exiftool process failed"""
+        with self._write_lock:
+            self._error = error
+        while future is not None:
+            future.set_exception(error)
+            self._slots.release()
+            try:
+                item = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            if item is None:
+                # close() is waiting for the reader
+                self._pending.put(None)
+                return
+            _, future = item
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _AsyncExifToolProc:
+    """Runs exiftool in an asyncio subprocess"""
+
+    def __init__(self, exiftool):
+        self._exiftool = exiftool
+        self._process = None
+        self._buffer = bytearray()
+
+    @property
+    def is_alive(self):
+        """return True if the exiftool process is running, otherwise False"""
+        return self._process is not None and self._process.returncode is None
+
+    async def execute(self, command_str):
+        """Send command_str to the exiftool process and read the response
+
+        Args:
+            command_str: bytes containing newline separated exiftool arguments, terminated with -execute
+
+        Returns:
+            (output, warning, error) as returned by _ExifToolProc.execute()
+        """
+        if not self.is_alive:
+            await self.start()
+        self._process.stdin.write(command_str)
+        await self._process.stdin.drain()
+
+        marker = EXIFTOOL_STAYOPEN_EOF.encode("utf-8")
+        buffer = self._buffer
+        start = 0
+        while True:
+            pos, eol, start = _find_marker_line(buffer, marker, start)
+            if pos != -1:
+                break
+            chunk = await self._process.stdout.read(EXIFTOOL_READ_SIZE)
+            if not chunk:
+                raise OSError("exiftool process terminated unexpectedly")
+            buffer += chunk
+
+        output, warning, error = _split_exiftool_output(buffer, pos)
+        del buffer[: eol + 1]
+        return output, warning, error
+
+    async def start(self):
+        """start exiftool in batch mode"""
+        self._process = await asyncio.create_subprocess_exec(
+            self._exiftool,
+            *EXIFTOOL_STAYOPEN_ARGS,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        self._buffer = bytearray()
+
+    async def stop(self):
+        """stop the exiftool process if it's running, otherwise, do nothing"""
+        if self._process is None:
+            return
+        process, self._process = self._process, None
+        if process.returncode is not None:
+            return
+        try:
+            process.stdin.write(b"-stay_open\nFalse\n")
+            await process.stdin.drain()
+            process.stdin.close()
+            await asyncio.wait_for(process.communicate(), timeout=5)
+        except (OSError, asyncio.TimeoutError):
+            process.kill()
+            await process.wait()
+
+
+class AsyncExifTool:
+    """asyncio exiftool interface for reading EXIF tags
+
+    Runs up to size long-running exiftool processes using the same -stay_open protocol
+    and arguments as ExifTool; each request uses a process exclusively so up to size
+    requests are run concurrently. Must be closed with close() (or used as an async
+    context manager) from the event loop it was used on.
+    """
+
+    def __init__(self, exiftool=None, size=None):
+        """Create AsyncExifTool object; exiftool processes are started as needed
+
+        Args:
+            exiftool: optional path to exiftool, if not specified will look in path
+            size: maximum number of exiftool processes to run (default is number of CPUs)
+        """
+        self._exiftool = exiftool or get_exiftool_path()
+        self._size = size or os.cpu_count() or 1
+        self._procs = []
+        self._idle = None
+
+    @property
+    def exiftool(self):
+        """return path to exiftool"""
+        return self._exiftool
+
+    @property
+    def size(self):
+        """return maximum number of exiftool processes"""
+        return self._size
+
+    async def run_commands(self, *commands, filepaths=None):
+        """Run commands in an exiftool process and return result
+
+        Args:
+            *commands: exiftool commands to run
+            filepaths: optional list of paths to files to run commands against
+
+        Returns:
+            (output, warning, error) as returned by ExifTool.run_commands()
+        """
+        if not commands:
+            raise TypeError("must provide one or more command to run")
+        command_str = (
+            b"".join(f"{c}\n".encode("utf-8") for c in commands)
+            + b"".join(os.fsencode(filepath) + b"\n" for filepath in filepaths or [])
+            + b"-execute\n"
+        )
+        output, warning, error = await self._execute(command_str)
+        warning = "" if warning == b"" else warning.decode("utf-8")
+        error = "" if error == b"" else error.decode("utf-8")
+        return output, warning, error
+
+    async def version(self):
+        """returns exiftool version"""
+        ver, _, _ = await self.run_commands("-ver")
+        return ver.decode("utf-8")
+
+    async def asdict(self, filepath, tag_groups=True, normalized=False, read_args=None):
+        """return dictionary of all EXIF tags and values from exiftool for filepath
+        returns empty dict if no tags
+
+        Args:
+            filepath: path to file to read
+            tag_groups: if True (default), dict keys have tag groups, e.g. "IPTC:Keywords"; if False, drops groups from keys, e.g. "Keywords"
+            normalized: if True, dict keys are all normalized to lower case (default is False)
+            read_args: optional list of exiftool arguments selecting the tags to read (see ExifTool)
+        """
+        json_str, _, _ = await self.run_commands(
+            "-json", *(read_args or []), filepaths=[filepath]
+        )
+        exifdicts = _load_exiftool_json(json_str)
+        return _exifdict_view(
+            exifdicts[0] if exifdicts else dict(),
+            tag_groups=tag_groups,
+            normalized=normalized,
+        )
+
+    async def read_many(
+        self, filepaths, read_args=None, concurrency=None, batch_size=100
+    ):
+        """Read metadata for many files, reading batches of files concurrently
+
+        Args:
+            filepaths: list of paths to files to read
+            read_args: optional list of exiftool arguments selecting the tags to read (see ExifTool)
+            concurrency: maximum number of batches to read at once (default and maximum is size)
+            batch_size: number of files to read with each exiftool call
+
+        Returns:
+            dict as returned by exiftool_read_batch()
+        """
+        filepaths = list(filepaths)
+        semaphore = asyncio.Semaphore(min(concurrency or self._size, self._size))
+
+        async def _read_batch(batch):
+            async with semaphore:
+                json_str, _, _ = await self._execute(
+                    _read_batch_command(batch, read_args) + b"-execute\n"
+                )
+            return _read_batch_results(json_str, batch)
+
+        results = {}
+        for batch_results in await asyncio.gather(
+            *[
+                _read_batch(filepaths[i : i + batch_size])
+                for i in range(0, len(filepaths), batch_size)
+            ]
+        ):
+            results.update(batch_results)
+        return results
+
+    async def close(self):
+        """stop all exiftool processes"""
+        procs, self._procs = self._procs, []
+        self._idle = None
+        for proc in procs:
+            await proc.stop()
+
+    async def _execute(self, command_str):
+        """run command_str in an idle exiftool process, waiting for one if all are busy"""
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+        if self._idle.empty() and len(self._procs) < self._size:
+            proc = _AsyncExifToolProc(self._exiftool)
+            self._procs.append(proc)
+        else:
+            proc = await self._idle.get()
+        try:
+            return await proc.execute(command_str)
+        except (OSError, ValueError):
+            # broken pipe or closed stream; stop process so it gets restarted
+            await proc.stop()
+            raise
+        except asyncio.CancelledError:
+            # response may be partially read so process can't be reused as is
+            await proc.stop()
+            raise
+        finally:
+            if self._idle is not None and proc in self._procs:
+                self._idle.put_nowait(proc)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+class _ExifToolCache:
+    """Bounded least recently used cache of _ExifToolCaching objects keyed by (canonical path, read_args)
+    with limits on the number of entries and approximate bytes of metadata"""
+
+    def __init__(
+        self, max_entries=EXIFTOOL_CACHE_MAX_ENTRIES, max_bytes=EXIFTOOL_CACHE_MAX_BYTES
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        """return cached object for key and mark it most recently used or None if not cached"""
+        with self._lock:
+            try:
+                entry = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        """add entry to cache, evicting least recently used entries if needed"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            entry._cache_key = key
+            entry._lru = self
+            self._entries[key] = entry
+            self.nbytes += entry.nbytes
+            self._enforce_limits()
+
+    def resize(self, key, nbytes):
+        """account for entry for key growing by nbytes"""
+        with self._lock:
+            if key in self._entries:
+                self.nbytes += nbytes
+                self._enforce_limits()
+
+    def evict(self, filepath):
+        """remove all entries for filepath; returns number of entries removed"""
+        path = _canonical_path(filepath)
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == path]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        """remove all entries"""
+        with self._lock:
+            for entry in self._entries.values():
+                entry._lru = None
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """return dict of cache statistics"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key):
+        """remove entry for key; caller must hold lock"""
+        entry = self._entries.pop(key)
+        entry._lru = None
+        self.nbytes -= entry.nbytes
+
+    def _enforce_limits(self):
+        """evict least recently used entries until cache is within limits; caller must hold lock
+        the most recently used entry is never evicted"""
+        while len(self._entries) > 1 and (
+            (self.max_entries and len(self._entries) > self.max_entries)
+            or (self.max_bytes and self.nbytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
 class ExifTool:
     """Basic exiftool interface for reading and writing EXIF tags"""
 
-    def __init__(self, filepath, exiftool=None, overwrite=True, flags=None):
+    def __init__(
+        self, filepath, exiftool=None, overwrite=True, flags=None, read_args=None
+    ):
         """Create ExifTool object
 
         Args:
@@ -173,6 +1003,8 @@ class ExifTool:
             exiftool: path to exiftool, if not specified will look in path
             overwrite: if True, will overwrite image file without creating backup, default=False
             flags: optional list of exiftool flags to prepend to exiftool command when writing metadata (e.g. -m or -F)
+            read_args: optional list of exiftool arguments selecting the tags to read, e.g. ["-IPTC:Keywords", "-EXIF:all"];
+                if not specified, all tags will be read
 
         Returns:
             ExifTool instance
@@ -180,18 +1012,15 @@ class ExifTool:
         self.file = filepath
         self.overwrite = overwrite
         self.flags = flags or []
+        self.read_args = list(read_args) if read_args else []
         self.data = {}
         self.warning = None
         self.error = None
         # if running as a context manager, self._context_mgr will be True
         self._context_mgr = False
-        self._exiftoolproc = _ExifToolProc(exiftool=exiftool)
+        self._exiftoolpool = ExifToolPool(exiftool=exiftool)
         self._read_exif()
 
-    @property
-    def _process(self):
-        return self._exiftoolproc.process
-
     def setvalue(self, tag, value):
         """Set tag to value(s); if value is None, will delete tag
 
@@ -283,9 +1112,6 @@ class ExifTool:
 
         Note: Also sets self.warning and self.error if warning or error generated.
         """
-        if not (hasattr(self, "_process") and self._process):
-            raise ValueError("exiftool process is not running")
-
         if not commands:
             raise TypeError("must provide one or more command to run")
 
@@ -313,32 +1139,20 @@ class ExifTool:
             + b"-execute\n"
         )
 
-        # send the command
-        self._process.stdin.write(command_str)
-        self._process.stdin.flush()
-
-        # read the output
-        output = b""
-        warning = b""
-        error = b""
-        while EXIFTOOL_STAYOPEN_EOF not in str(output):
-            line = self._process.stdout.readline()
-            if line.startswith(b"Warning"):
-                warning += line.strip()
-            elif line.startswith(b"Error"):
-                error += line.strip()
-            else:
-                output += line.strip()
+        # send the command and read the output
+        with self._exiftoolpool.checkout() as exiftoolproc:
+            output, warning, error = exiftoolproc.execute(command_str)
         warning = "" if warning == b"" else warning.decode("utf-8")
         error = "" if error == b"" else error.decode("utf-8")
         self.warning = warning
         self.error = error
-        return output[:-EXIFTOOL_STAYOPEN_EOF_LEN], warning, error
+        return output, warning, error
 
     @property
     def pid(self):
-        """return process id (PID) of the exiftool process"""
-        return self._process.pid
+        """return process id (PID) of an exiftool process in the pool"""
+        with self._exiftoolpool.checkout() as exiftoolproc:
+            return exiftoolproc.pid
 
     @property
     def version(self):
@@ -354,34 +1168,38 @@ class ExifTool:
             tag_groups: if True (default), dict keys have tag groups, e.g. "IPTC:Keywords"; if False, drops groups from keys, e.g. "Keywords"
             normalized: if True, dict keys are all normalized to lower case (default is False)
         """
-        json_str, _, _ = self.run_commands("-json")
-        if not json_str:
-            return dict()
-        json_str = unescape_str(json_str.decode("utf-8"))
+        return _exifdict_view(
+            self._read_exifdict(), tag_groups=tag_groups, normalized=normalized
+        )
 
-        try:
-            exifdict = json.loads(json_str)
-        except Exception as e:
-            # will fail with some commands, e.g --ext AVI which produces
-            # 'No file with specified extension' instead of json
-            return dict()
-        exifdict = exifdict[0]
-        if not tag_groups:
-            # strip tag groups
-            exif_new = {}
-            for k, v in exifdict.items():
-                k = re.sub(r".*:", "", k)
-                exif_new[k] = v
-            exifdict = exif_new
-
-        if normalized:
-            exifdict = {k.lower(): v for (k, v) in exifdict.items()}
-
-        return exifdict
+    def asdict_merged(self, normalized=False):
+        """return dictionary of all EXIF tags and values from exiftool with both
+        grouped and ungrouped keys, e.g. both "IPTC:Keywords" and "Keywords"
+        returns empty dict if no tags
+
+        Args:
+            normalized: if True, dict keys are all normalized to lower case (default is False)
+        """
+        exifdict = self._read_exifdict()
+        return _exifdict_merged(
+            _exifdict_view(exifdict, tag_groups=False, normalized=normalized),
+            _exifdict_view(exifdict, tag_groups=True, normalized=normalized),
+        )
+
+    def metadata_view(self):
+        """return MetadataView of all EXIF tags and values from exiftool"""
+        return MetadataView(self._read_exifdict())
+
+    def _read_exifdict(self):
+        """read all requested tags from file with exiftool and return dict with tag groups
+        returns empty dict if no tags"""
+        json_str, _, _ = self.run_commands("-json", *self.read_args)
+        exifdicts = _load_exiftool_json(json_str)
+        return exifdicts[0] if exifdicts else dict()
 
     def json(self):
         """returns JSON string containing all EXIF tags and values from exiftool"""
-        json, _, _ = self.run_commands("-json")
+        json, _, _ = self.run_commands("-json", *self.read_args)
         json = unescape_str(json.decode("utf-8"))
         return json
 
@@ -391,7 +1209,7 @@ class ExifTool:
         self.data = {k: v for k, v in data.items()}
 
     def __str__(self):
-        return f"file: {self.file}\nexiftool: {self._exiftoolproc._exiftool}"
+        return f"file: {self.file}\nexiftool: {self._exiftoolpool.exiftool}"
 
     def __enter__(self):
         self._context_mgr = True
@@ -410,31 +1228,217 @@ class ExifToolCaching(ExifTool):
     """Basic exiftool interface for reading and writing EXIF tags, with caching.
     Use this only when you know the file's EXIF data will not be changed by any external process.
 
-    Creates a singleton cached ExifTool instance"""
+    Creates a singleton cached ExifTool instance for each file; the number of files cached
+    is limited (see configure_cache) with least recently used files evicted first"""
 
-    _singletons = {}
+    _singletons = _ExifToolCache()
 
-    def __new__(cls, filepath, exiftool=None):
+    # optional persistent MetadataCache shared by all instances, see set_metadata_cache()
+    _metadata_cache = None
+
+    def __new__(cls, filepath, exiftool=None, read_args=None):
         """create new object or return instance of already created singleton"""
-        if filepath not in cls._singletons:
-            cls._singletons[filepath] = _ExifToolCaching(filepath, exiftool=exiftool)
-        return cls._singletons[filepath]
+        key = (_canonical_path(filepath), tuple(read_args or []))
+        exiftool_caching = cls._singletons.get(key)
+        if exiftool_caching is None:
+            exiftool_caching = _ExifToolCaching(
+                filepath, exiftool=exiftool, read_args=read_args
+            )
+            cls._singletons.put(key, exiftool_caching)
+        return exiftool_caching
+
+    @classmethod
+    def configure_cache(cls, max_entries=None, max_bytes=None):
+        """Set limits on the number of files and approximate bytes of metadata held in memory
+
+        Args:
+            max_entries: maximum number of cached files (0 for no limit)
+            max_bytes: maximum approximate number of bytes of cached metadata (0 for no limit)
+        """
+        with cls._singletons._lock:
+            if max_entries is not None:
+                cls._singletons.max_entries = max_entries
+            if max_bytes is not None:
+                cls._singletons.max_bytes = max_bytes
+            cls._singletons._enforce_limits()
+
+    @classmethod
+    def evict(cls, filepath):
+        """Remove cached metadata for filepath; returns number of cache entries removed"""
+        return cls._singletons.evict(filepath)
+
+    @classmethod
+    def clear(cls):
+        """Remove cached metadata for all files"""
+        cls._singletons.clear()
+
+    @classmethod
+    def cache_stats(cls):
+        """Return dict of statistics for the in-memory cache:
+        entries, bytes, max_entries, max_bytes, hits, misses, evictions"""
+        return cls._singletons.stats()
+
+    @classmethod
+    def prefetch(cls, filepaths, exiftool=None, read_args=None):
+        """Read and cache metadata for multiple files with a single exiftool call
+
+        Args:
+            filepaths: list of paths to files to read
+            exiftool: path to exiftool, if not specified will look in path
+            read_args: optional list of exiftool arguments selecting the tags to read (see ExifTool)
+
+        Files that are already cached are not read again; files exiftool could not read
+        are not cached and will be read individually when ExifToolCaching is called for them
+        """
+        filepaths, exifdicts = cls._lookup_uncached(filepaths, read_args)
+        if filepaths:
+            exifdicts.update(
+                cls._store_metadata(
+                    exiftool_read_batch(
+                        filepaths, exiftool=exiftool, read_args=read_args
+                    ),
+                    read_args,
+                )
+            )
+        cls._add(exifdicts, exiftool, read_args)
+
+    @classmethod
+    def prefetch_async(cls, filepaths, pipeline, exiftool=None, read_args=None):
+        """Read and cache metadata for multiple files in the background using an ExifToolPipeline
+
+        Args:
+            filepaths: list of paths to files to read
+            pipeline: ExifToolPipeline used to read the files
+            exiftool: path to exiftool, if not specified will look in path
+            read_args: optional list of exiftool arguments selecting the tags to read (see ExifTool)
+
+        Returns:
+            concurrent.futures.Future that completes once metadata for filepaths is cached
+        """
+        future = concurrent.futures.Future()
+        filepaths, exifdicts = cls._lookup_uncached(filepaths, read_args)
+
+        def _done(read_future):
+            try:
+                if read_future is not None:
+                    exifdicts.update(
+                        cls._store_metadata(read_future.result(), read_args)
+                    )
+                cls._add(exifdicts, exiftool, read_args)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+
+        if filepaths:
+            pipeline.read_batch(filepaths, read_args=read_args).add_done_callback(_done)
+        else:
+            _done(None)
+        return future
+
+    @classmethod
+    async def aprefetch(cls, filepaths, async_exiftool, read_args=None):
+        """Read and cache metadata for multiple files without blocking the event loop
+
+        Args:
+            filepaths: list of paths to files to read
+            async_exiftool: AsyncExifTool used to read the files
+            read_args: optional list of exiftool arguments selecting the tags to read (see ExifTool)
+
+        Files exiftool could not read are cached with no metadata so that
+        using ExifToolCaching for them does not block the event loop
+        """
+        filepaths, exifdicts = cls._lookup_uncached(filepaths, read_args)
+        if filepaths:
+            results = cls._store_metadata(
+                await async_exiftool.read_many(filepaths, read_args=read_args),
+                read_args,
+            )
+            exifdicts.update({filepath: {} for filepath in filepaths})
+            exifdicts.update(results)
+        cls._add(exifdicts, async_exiftool.exiftool, read_args)
+
+    @classmethod
+    def _lookup_uncached(cls, filepaths, read_args):
+        """Return (filepaths, exifdicts): list of filepaths not in memory or persistent cache
+        and dict of metadata for the files found in the persistent cache"""
+        read_args_key = tuple(read_args or [])
+        filepaths = [
+            filepath
+            for filepath in filepaths
+            if (_canonical_path(filepath), read_args_key) not in cls._singletons
+        ]
+
+        exifdicts = {}
+        if cls._metadata_cache is not None:
+            uncached = []
+            for filepath in filepaths:
+                exifdict = cls._metadata_cache.get(filepath, read_args=read_args)
+                if exifdict is None:
+                    uncached.append(filepath)
+                else:
+                    exifdicts[filepath] = exifdict
+            filepaths = uncached
+        return filepaths, exifdicts
+
+    @classmethod
+    def _store_metadata(cls, exifdicts, read_args):
+        """Store metadata read by exiftool in the persistent cache, if any, and return exifdicts"""
+        if cls._metadata_cache is not None and exifdicts:
+            cls._metadata_cache.set_many(exifdicts.items(), read_args=read_args)
+        return exifdicts
+
+    @classmethod
+    def _add(cls, exifdicts, exiftool, read_args):
+        """Add metadata in exifdicts (dict of filepath: exifdict) to the in-memory cache"""
+        read_args_key = tuple(read_args or [])
+        for filepath, exifdict in exifdicts.items():
+            cls._singletons.put(
+                (_canonical_path(filepath), read_args_key),
+                _ExifToolCaching(
+                    filepath, exiftool=exiftool, exifdict=exifdict, read_args=read_args
+                ),
+            )
+
+    @classmethod
+    def set_metadata_cache(cls, metadata_cache):
+        """Use a persistent MetadataCache to store metadata between runs
+
+        Args:
+            metadata_cache: MetadataCache instance or None to disable the persistent cache
+        """
+        cls._metadata_cache = metadata_cache
 
 
 class _ExifToolCaching(ExifTool):
-    def __init__(self, filepath, exiftool=None):
+    def __init__(self, filepath, exiftool=None, read_args=None, exifdict=None):
         """Create read-only ExifTool object that caches values
 
         Args:
             file: path to image file
             exiftool: path to exiftool, if not specified will look in path
+            read_args: optional list of exiftool arguments selecting the tags to read (see ExifTool)
+            exifdict: optional dict of EXIF tags and values (with tag groups) already read for file,
+                e.g. by exiftool_read_batch(); if provided, file will not be read again
 
         Returns:
             ExifTool instance
         """
         self._json_cache = None
+        self._exifdict = exifdict
         self._asdict_cache = {}
-        super().__init__(filepath, exiftool=exiftool, overwrite=False, flags=None)
+        # approximate bytes of cached data, tracked by the ExifToolCaching cache (_lru) if any
+        self._exifdict_nbytes = _exifdict_nbytes(exifdict) if exifdict else 0
+        self.nbytes = self._exifdict_nbytes
+        self._lru = None
+        self._cache_key = None
+        super().__init__(
+            filepath,
+            exiftool=exiftool,
+            overwrite=False,
+            flags=None,
+            read_args=read_args,
+        )
 
     def run_commands(self, *commands, no_file=False):
         if commands[0] not in ["-json", "-ver"]:
@@ -460,17 +1464,73 @@ class _ExifToolCaching(ExifTool):
             tag_groups: if True (default), dict keys have tag groups, e.g. "IPTC:Keywords"; if False, drops groups from keys, e.g. "Keywords"
             normalized: if True, dict keys are all normalized to lower case (default is False)
         """
+        # each view is derived from the single exiftool read the first time it's needed
+        key = (tag_groups, normalized)
+        try:
+            return self._asdict_cache[key]
+        except KeyError:
+            self._asdict_cache[key] = _exifdict_view(
+                self._read_exifdict(), tag_groups=tag_groups, normalized=normalized
+            )
+            self._grow(self._exifdict_nbytes)
+            return self._asdict_cache[key]
+
+    def asdict_merged(self, normalized=False):
+        """return dictionary of all EXIF tags and values from exiftool with both
+        grouped and ungrouped keys, e.g. both "IPTC:Keywords" and "Keywords"
+        returns empty dict if no tags
+
+        Args:
+            normalized: if True, dict keys are all normalized to lower case (default is False)
+        """
+        key = ("merged", normalized)
         try:
-            return self._asdict_cache[tag_groups][normalized]
+            return self._asdict_cache[key]
         except KeyError:
-            if tag_groups not in self._asdict_cache:
-                self._asdict_cache[tag_groups] = {}
-            self._asdict_cache[tag_groups][normalized] = super().asdict(
-                tag_groups=tag_groups, normalized=normalized
+            self._asdict_cache[key] = _exifdict_merged(
+                self.asdict(tag_groups=False, normalized=normalized),
+                self.asdict(tag_groups=True, normalized=normalized),
             )
-            return self._asdict_cache[tag_groups][normalized]
+            self._grow(2 * self._exifdict_nbytes)
+            return self._asdict_cache[key]
+
+    def metadata_view(self):
+        """return MetadataView of all EXIF tags and values from exiftool, created once and
+        shared by all callers"""
+        try:
+            return self._asdict_cache["view"]
+        except KeyError:
+            self._asdict_cache["view"] = MetadataView(self._read_exifdict())
+            self._grow(2 * self._exifdict_nbytes)
+            return self._asdict_cache["view"]
+
+    def _read_exifdict(self):
+        """read all requested tags from file with exiftool only if not already read
+        or stored in the persistent metadata cache"""
+        if self._exifdict is None:
+            metadata_cache = ExifToolCaching._metadata_cache
+            if metadata_cache is not None:
+                self._exifdict = metadata_cache.get(self.file, read_args=self.read_args)
+            if self._exifdict is None:
+                self._exifdict = super()._read_exifdict()
+                if metadata_cache is not None and self._exifdict:
+                    metadata_cache.set(
+                        self.file, self._exifdict, read_args=self.read_args
+                    )
+            self._exifdict_nbytes = _exifdict_nbytes(self._exifdict)
+            self._grow(self._exifdict_nbytes)
+        return self._exifdict
 
     def flush_cache(self):
         """Clear cached data so that calls to json or asdict return fresh data"""
         self._json_cache = None
+        self._exifdict = None
         self._asdict_cache = {}
+        self._grow(-self.nbytes)
+        self._exifdict_nbytes = 0
+
+    def _grow(self, nbytes):
+        """account for nbytes of additional cached data"""
+        self.nbytes += nbytes
+        if self._lru is not None:
+            self._lru.resize(self._cache_key, nbytes)
@@ -0,0 +1,143 @@
+""" Select which files found while walking directories are processed """
+
+import fnmatch
+import os
+from typing import Iterable, Optional
+
+# number of bytes read from the start of a file to recognize its type
+MAGIC_READ_SIZE = 32
+
+# (offset, signature) of file types exiftool can read metadata from
+MEDIA_SIGNATURES = [
+    (0, b"\xff\xd8\xff"),  # JPEG
+    (0, b"\x89PNG\r\n\x1a\n"),  # PNG
+    (0, b"GIF87a"),  # GIF
+    (0, b"GIF89a"),  # GIF
+    (0, b"II*\x00"),  # TIFF (little endian) and TIFF based RAW, e.g. CR2, NEF, ARW, DNG
+    (0, b"MM\x00*"),  # TIFF (big endian) and TIFF based RAW
+    (0, b"IIRO"),  # Olympus ORF
+    (0, b"IIRS"),  # Olympus ORF
+    (0, b"IIU\x00"),  # Panasonic RW2
+    (0, b"II\x1a\x00\x00\x00HEAPCCDR"),  # Canon CRW
+    (0, b"FUJIFILMCCD-RAW"),  # Fuji RAF
+    (0, b"\x00MRM"),  # Minolta MRW
+    (0, b"FOVb"),  # Sigma X3F
+    (0, b"8BPS"),  # Photoshop PSD
+    (0, b"\xff\x0a"),  # JPEG XL codestream
+    (0, b"\x00\x00\x00\x0cJXL "),  # JPEG XL container
+    (4, b"ftyp"),  # ISO base media: HEIC, AVIF, CR3, MP4, M4V, MOV, 3GP
+    (4, b"moov"),  # QuickTime
+    (4, b"mdat"),  # QuickTime
+    (4, b"wide"),  # QuickTime
+    (4, b"free"),  # QuickTime
+    (4, b"skip"),  # QuickTime
+    (4, b"pnot"),  # QuickTime
+    (8, b"WEBP"),  # WebP (RIFF)
+    (8, b"AVI "),  # AVI (RIFF)
+    (8, b"WAVE"),  # WAV (RIFF)
+    (0, b"\x1a\x45\xdf\xa3"),  # Matroska, WebM
+    (0, b"\x00\x00\x01\xba"),  # MPEG program stream
+    (0, b"ID3"),  # MP3
+    (0, b"fLaC"),  # FLAC
+    (0, b"OggS"),  # Ogg
+]
+
+
+def is_media_file(filepath) -> bool:
+    """Return True if the first bytes of filepath match a known image, video, or audio file signature"""
+    try:
+        with open(filepath, "rb") as fd:
+            header = fd.read(MAGIC_READ_SIZE)
+    except OSError:
+        return False
+    return any(
+        header.startswith(signature, offset) for offset, signature in MEDIA_SIGNATURES
+    )
+
+
+def _normalize_ext(ext: str) -> str:
+    """Return ext in lower case with leading '.', e.g. 'JPG' -> '.jpg'"""
+    ext = ext.lower()
+    return ext if ext.startswith(".") else f".{ext}"
+
+
+class FileFilter:
+    """Decide which files and directories found while walking a directory tree are processed
+
+    A file is processed if its extension is in include_ext (if given) and not in exclude_ext,
+    it matches one of include_glob (if given) and none of exclude_glob, and, if media_only is True,
+    its content is recognized as an image, video or audio file. Directories matching exclude_glob
+    are not walked. Glob patterns containing '/' are matched against the full path,
+    other patterns are matched against the file or directory name.
+    """
+
+    def __init__(
+        self,
+        include_ext: Optional[Iterable[str]] = None,
+        exclude_ext: Optional[Iterable[str]] = None,
+        include_glob: Optional[Iterable[str]] = None,
+        exclude_glob: Optional[Iterable[str]] = None,
+        media_only: bool = False,
+    ):
+        """Args:
+        include_ext: extensions of files to process, e.g. ["jpg", ".heic"]; case-insensitive
+        exclude_ext: extensions of files to skip; case-insensitive
+        include_glob: glob patterns of files to process, e.g. ["IMG_*"]
+        exclude_glob: glob patterns of files and directories to skip, e.g. ["*.fcpcache", "Render Files"]
+        media_only: only process files whose content is recognized as an image, video or audio file
+        """
+        self.include_ext = {_normalize_ext(ext) for ext in include_ext or []}
+        self.exclude_ext = {_normalize_ext(ext) for ext in exclude_ext or []}
+        self.include_glob = list(include_glob or [])
+        self.exclude_glob = list(exclude_glob or [])
+        self.media_only = media_only
+        # number of files rejected by the filter
+        self.rejected = 0
+
+    def __bool__(self):
+        """return True if any filter is set"""
+        return bool(
+            self.include_ext
+            or self.exclude_ext
+            or self.include_glob
+            or self.exclude_glob
+            or self.media_only
+        )
+
+    def match_file(self, filepath) -> bool:
+        """Return True if file at filepath should be processed"""
+        if self._match_file(os.fspath(filepath)):
+            return True
+        self.rejected += 1
+        return False
+
+    def match_directory(self, dirpath) -> bool:
+        """Return True if directory at dirpath should be walked"""
+        return not self.exclude_glob or not _match_any(
+            os.fspath(dirpath), self.exclude_glob
+        )
+
+    def _match_file(self, filepath: str) -> bool:
+        # cheapest checks first; only read the file if all others pass
+        if self.include_ext or self.exclude_ext:
+            ext = os.path.splitext(filepath)[1].lower()
+            if self.include_ext and ext not in self.include_ext:
+                return False
+            if ext in self.exclude_ext:
+                return False
+        if self.include_glob and not _match_any(filepath, self.include_glob):
+            return False
+        if self.exclude_glob and _match_any(filepath, self.exclude_glob):
+            return False
+        if self.media_only and not is_media_file(filepath):
+            return False
+        return True
+
+
+def _match_any(path: str, patterns: Iterable[str]) -> bool:
+    """Return True if path matches any of the glob patterns"""
+    name = os.path.basename(path)
+    return any(
+        fnmatch.fnmatch(path if "/" in pattern else name, pattern)
+        for pattern in patterns
+    )
@@ -0,0 +1,39 @@
+""" Read lists of file paths, e.g. from find or fd, as a stream """
+
+import os
+from typing import BinaryIO, Iterator
+
+# number of bytes read at a time
+READ_SIZE = 65536
+
+
+def read_paths(fd: BinaryIO, null: bool = False) -> Iterator[str]:
+    """Yield each path listed in binary file fd as it is read
+
+    Args:
+        fd: file opened in binary mode, e.g. sys.stdin.buffer
+        null: if True, paths are separated by NUL characters (e.g. find -print0) otherwise by newlines
+
+    Empty entries are skipped. Only the path being read is held in memory so
+    memory use does not depend on the number of paths.
+    """
+    separator = b"\0" if null else b"\n"
+    # read1 returns whatever is available so paths are processed while a slow producer (e.g. find) runs
+    read = getattr(fd, "read1", fd.read)
+    buffer = b""
+    while chunk := read(READ_SIZE):
+        buffer += chunk
+        *paths, buffer = buffer.split(separator)
+        for path in paths:
+            if path := _decode(path, null):
+                yield path
+    if path := _decode(buffer, null):
+        yield path
+
+
+def _decode(path: bytes, null: bool) -> str:
+    """Return path decoded with the file system encoding"""
+    if not null:
+        # lists written on Windows or by some tools have CRLF line endings
+        path = path.rstrip(b"\r")
+    return os.fsdecode(path)
@@ -0,0 +1,106 @@
+""" Append-only journal of completed files, used to resume interrupted runs """
+
+import os
+import threading
+from typing import Set
+
+# number of completed files to buffer before appending them to the journal
+JOURNAL_FLUSH_INTERVAL = 100
+
+# each entry in the journal is an absolute path followed by this terminator;
+# an entry without a terminator (e.g. from a crash while writing) is ignored
+_TERMINATOR = b"\0"
+
+
+def _journal_key(filepath) -> str:
+    """Return key for filepath used in the journal"""
+    return os.path.abspath(os.fsdecode(filepath))
+
+
+class Journal:
+    """Append-only journal of completed files
+
+    Entries already in the journal are loaded into a set when it is opened so checking
+    whether a file was completed is O(1). New entries are appended in batches.
+    """
+
+    def __init__(
+        self, path, flush_interval: int = JOURNAL_FLUSH_INTERVAL, load: bool = True
+    ):
+        """Open journal at path, creating it if it does not exist
+
+        Args:
+            path: path to the journal file
+            flush_interval: number of completed files to buffer before appending them to the journal
+            load: if True (default), load the entries already in the journal and remove any incomplete
+                entry at the end; if False, only append to the journal, e.g. in worker processes sharing
+                a journal that was loaded once by the parent process
+        """
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self._completed = self._load() if load else set()
+        self.loaded = len(self._completed)
+        self.skipped = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def __len__(self):
+        return len(self._completed)
+
+    def completed(self, filepath) -> bool:
+        """Return True if filepath is recorded in the journal as completed"""
+        if _journal_key(filepath) in self._completed:
+            self.skipped += 1
+            return True
+        return False
+
+    def record(self, filepath):
+        """Record filepath as completed"""
+        key = _journal_key(filepath)
+        with self._lock:
+            if key in self._completed:
+                return
+            self._completed.add(key)
+            self._pending.append(key)
+            if len(self._pending) >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        """Append buffered entries to the journal and sync it to disk"""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """Flush buffered entries and close the journal"""
+        with self._lock:
+            if self._fd is None:
+                return
+            self._flush()
+            os.close(self._fd)
+            self._fd = None
+
+    def _load(self) -> Set[str]:
+        """Return set of the entries in the journal, removing any incomplete entry at the end"""
+        try:
+            with open(self.path, "rb") as fd:
+                data = fd.read()
+        except FileNotFoundError:
+            return set()
+        end = data.rfind(_TERMINATOR) + 1
+        if end < len(data):
+            # so the next entry appended is not joined to the incomplete one
+            os.truncate(self.path, end)
+        return {os.fsdecode(entry) for entry in data[:end].split(_TERMINATOR)[:-1]}
+
+    def _flush(self):
+        """Append pending entries with a single write; caller must hold lock"""
+        if not self._pending:
+            return
+        data = b"".join(os.fsencode(key) + _TERMINATOR for key in self._pending)
+        # single write so entries from processes sharing the journal are not interleaved
+        written = os.write(self._fd, data)
+        while written < len(data):
+            written += os.write(self._fd, data[written:])
+        os.fsync(self._fd)
+        self._pending = []
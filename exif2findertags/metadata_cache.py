@@ -0,0 +1,300 @@
+""" Persistent on-disk cache of metadata read by exiftool, stored in a SQLite database """
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+# number of inserts between checks of the cache size
+EVICTION_CHECK_INTERVAL = 1000
+
+# number of cache hits to record before updating last access time in the database
+ACCESS_FLUSH_INTERVAL = 1000
+
+# seconds to wait for another process (e.g. a --jobs worker) to release its lock on the database
+CACHE_BUSY_TIMEOUT = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    exiftool_version TEXT NOT NULL,
+    read_profile TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    data BLOB NOT NULL,
+    data_size INTEGER NOT NULL,
+    last_access INTEGER NOT NULL,
+    PRIMARY KEY (dev, ino, exiftool_version, read_profile)
+);
+CREATE INDEX IF NOT EXISTS metadata_last_access ON metadata (last_access);
+"""
+
+
+def read_profile(read_args: Optional[List[str]]) -> str:
+    """Return str identifying the set of tags read by exiftool for read_args (see ExifTool)"""
+    return "\n".join(read_args or [])
+
+
+class MetadataCache:
+    """Persistent cache of exiftool metadata keyed by file identity
+
+    Entries are keyed by the file's device and inode, the exiftool version and the read profile
+    (the tags requested from exiftool) and are only valid while the file's size and modification
+    time are unchanged. Metadata is stored as compressed JSON. If max_size is set, least recently
+    used entries are evicted once the total size of the stored metadata exceeds max_size.
+
+    The database may be shared by several processes; if it stays locked by another process,
+    get() returns None and set() does not store the metadata, as for a cache miss.
+    """
+
+    def __init__(
+        self, dbpath: str, exiftool_version: str, max_size: Optional[int] = None
+    ):
+        """Open or create a metadata cache
+
+        Args:
+            dbpath: path to the SQLite database file
+            exiftool_version: version of exiftool used to read metadata; entries for other versions are ignored
+            max_size: optional maximum size in bytes of the stored metadata
+        """
+        self.dbpath = str(dbpath)
+        self.exiftool_version = str(exiftool_version)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.dbpath,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=CACHE_BUSY_TIMEOUT,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._total_size = self._conn.execute(
+            "SELECT COALESCE(SUM(data_size), 0) FROM metadata"
+        ).fetchone()[0]
+        self._inserts = 0
+        self._accessed = []
+
+    def get(self, filepath, read_args: Optional[List[str]] = None) -> Optional[Dict]:
+        """Return cached metadata dict for filepath or None if not cached or file has changed"""
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        profile = read_profile(read_args)
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT size, mtime_ns, data FROM metadata "
+                    "WHERE dev = ? AND ino = ? AND exiftool_version = ? AND read_profile = ?",
+                    (stat.st_dev, stat.st_ino, self.exiftool_version, profile),
+                ).fetchone()
+            except sqlite3.Error as e:
+                logging.warning(f"Error reading metadata cache {self.dbpath}: {e}")
+                row = None
+            if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime_ns:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._accessed.append(
+                (
+                    time.time_ns(),
+                    stat.st_dev,
+                    stat.st_ino,
+                    self.exiftool_version,
+                    profile,
+                )
+            )
+            if len(self._accessed) >= ACCESS_FLUSH_INTERVAL:
+                try:
+                    self._flush_accessed()
+                except sqlite3.Error as e:
+                    # last access times are only used to choose entries to evict
+                    logging.warning(f"Error updating metadata cache {self.dbpath}: {e}")
+                    self._accessed = []
+        exifdict = json.loads(zlib.decompress(row[2]))
+        # the cached path may differ (e.g. file was moved or accessed via a different path)
+        exifdict["SourceFile"] = os.fsdecode(filepath)
+        return exifdict
+
+    def set(self, filepath, exifdict: Dict, read_args: Optional[List[str]] = None):
+        """Store metadata dict for filepath"""
+        self.set_many([(filepath, exifdict)], read_args=read_args)
+
+    def set_many(
+        self, items: List[Tuple[object, Dict]], read_args: Optional[List[str]] = None
+    ):
+        """Store metadata for multiple files in a single transaction
+
+        Args:
+            items: list of (filepath, exifdict) tuples
+            read_args: exiftool arguments used to read the metadata
+        """
+        profile = read_profile(read_args)
+        now = time.time_ns()
+        rows = []
+        for filepath, exifdict in items:
+            try:
+                stat = os.stat(filepath)
+            except OSError:
+                continue
+            data = zlib.compress(
+                json.dumps(exifdict, separators=(",", ":")).encode("utf-8")
+            )
+            rows.append(
+                (
+                    stat.st_dev,
+                    stat.st_ino,
+                    self.exiftool_version,
+                    profile,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    os.path.abspath(os.fsdecode(filepath)),
+                    data,
+                    len(data),
+                    now,
+                )
+            )
+        if not rows:
+            return
+
+        with self._lock:
+            size_change = 0
+            try:
+                with self._conn:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    for row in rows:
+                        old = self._conn.execute(
+                            "SELECT data_size FROM metadata "
+                            "WHERE dev = ? AND ino = ? AND exiftool_version = ? AND read_profile = ?",
+                            row[:4],
+                        ).fetchone()
+                        if old:
+                            size_change -= old[0]
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            row,
+                        )
+                        size_change += row[8]
+            except sqlite3.Error as e:
+                # metadata will be read again by exiftool next time, as for a cache miss
+                logging.warning(f"Error writing metadata cache {self.dbpath}: {e}")
+                return
+            self._total_size += size_change
+            self._inserts += len(rows)
+            if self._inserts >= EVICTION_CHECK_INTERVAL:
+                self._inserts = 0
+                try:
+                    self._evict()
+                except sqlite3.Error as e:
+                    logging.warning(
+                        f"Error evicting from metadata cache {self.dbpath}: {e}"
+                    )
+
+    def prune(self) -> int:
+        """Remove entries for files that no longer exist or have changed, evict entries
+        in excess of max_size, and compact the database
+
+        Returns: number of entries removed
+        """
+        removed = 0
+        with self._lock:
+            self._flush_accessed()
+            stale = []
+            for rowid, path, dev, ino, size, mtime_ns in self._conn.execute(
+                "SELECT rowid, path, dev, ino, size, mtime_ns FROM metadata"
+            ).fetchall():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    stale.append((rowid,))
+                    continue
+                if (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns) != (
+                    dev,
+                    ino,
+                    size,
+                    mtime_ns,
+                ):
+                    stale.append((rowid,))
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("DELETE FROM metadata WHERE rowid = ?", stale)
+            removed = len(stale)
+            self._total_size = self._conn.execute(
+                "SELECT COALESCE(SUM(data_size), 0) FROM metadata"
+            ).fetchone()[0]
+            removed += self._evict()
+            self._conn.execute("VACUUM")
+        return removed
+
+    def stats(self) -> Dict:
+        """Return dict with cache statistics"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+        return {
+            "entries": entries,
+            "size": self._total_size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        """Write any pending updates and close the database"""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_accessed()
+            self._evict()
+            self._conn.close()
+            self._conn = None
+
+    def _flush_accessed(self):
+        """Update last access time of entries read from the cache; caller must hold lock"""
+        if not self._accessed:
+            return
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE metadata SET last_access = ? "
+                "WHERE dev = ? AND ino = ? AND exiftool_version = ? AND read_profile = ?",
+                self._accessed,
+            )
+        self._accessed = []
+
+    def _evict(self) -> int:
+        """Evict least recently used entries until total size <= max_size; caller must hold lock
+
+        Returns: number of entries evicted
+        """
+        if not self.max_size or self._total_size <= self.max_size:
+            return 0
+        self._flush_accessed()
+        evicted = []
+        total_size = self._total_size
+        for rowid, data_size in self._conn.execute(
+            "SELECT rowid, data_size FROM metadata ORDER BY last_access"
+        ):
+            if total_size <= self.max_size:
+                break
+            evicted.append((rowid,))
+            total_size -= data_size
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM metadata WHERE rowid = ?", evicted)
+        self._total_size = total_size
+        self.evictions += len(evicted)
+        logging.debug(f"Evicted {len(evicted)} entries from metadata cache")
+        return len(evicted)
@@ -0,0 +1,66 @@
+""" Read-only view of one file's metadata shared by every template and tag lookup for the file
+
+ExifTool returns tags keyed by group and tag name, e.g. "IPTC:Keywords". A MetadataView
+indexes each tag once under both its grouped and bare name, case-insensitively, and holds
+the values already converted to lists of strings so rendering several templates for a file
+does not repeatedly copy and convert the metadata.
+"""
+
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# "(Binary data " is a hack workaround for "(Binary data 0 bytes, use -b option to extract)" error that happens
+# when exporting video with keywords on Photos 5.0 / Catalina
+BINARY_DATA_PREFIX = "(Binary data "
+
+
+def exif_values_to_strings(value) -> List[str]:
+    """Convert a value returned by ExifTool to a list of str, filtering out binary data placeholders"""
+    values = value if isinstance(value, list) else [value]
+    return [str(v) for v in values if not str(v).startswith(BINARY_DATA_PREFIX)]
+
+
+class MetadataView:
+    """Metadata for a single file with O(1) case-insensitive lookup by "group:tag" or bare "tag"
+
+    When a bare tag name occurs in more than one group, the value from the last group returned
+    by exiftool is used, as with ExifTool.asdict_merged(). Values returned by the view are shared
+    and must not be modified.
+    """
+
+    def __init__(self, exifdict: Dict[str, Any]):
+        """Create view of exifdict, a dict of tags with tag groups as returned by ExifTool.asdict()"""
+        merged = {re.sub(r".*:", "", tag): value for tag, value in exifdict.items()}
+        merged.update(exifdict)
+
+        # lower case tag name: (tag name, value as returned by exiftool, value as list of str)
+        self._tags: Dict[str, Tuple[str, Any, List[str]]] = {
+            tag.lower(): (tag, value, exif_values_to_strings(value))
+            for tag, value in merged.items()
+        }
+        self._grouped = [(tag, self._tags[tag.lower()][2]) for tag in exifdict]
+
+    def __contains__(self, tag: str) -> bool:
+        return tag.lower() in self._tags
+
+    def __len__(self) -> int:
+        return len(self._grouped)
+
+    def tag_name(self, tag: str) -> Optional[str]:
+        """Return name of tag as returned by exiftool, e.g. "Keywords" for "keywords", or None if not found"""
+        entry = self._tags.get(tag.lower())
+        return entry[0] if entry else None
+
+    def value(self, tag: str) -> Any:
+        """Return value of tag as returned by exiftool or None if not found"""
+        entry = self._tags.get(tag.lower())
+        return entry[1] if entry else None
+
+    def values(self, tag: str) -> List[str]:
+        """Return values of tag as list of str or empty list if not found"""
+        entry = self._tags.get(tag.lower())
+        return entry[2] if entry else []
+
+    def grouped_items(self) -> Iterator[Tuple[str, List[str]]]:
+        """Yield (tag with group, values as list of str) for each tag in the order returned by exiftool"""
+        return iter(self._grouped)
@@ -0,0 +1,138 @@
+""" Process files with ExifToFinder in a pool of worker processes """
+
+import concurrent.futures
+import itertools
+import multiprocessing.util
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from .exiftofinder import DEFAULT_BATCH_SIZE, ExifToFinder
+from .exiftool import ExifToolCaching
+from .journal import Journal
+
+# ExifToFinder used by this worker process, created by _init_worker()
+_worker_e2f = None
+
+
+def process_files_parallel(
+    filenames: Iterable,
+    jobs: int,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    verbose: bool = False,
+    on_error: Optional[Callable[[str, str], None]] = None,
+    **kwargs,
+) -> int:
+    """Process files with ExifToFinder in jobs worker processes
+
+    Each worker creates its own ExifToFinder and therefore runs its own exiftool process
+    and template parser. filenames is consumed lazily: files are sent to the workers
+    in batches of batch_size as they are produced so walking directories overlaps with processing.
+
+    Args:
+        filenames: iterable of paths of files to process
+        jobs: number of worker processes
+        batch_size: number of files sent to a worker at a time, read with a single exiftool call
+        verbose: if True, workers print verbose output
+        on_error: optional callable called with (filename, error message) for each file that could not be processed
+        kwargs: arguments passed to ExifToFinder in each worker
+
+    Returns: number of files updated
+    """
+    on_error = on_error or (lambda filename, error: None)
+    files_updated = 0
+
+    journal = None
+    if kwargs.get("journal_path"):
+        # load the journal once here: workers only append to it as truncating an
+        # incomplete entry while other workers append could lose completed entries
+        journal = Journal(kwargs["journal_path"])
+        if verbose:
+            print(
+                f"Resuming with journal {journal.path}: {len(journal)} files already completed"
+            )
+        filenames = (
+            filename for filename in filenames if not journal.completed(filename)
+        )
+
+    def _collect(futures):
+        nonlocal files_updated
+        for future in futures:
+            batch = pending.pop(future)
+            try:
+                updated, errors = future.result()
+            except Exception as e:
+                # worker died; none of the files in its batch are known to have been processed
+                errors = [(str(filename), str(e)) for filename in batch]
+                updated = 0
+            files_updated += updated
+            for filename, error in errors:
+                on_error(filename, error)
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(dict(kwargs, batch_size=batch_size), verbose),
+    ) as executor:
+        # future: batch of files
+        pending = {}
+        for batch in _batches(filenames, batch_size):
+            pending[executor.submit(_process_batch, batch)] = batch
+            # keep each worker busy without queueing up the whole directory tree
+            if len(pending) >= 2 * jobs:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                _collect(done)
+        _collect(list(pending))
+    if journal is not None:
+        if verbose:
+            print(f"Journal: skipped {journal.skipped} completed files")
+        journal.close()
+    return files_updated
+
+
+def _batches(iterable, size):
+    """Yield lists of up to size items from iterable"""
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _init_worker(kwargs, verbose):
+    """Create the ExifToFinder used by this worker process"""
+    global _worker_e2f
+    kwargs = dict(kwargs)
+    journal_path = kwargs.pop("journal_path", None)
+    _worker_e2f = ExifToFinder(
+        verbose=print if verbose else lambda *args: None, **kwargs
+    )
+    if journal_path:
+        # completed files were left out by process_files_parallel()
+        _worker_e2f.journal = Journal(journal_path, load=False)
+    # stop exiftool and close the metadata cache when the worker exits
+    multiprocessing.util.Finalize(_worker_e2f, _worker_e2f.close, exitpriority=10)
+
+
+def _process_batch(filenames) -> Tuple[int, List[Tuple[str, str]]]:
+    """Process a batch of files in a worker process
+
+    Returns: tuple of (number of files updated, list of (filename, error message) for files that failed)
+    """
+    e2f = _worker_e2f
+    filenames = e2f.unprocessed_files(filenames)
+    try:
+        ExifToolCaching.prefetch(
+            filenames, exiftool=e2f.exiftool_path, read_args=e2f.read_args
+        )
+    except OSError as e:
+        # files will be read individually
+        e2f.verbose(f"Error reading metadata with exiftool: {e}")
+
+    files_updated = 0
+    errors = []
+    for filename in filenames:
+        e2f.verbose(f"Processing file {filename}")
+        try:
+            files_updated += e2f.process_file(filename)
+        except Exception as e:
+            errors.append((str(filename), str(e)))
+    return files_updated, errors
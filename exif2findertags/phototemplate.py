@@ -1,5 +1,6 @@
 """ Custom template system for osxphotos, implements osxphotos template language (OTL) """
 
+import collections
 import datetime
 
 # import json
@@ -10,8 +11,9 @@ import pathlib
 import shlex
 
 # import sys
+import threading
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, Union
+from typing import Iterable, List, Optional, Tuple, Union
 
 from textx import TextXSyntaxError, metamodel_from_file
 
@@ -19,6 +21,7 @@ from ._version import __version__
 from .datetime_formatter import DateTimeFormatter
 from .exiftool import ExifTool, ExifToolCaching
 from .path_utils import sanitize_dirname, sanitize_filename, sanitize_pathpart
+from .template_parser import parse_template
 from .text_detection import detect_text
 
 # from .text_detection import detect_text
@@ -32,6 +35,9 @@ OTL_GRAMMAR_MODEL = str(pathlib.Path(__file__).parent / "phototemplate.tx")
 
 NONE_STR_SENTINEL = "__XYZZY_PHOTO_TEMPLATE_NONE_XYZZY__"
 
+# maximum number of parsed templates cached by PhotoTemplateParser
+TEMPLATE_CACHE_MAX_ENTRIES = 256
+
 TEXT_DETECTION_CONFIDENCE_THRESHOLD = 0.7
 
 DATETIME_SUBFIELDS = [
@@ -50,6 +56,23 @@ DATETIME_SUBFIELDS = [
     "strftime",
 ]
 
+# exiftool tags used for {created} and {modified}, in order of preference
+CREATED_DATE_TAGS = [
+    "Composite:SubSecDateTimeOriginal",
+    "Composite:DateTimeCreated",
+    "QuickTime:CreationDate",
+    "QuickTime:CreateDate",
+    "EXIF:DateTimeOriginal",
+    "EXIF:CreateDate",
+    "IPTC:DateCreated",
+]
+
+MODIFIED_DATE_TAGS = [
+    "Composite:SubSecModifyDate",
+    "EXIF:ModifyDate",
+    "QuickTime:ModifyDate",
+]
+
 # Permitted substitutions (each of these returns a single value or None)
 TEMPLATE_SUBSTITUTIONS = {
     "{created}": "Photo's creation date if set in the EXIF data, otherwise null; ISO 8601 format",
@@ -259,14 +282,99 @@ class PhotoTemplateParser:
     def __init__(self):
         """return existing singleton or create a new one"""
 
-        if hasattr(self, "metamodel"):
+        if hasattr(self, "_models"):
             return
 
-        self.metamodel = metamodel_from_file(OTL_GRAMMAR_MODEL, skipws=False)
+        # textX metamodel, only built if needed as it is slow to build
+        self._metamodel = None
+
+        # least recently used cache of [parsed model, compiled render function or None if not yet compiled]
+        # keyed by template string; models are not modified when rendered so may be shared
+        self.max_entries = TEMPLATE_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._models = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def metamodel(self):
+        """textX metamodel for the template grammar"""
+        if self._metamodel is None:
+            self._metamodel = metamodel_from_file(OTL_GRAMMAR_MODEL, skipws=False)
+        return self._metamodel
+
+    def parse_textx(self, template_statement):
+        """Parse a template_statement string with textX; this is the reference parser
+        for parse_template(), which parse() uses, and is not cached
+
+        Raises: TextXSyntaxError if template_statement is not a valid template
+        """
+        return self.metamodel.model_from_str(template_statement)
 
     def parse(self, template_statement):
-        """Parse a template_statement string"""
-        return self.metamodel.model_from_str(template_statement)
+        """Parse a template_statement string; parsed templates are cached
+
+        Raises: TextXSyntaxError if template_statement is not a valid template
+        """
+        return self._cached(template_statement)[0]
+
+    def compile(self, template_statement):
+        """Return function that renders template_statement, see compile_statement(); compiled templates are cached
+
+        Raises: TextXSyntaxError if template_statement is not a valid template
+        """
+        entry = self._cached(template_statement)
+        if entry[1] is None:
+            entry[1] = compile_statement(entry[0])
+        return entry[1]
+
+    def _cached(self, template_statement):
+        """Return cache entry [model, compiled] for template_statement, parsing it if not cached"""
+        with self._lock:
+            try:
+                entry = self._models[template_statement]
+            except KeyError:
+                self.misses += 1
+            else:
+                self._models.move_to_end(template_statement)
+                self.hits += 1
+                return entry
+
+            try:
+                model = parse_template(template_statement)
+            except TextXSyntaxError:
+                # textX reports the syntax error with the expected rules
+                model = self.parse_textx(template_statement)
+            entry = [model, None]
+            self._models[template_statement] = entry
+            while len(self._models) > self.max_entries:
+                self._models.popitem(last=False)
+                self.evictions += 1
+            return entry
+
+    def validate(self, template_statement):
+        """Parse template_statement so syntax errors are found before it is rendered
+
+        Raises: ValueError if template_statement is not a valid template
+        """
+        try:
+            self.parse(template_statement)
+        except TextXSyntaxError as e:
+            raise ValueError(
+                f"Invalid template syntax for template '{template_statement}': SyntaxError: {e}"
+            ) from e
+
+    def cache_stats(self):
+        """Return dict of statistics for the parsed template cache: entries, max_entries, hits, misses, evictions"""
+        with self._lock:
+            return {
+                "entries": len(self._models),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
 
     def fields(self, template_statement):
         """Return list of fields found in a template statement; does not verify that fields are valid"""
@@ -296,6 +404,10 @@ class PhotoTemplate:
         # gets initialized in get_template_value
         self.today = None
 
+        # holds (created, modified) dates of the photo for {created.x} and {modified.x} fields
+        # gets initialized in get_template_value and reset if a different exiftool is set
+        self._dates = None
+
         # get parser singleton
         self.parser = PhotoTemplateParser()
 
@@ -315,9 +427,22 @@ class PhotoTemplate:
         self.filepath = options.filepath
         self.quote = options.quote
         self.dest_path = options.dest_path
-        self.exiftool = options.exiftool or ExifToolCaching(
-            self.photopath, exiftool=self.exiftool_path
-        )
+        # ExifToolCaching instance is created when first needed if not passed in options
+        self._exiftool = options.exiftool
+
+    @property
+    def exiftool(self):
+        """ExifTool instance for the photo; uses ExifToolCaching if not set in RenderOptions"""
+        if self._exiftool is None:
+            self._exiftool = ExifToolCaching(
+                self.photopath, exiftool=self.exiftool_path
+            )
+        return self._exiftool
+
+    @property
+    def metadata(self):
+        """MetadataView of the photo's metadata, shared by all lookups for the photo"""
+        return self.exiftool.metadata_view()
 
     def render(
         self,
@@ -337,9 +462,47 @@ class PhotoTemplate:
         if type(template) is not str:
             raise TypeError(f"template must be type str, not {type(template)}")
 
+        self._set_options(options)
+        self._set_tag(options.tag)
+        return self._render(template)
+
+    def render_many(
+        self,
+        templates: Iterable[Tuple[str, Optional[str]]],
+        options: RenderOptions,
+    ) -> List[List[str]]:
+        """Render several templates for the photo with the same options
+
+        Per-photo values such as the created and modified dates are computed once for all
+        templates, so this is faster than calling render() for each template.
+
+        Args:
+            templates: iterable of (template, tag) where tag is the tag name used for {TAG},
+                {GROUP} and {VALUE} in place of options.tag
+            options: a RenderOptions instance
+
+        Returns:
+            list of the list of rendered strings for each template
+
+        Raises:
+            ValueError if a template is invalid
+        """
+        self._set_options(options)
+        results = []
+        for template, tag in templates:
+            self._set_tag(tag)
+            try:
+                rendered, _ = self._render(template)
+            except ValueError as e:
+                raise ValueError(
+                    f"Invalid template syntax for template '{template}': {e}"
+                ) from e
+            results.append(rendered)
+        return results
+
+    def _set_options(self, options: RenderOptions):
+        """Set the options used to render templates"""
         self.options = options
-        self.tag = options.tag
-        self.group, self.tagname = split_group_tag(self.tag) if self.tag else ("", "")
         self.inplace_sep = options.inplace_sep
         self.none_str = options.none_str
         self.expand_inplace = options.expand_inplace
@@ -347,22 +510,26 @@ class PhotoTemplate:
         self.dirname = options.dirname
         self.strip = options.strip
         self.export_dir = options.export_dir
-        self.dest_path = options.dest_path
         self.filepath = options.filepath
         self.quote = options.quote
         self.dest_path = options.dest_path
-        self.exiftool = options.exiftool or self.exiftool
+        if options.exiftool is not None and options.exiftool is not self._exiftool:
+            self._exiftool = options.exiftool
+            self._dates = None
 
+    def _set_tag(self, tag: Optional[str]):
+        """Set the tag used for {TAG}, {GROUP} and {VALUE}"""
+        self.tag = tag
+        self.group, self.tagname = split_group_tag(tag) if tag else ("", "")
+
+    def _render(self, template: str):
+        """Render template with the current options; returns (rendered, unmatched) as with render()"""
         try:
-            model = self.parser.parse(template)
+            render_statement = self.parser.compile(template)
         except TextXSyntaxError as e:
             raise ValueError(f"SyntaxError: {e}")
 
-        if not model:
-            # empty string
-            return [], []
-
-        rendered, unmatched = self._render_statement(model)
+        rendered, unmatched = render_statement(self)
         rendered = [r for r in rendered if NONE_STR_SENTINEL not in r]
         return rendered, unmatched
 
@@ -370,6 +537,9 @@ class PhotoTemplate:
         self,
         statement,
     ):
+        """Render a parsed Statement by walking the model; render() uses the equivalent
+        compiled function from compile_statement() instead, this is kept as a reference
+        for testing the compiler"""
         results = []
         unmatched = []
         for ts in statement.template_strings:
@@ -646,8 +816,9 @@ class PhotoTemplate:
         # initialize today with current date/time if needed
         if self.today is None:
             self.today = datetime.datetime.now()
-        created = self.get_created_date()
-        modified = self.get_modified_date()
+        if self._dates is None:
+            self._dates = (self.get_created_date(), self.get_modified_date())
+        created, modified = self._dates
 
         value = None
 
@@ -932,8 +1103,7 @@ class PhotoTemplate:
         elif field == "strip":
             values = [v.strip() for v in default]
         elif field == "detected_text":
-            exifdict = self.exiftool.asdict(tag_groups=False)
-            orientation = exifdict.get("Orientation", None)
+            orientation = self.metadata.value("Orientation")
             values = _get_detected_text(
                 self.photopath, orientation=orientation, confidence=subfield
             )
@@ -958,25 +1128,16 @@ class PhotoTemplate:
     ):
         """Get template value for format "{EXIF:Model}" """
 
-        exifdict = self.exiftool.asdict(normalized=True)
-        exifdict_no_groups = self.exiftool.asdict(tag_groups=False, normalized=True)
-        exifdict = exifdict.copy()
-        exifdict.update(exifdict_no_groups)
-
         tag = tag.lower()
         tag_subfield = None
         if "." in tag:
             tag, tag_subfield = tag.split(".")
 
         values = []
-        if tag in exifdict:
-            values = exifdict[tag]
-            values = [values] if not isinstance(values, list) else values
-            values = [str(v) for v in values]
-
-            # "(Binary data " below is hack workaround for "(Binary data 0 bytes, use -b option to extract)" error that happens
-            # when exporting video with keywords on Photos 5.0 / Catalina
-            values = [v for v in values if not v.startswith("(Binary data ")]
+        metadata = self.metadata
+        if tag in metadata:
+            # binary data placeholders are already filtered out by MetadataView
+            values = list(metadata.values(tag))
 
             if tag_subfield:
                 # handle datetime formatting
@@ -1004,32 +1165,20 @@ class PhotoTemplate:
     def get_created_date(self):
         """Get created date from EXIF data or None"""
 
-        data = self.exiftool.asdict()
-        for tag in [
-            "Composite:SubSecDateTimeOriginal",
-            "Composite:DateTimeCreated",
-            "QuickTime:CreationDate",
-            "QuickTime:CreateDate",
-            "EXIF:DateTimeOriginal",
-            "EXIF:CreateDate",
-            "IPTC:DateCreated",
-        ]:
-            if tag in data:
-                return exiftool_date_to_datetime(data[tag])
+        metadata = self.metadata
+        for tag in CREATED_DATE_TAGS:
+            if tag in metadata:
+                return exiftool_date_to_datetime(metadata.value(tag))
         else:
             return None
 
     def get_modified_date(self):
         """Get modified date from EXIF data or None"""
 
-        data = self.exiftool.asdict()
-        for tag in [
-            "Composite:SubSecModifyDate",
-            "EXIF:ModifyDate",
-            "QuickTime:ModifyDate",
-        ]:
-            if tag in data:
-                return exiftool_date_to_datetime(data[tag])
+        metadata = self.metadata
+        for tag in MODIFIED_DATE_TAGS:
+            if tag in metadata:
+                return exiftool_date_to_datetime(metadata.value(tag))
         else:
             return None
 
@@ -1140,6 +1289,264 @@ class PhotoTemplate:
     #         return default
 
 
+def compile_statement(statement):
+    """Compile a parsed template Statement into a function that renders it
+
+    Which lookup method each field uses, filters, find/replace pairs, conditional operators,
+    and punctuation fields such as {comma} are resolved once here instead of on every render.
+
+    Returns: function render(phototemplate) -> ([rendered_strings], [unmatched]) that renders the
+    statement with the values and RenderOptions of PhotoTemplate phototemplate
+    """
+    if not statement:
+        # empty string
+        return lambda phototemplate: ([], [])
+
+    parts = [_compile_template_string(ts) for ts in statement.template_strings]
+
+    def render_statement(phototemplate):
+        results = []
+        unmatched = []
+        for part in parts:
+            results, unmatched = part(phototemplate, results, unmatched)
+        if phototemplate.filename:
+            results = [sanitize_filename(result) for result in results]
+        if phototemplate.strip:
+            results = [result.strip() for result in results]
+        return results, unmatched
+
+    return render_statement
+
+
+def _compile_template_string(ts):
+    """Return function render(phototemplate, results, unmatched) -> (results, unmatched)
+    for a TemplateString"""
+    pre = ts.pre or ""
+    post = ts.post or ""
+
+    if not ts.template:
+        text = pre + post
+
+        def render_text(phototemplate, results, unmatched):
+            return [result + text for result in results or [""]], unmatched or []
+
+        return render_text
+
+    template = ts.template
+    get_values = _compile_field(template.field, template.subfield)
+    filters = [
+        _compile_filter(filter_)
+        for filter_ in (template.filter.value if template.filter is not None else [])
+    ]
+    # if value is None, means format was {+field}
+    delim = (template.delim.value or "") if template.delim is not None else None
+    pairs = (
+        [(pair.find or "", pair.replace or "") for pair in template.findreplace.pairs]
+        if template.findreplace
+        else []
+    )
+
+    is_bool = template.bool is not None
+    render_bool = (
+        compile_statement(template.bool.value)
+        if is_bool and template.bool.value is not None
+        else None
+    )
+    has_default = template.default is not None
+    render_default = (
+        compile_statement(template.default.value)
+        if has_default and template.default.value is not None
+        else None
+    )
+
+    conditional_test = None
+    render_conditional = None
+    if template.conditional is not None:
+        conditional_test = _compile_conditional(
+            template.conditional.operator, template.conditional.negation
+        )
+        if template.conditional.value is not None:
+            render_conditional = compile_statement(template.conditional.value)
+
+    def render_field(phototemplate, results, unmatched):
+        results = results or [""]
+        unmatched = unmatched or []
+
+        bool_val = None
+        if is_bool:
+            if render_bool:
+                bool_val, u = render_bool(phototemplate)
+                unmatched.extend(u)
+            else:
+                # blank bool value
+                bool_val = [""]
+
+        if render_default:
+            default, u = render_default(phototemplate)
+            unmatched.extend(u)
+        else:
+            # blank default value if default given, otherwise no default
+            default = [""] if has_default else []
+
+        conditional_value = []
+        if conditional_test:
+            if render_conditional:
+                conditional_value, u = render_conditional(phototemplate)
+                unmatched.extend(u)
+            else:
+                # this shouldn't happen
+                conditional_value = [""]
+
+        vals = [val for val in get_values(phototemplate, default) if val is not None]
+
+        if delim is not None:
+            vals = [delim.join(sorted(vals))] if vals else []
+        elif phototemplate.expand_inplace:
+            vals = [phototemplate.inplace_sep.join(sorted(vals))] if vals else []
+
+        for filter_ in filters:
+            vals = filter_(vals)
+
+        if pairs:
+            new_vals = []
+            for val in vals:
+                for find, repl in pairs:
+                    val = val.replace(find, repl)
+                new_vals.append(val)
+            vals = new_vals
+
+        if conditional_test:
+            vals = conditional_test(vals, conditional_value)
+
+        if is_bool:
+            vals = default if not vals else bool_val
+        elif not vals:
+            vals = default or [phototemplate.none_str]
+
+        return [
+            result + pre + val + post for val in vals for result in results
+        ], unmatched
+
+    return render_field
+
+
+def _compile_field(field, subfield):
+    """Return function get_values(phototemplate, default) -> list of values for a template field"""
+    if field in PUNCTUATION:
+        value = PUNCTUATION[field]
+
+        def get_punctuation(phototemplate, default):
+            if phototemplate.filename:
+                return [sanitize_pathpart(value) or None]
+            if phototemplate.dirname:
+                return [sanitize_dirname(value) or None]
+            return [value]
+
+        return get_punctuation
+
+    if (
+        field in SINGLE_VALUE_SUBSTITUTIONS
+        or field.split(".")[0] in SINGLE_VALUE_SUBSTITUTIONS
+    ):
+        return lambda phototemplate, default: phototemplate.get_template_value(
+            field, default=default, subfield=subfield
+        )
+
+    if field in MULTI_VALUE_SUBSTITUTIONS:
+        return lambda phototemplate, default: phototemplate.get_template_value_multi(
+            field, subfield, default=default
+        )
+
+    if field.split(".")[0] in PATHLIB_SUBSTITUTIONS:
+        return lambda phototemplate, default: phototemplate.get_template_value_pathlib(
+            field
+        )
+
+    # assume it's an exif field in form "tag" or "group:tag"
+    exiftag = f"{field}:{subfield}" if subfield else f"{field}"
+    return lambda phototemplate, default: phototemplate.get_template_value_exiftool(
+        tag=exiftag
+    )
+
+
+# functions applied to each value by the filters in FILTER_VALUES
+_FILTER_FUNCTIONS = {
+    "lower": str.lower,
+    "upper": str.upper,
+    "strip": str.strip,
+    "capitalize": str.capitalize,
+    "titlecase": str.title,
+    "braces": lambda value: "{" + value + "}",
+    "parens": lambda value: "(" + value + ")",
+    "brackets": lambda value: "[" + value + "]",
+    "shell_quote": shlex.quote,
+}
+
+
+def _compile_filter(filter_):
+    """Return function that applies filter_ to a list of values"""
+    try:
+        function = _FILTER_FUNCTIONS[filter_]
+    except KeyError:
+
+        def unhandled_filter(values):
+            raise ValueError(f"Unhandled filter: {filter_}")
+
+        return unhandled_filter
+
+    return lambda values: [function(value) for value in values]
+
+
+def _compile_conditional(operator, negation):
+    """Return function test(values, conditional_value) -> ["True"] or [] for a conditional operator"""
+
+    def result(match):
+        return ["True"] if bool(match) != bool(negation) else []
+
+    def string_test(test_function):
+        def test(vals, conditional_value):
+            # process any "or" values separated by "|"
+            conditional_value = [
+                value for c in conditional_value for value in c.split("|")
+            ]
+            return result(
+                any(test_function(v, c) for c in conditional_value for v in vals)
+            )
+
+        return test
+
+    def comparison_test(test_function):
+        def test(vals, conditional_value):
+            if len(vals) != 1 or len(conditional_value) != 1:
+                raise ValueError(
+                    f"comparison operators may only be used with a single value: {vals} {conditional_value}"
+                )
+            try:
+                return result(
+                    test_function(float(vals[0]), float(conditional_value[0]))
+                )
+            except ValueError as e:
+                raise ValueError(
+                    f"comparison operators may only be used with values that can be converted to numbers: {vals} {conditional_value}"
+                )
+
+        return test
+
+    tests = {
+        "contains": string_test(lambda v, c: c in v),
+        "matches": string_test(lambda v, c: v == c),
+        "startswith": string_test(lambda v, c: v.startswith(c)),
+        "endswith": string_test(lambda v, c: v.endswith(c)),
+        "==": lambda vals, c: result(sorted(vals) == sorted(c)),
+        "!=": lambda vals, c: result(sorted(vals) != sorted(c)),
+        "<": comparison_test(lambda v, c: v < c),
+        "<=": comparison_test(lambda v, c: v <= c),
+        ">": comparison_test(lambda v, c: v > c),
+        ">=": comparison_test(lambda v, c: v >= c),
+    }
+    return tests.get(operator, lambda vals, conditional_value: vals)
+
+
 def split_group_tag(exiftag: str) -> Tuple[str, str]:
     """split the group and tag from an exiftool tag in format Group:Tag or Tag"""
     if ":" not in exiftag:
@@ -0,0 +1,54 @@
+""" Split files between several runs of exif2findertags with --shard """
+
+import hashlib
+import os
+
+
+class Shard:
+    """One of count shards; each file belongs to exactly one shard determined by a stable hash of its path
+
+    Files found by walking a directory are assigned by their path relative to that directory so
+    runs on machines that mount the directory at different paths agree on the shard of each file.
+    """
+
+    def __init__(self, index: int, count: int):
+        """Args:
+        index: number of this shard, 1 to count
+        count: total number of shards
+        """
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"invalid shard {index}/{count}")
+        self.index = index
+        self.count = count
+        # number of files seen and number of those in this shard
+        self.found = 0
+        self.assigned = 0
+
+    @classmethod
+    def parse(cls, value: str) -> "Shard":
+        """Return Shard from string 'i/N', e.g. '1/4'
+
+        Raises: ValueError if value is not a valid shard
+        """
+        try:
+            index, count = (int(part) for part in value.split("/"))
+        except ValueError as e:
+            raise ValueError(f"invalid shard '{value}', expected i/N, e.g. 1/4") from e
+        return cls(index, count)
+
+    def contains(self, relpath) -> bool:
+        """Return True if the file at relpath is in this shard"""
+        self.found += 1
+        if shard_index(relpath, self.count) == self.index:
+            self.assigned += 1
+            return True
+        return False
+
+    def __str__(self):
+        return f"{self.index}/{self.count}"
+
+
+def shard_index(relpath, count: int) -> int:
+    """Return the shard, 1 to count, that the file at relpath belongs to"""
+    digest = hashlib.blake2b(os.fsencode(relpath), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
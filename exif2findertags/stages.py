@@ -0,0 +1,207 @@
+""" Process files with ExifToFinder in a staged read/render/write pipeline """
+
+import itertools
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, List
+
+from .exiftool import ExifToolCaching
+
+# number of batches held in each queue between stages by default
+DEFAULT_QUEUE_SIZE = 2
+
+# seconds to wait on a full or empty queue before checking whether the pipeline was stopped
+_QUEUE_POLL_INTERVAL = 0.1
+
+# put in a stage's queue to tell one of its workers to exit
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """Statistics for a pipeline stage
+
+    name: name of the stage
+    workers: number of worker threads
+    files: number of files processed
+    busy_time: total seconds spent processing files, summed over all workers
+    """
+
+    name: str
+    workers: int
+    files: int = 0
+    busy_time: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """files processed per second of busy time with all workers running"""
+        return self.files * self.workers / self.busy_time if self.busy_time else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.name}: {self.files} files, {self.busy_time:.2f}s busy, "
+            f"{self.throughput:.1f} files/s with {self.workers} "
+            f"{'worker' if self.workers == 1 else 'workers'}"
+        )
+
+
+class _Stage:
+    """Worker threads that take batches from a bounded queue, process them, and pass them on"""
+
+    def __init__(self, name, workers, queue_size, process, pipeline):
+        self.name = name
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = StageStats(name=name, workers=workers)
+        self._process = process
+        self._pipeline = pipeline
+        self._stats_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def finish(self):
+        """Wait for the workers to process everything in the queue then stop them"""
+        for _ in self._threads:
+            self._pipeline._put(self.queue, _DONE)
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while (batch := self._pipeline._get(self.queue)) is not _DONE:
+            start = time.perf_counter()
+            try:
+                result = self._process(batch)
+            except Exception as e:
+                self._pipeline._fail(e)
+                return
+            with self._stats_lock:
+                self.stats.files += len(batch)
+                self.stats.busy_time += time.perf_counter() - start
+            self._pipeline._forward(self, result)
+
+
+class StagedPipeline:
+    """Process files in three stages that run concurrently, each with its own worker threads:
+
+    read: read metadata for a batch of files with a single exiftool call
+    render: render Finder tags, comments, and extended attributes from the metadata (ExifToFinder.render_file)
+    write: write the rendered metadata to the files (ExifToFinder.write_file)
+
+    Stages are connected by bounded queues so a slow stage holds back the stages before it
+    instead of metadata piling up in memory. While one batch is read, the previous batch is
+    rendered and the batch before that is written.
+    """
+
+    def __init__(
+        self,
+        e2f,
+        read_workers: int = 1,
+        render_workers: int = 1,
+        write_workers: int = 1,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ):
+        """Args:
+        e2f: ExifToFinder used to render and write metadata
+        read_workers: number of threads reading metadata; each uses its own exiftool process
+        render_workers: number of threads rendering metadata
+        write_workers: number of threads writing metadata to files
+        queue_size: maximum number of batches waiting in the queue in front of each stage
+        """
+        for workers in (read_workers, render_workers, write_workers):
+            if workers < 1:
+                raise ValueError("number of workers for each stage must be >= 1")
+        self.e2f = e2f
+        self.files_updated = 0
+        self._error = None
+        self._stopped = threading.Event()
+        self._updated_lock = threading.Lock()
+        self._stages = [
+            _Stage("read", read_workers, queue_size, self._read, self),
+            _Stage("render", render_workers, queue_size, self._render, self),
+            _Stage("write", write_workers, queue_size, self._write, self),
+        ]
+
+    @property
+    def stats(self) -> List[StageStats]:
+        """StageStats for the read, render, and write stages"""
+        return [stage.stats for stage in self._stages]
+
+    def run(self, filenames: Iterable, batch_size: int) -> int:
+        """Process filenames in batches of batch_size, consuming filenames lazily
+
+        Returns: number of files updated
+
+        Raises: the first exception raised by any stage; processing stops when a stage fails
+        """
+        for stage in self._stages:
+            stage.start()
+        iterator = iter(filenames)
+        while not self._stopped.is_set() and (
+            batch := list(itertools.islice(iterator, batch_size))
+        ):
+            self._put(self._stages[0].queue, batch)
+        for stage in self._stages:
+            stage.finish()
+        if self._error is not None:
+            raise self._error
+        return self.files_updated
+
+    def _read(self, filenames):
+        filenames = self.e2f.unprocessed_files(filenames)
+        ExifToolCaching.prefetch(
+            filenames, exiftool=self.e2f.exiftool_path, read_args=self.e2f.read_args
+        )
+        return filenames
+
+    def _render(self, filenames):
+        return [(filename, self.e2f.render_file(filename)) for filename in filenames]
+
+    def _write(self, rendered):
+        files_updated = sum(
+            self.e2f.write_file(filename, metadata) for filename, metadata in rendered
+        )
+        with self._updated_lock:
+            self.files_updated += files_updated
+        return None
+
+    def _forward(self, stage, result):
+        """Pass result of stage to the next stage"""
+        index = self._stages.index(stage)
+        if index + 1 < len(self._stages):
+            self._put(self._stages[index + 1].queue, result)
+
+    def _fail(self, error):
+        """Stop the pipeline, keeping the first error"""
+        with self._updated_lock:
+            if self._error is None:
+                self._error = error
+        self._stopped.set()
+
+    def _put(self, q, item):
+        """Put item in queue q, giving up if the pipeline is stopped"""
+        while True:
+            try:
+                q.put(item, timeout=_QUEUE_POLL_INTERVAL)
+                return
+            except queue.Full:
+                if self._stopped.is_set():
+                    # workers exit on their own once the pipeline is stopped
+                    return
+
+    def _get(self, q):
+        """Get item from queue q or _DONE if the pipeline is stopped"""
+        while True:
+            try:
+                item = q.get(timeout=_QUEUE_POLL_INTERVAL)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    return _DONE
+                continue
+            return _DONE if self._stopped.is_set() else item
@@ -0,0 +1,67 @@
+""" Processing stamp stored in an extended attribute of each processed file
+
+The stamp records the version of exif2findertags, the configuration hash (see state_db.config_hash),
+and the size and modification time of the file when it was processed. Because it is stored with
+the file, it is copied along with the file's other extended attributes (e.g. with ditto or rsync -X).
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+import xattr
+
+from ._version import __version__
+
+# name of the extended attribute holding the stamp
+STAMP_XATTR = "com.rhettbull.exif2findertags.stamp"
+
+
+def read_stamp(filepath) -> Optional[Dict]:
+    """Return stamp dict for filepath or None if file has no valid stamp"""
+    try:
+        data = xattr.getxattr(os.fspath(filepath), STAMP_XATTR)
+        stamp = json.loads(data)
+    except (OSError, ValueError):
+        return None
+    return stamp if isinstance(stamp, dict) else None
+
+
+def write_stamp(filepath, config_hash: str):
+    """Write stamp for filepath processed with configuration config_hash
+
+    Raises: OSError if the extended attribute cannot be written
+    """
+    filepath = os.fspath(filepath)
+    stat = os.stat(filepath)
+    xattr.setxattr(
+        filepath,
+        STAMP_XATTR,
+        json.dumps(
+            _stamp(config_hash, stat.st_size, stat.st_mtime_ns),
+            separators=(",", ":"),
+        ).encode("utf-8"),
+    )
+
+
+def is_stamped(filepath, config_hash: str) -> bool:
+    """Return True if filepath was processed with configuration config_hash by this version
+    of exif2findertags and has not changed since"""
+    stamp = read_stamp(filepath)
+    if stamp is None:
+        return False
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return False
+    return stamp == _stamp(config_hash, stat.st_size, stat.st_mtime_ns)
+
+
+def _stamp(config_hash, size, mtime_ns):
+    """Return stamp dict"""
+    return {
+        "version": __version__,
+        "config": config_hash,
+        "size": size,
+        "mtime_ns": mtime_ns,
+    }
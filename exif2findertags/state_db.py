@@ -0,0 +1,153 @@
+""" Database of files already processed, used to skip unchanged files on incremental runs """
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List
+
+# number of processed files to record before writing them to the database
+RECORD_FLUSH_INTERVAL = 1000
+
+# maximum number of files looked up with a single query
+_LOOKUP_CHUNK_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    config_hash TEXT NOT NULL,
+    path TEXT NOT NULL,
+    processed_at INTEGER NOT NULL,
+    PRIMARY KEY (dev, ino)
+);
+"""
+
+
+def config_hash(config: Dict) -> str:
+    """Return hex digest identifying config, a JSON serializable dict of the settings that affect the output"""
+    data = json.dumps(config, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ProcessedFilesDB:
+    """Record of the files processed with a given configuration
+
+    Files are identified by device and inode and a file counts as processed only while its
+    size and modification time are unchanged and it was processed with the same configuration
+    hash (see config_hash), so changing any setting that affects the output invalidates every entry.
+    """
+
+    def __init__(self, dbpath: str, config_hash: str):
+        """Open or create a processed files database
+
+        Args:
+            dbpath: path to the SQLite database file
+            config_hash: hash of the current configuration; entries recorded with another hash are ignored
+        """
+        self.dbpath = str(dbpath)
+        self.config_hash = config_hash
+        self.skipped = 0
+        self.recorded = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.dbpath, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending = []
+
+    def unprocessed(self, filepaths: Iterable) -> List:
+        """Return list of the filepaths that have not been processed with the current configuration
+        or have changed since they were processed, in the same order as filepaths"""
+        stats = {}
+        for filepath in filepaths:
+            try:
+                stats[filepath] = os.stat(filepath)
+            except OSError:
+                # let the caller report the error
+                stats[filepath] = None
+
+        keys = list({(s.st_dev, s.st_ino) for s in stats.values() if s is not None})
+        processed = {}
+        with self._lock:
+            self._flush()
+            for i in range(0, len(keys), _LOOKUP_CHUNK_SIZE):
+                chunk = keys[i : i + _LOOKUP_CHUNK_SIZE]
+                where = " OR ".join(["(dev = ? AND ino = ?)"] * len(chunk))
+                for dev, ino, size, mtime_ns, hash_ in self._conn.execute(
+                    f"SELECT dev, ino, size, mtime_ns, config_hash FROM processed WHERE {where}",
+                    [value for key in chunk for value in key],
+                ):
+                    processed[(dev, ino)] = (size, mtime_ns, hash_)
+
+        unprocessed = []
+        for filepath, stat in stats.items():
+            if stat is not None and processed.get((stat.st_dev, stat.st_ino)) == (
+                stat.st_size,
+                stat.st_mtime_ns,
+                self.config_hash,
+            ):
+                self.skipped += 1
+            else:
+                unprocessed.append(filepath)
+        return unprocessed
+
+    def record(self, filepath):
+        """Record that filepath was processed with the current configuration"""
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return
+        with self._lock:
+            self._pending.append(
+                (
+                    stat.st_dev,
+                    stat.st_ino,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    self.config_hash,
+                    os.path.abspath(os.fsdecode(filepath)),
+                    time.time_ns(),
+                )
+            )
+            self.recorded += 1
+            if len(self._pending) >= RECORD_FLUSH_INTERVAL:
+                self._flush()
+
+    def stats(self) -> Dict:
+        """Return dict with database statistics"""
+        with self._lock:
+            self._flush()
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM processed WHERE config_hash = ?",
+                (self.config_hash,),
+            ).fetchone()[0]
+        return {"entries": entries, "skipped": self.skipped, "recorded": self.recorded}
+
+    def close(self):
+        """Write any pending records and close the database"""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush()
+            self._conn.close()
+            self._conn = None
+
+    def _flush(self):
+        """Write pending records to the database; caller must hold lock"""
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._pending,
+            )
+        self._pending = []
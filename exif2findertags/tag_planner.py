@@ -0,0 +1,166 @@
+""" Plan which tags exiftool needs to read to satisfy the requested Finder tags, comments, and templates """
+
+import re
+from typing import Iterable, List, Optional
+
+from textx import TextXSyntaxError
+
+from .phototemplate import (
+    CREATED_DATE_TAGS,
+    DATETIME_SUBFIELDS,
+    MODIFIED_DATE_TAGS,
+    MULTI_VALUE_SUBSTITUTIONS,
+    PATHLIB_SUBSTITUTIONS,
+    SINGLE_VALUE_SUBSTITUTIONS,
+    PhotoTemplateParser,
+)
+
+# multi-value template fields that don't read any metadata
+NO_METADATA_FIELDS = ["GROUP", "TAG", "shell_quote", "strip"]
+
+# a tag name as passed to exiftool, e.g. "Keywords", "IPTC:Keywords", or "XMP-dc:Subject"
+# anything else (e.g. "Keywords=Foo" or "Keywords<Subject") would be an exiftool write or copy
+TAG_NAME_RE = re.compile(r"^[\w\-]+(:[\w\-]+)?$")
+
+
+class FullReadRequired(Exception):
+    """Raised when a template requires all tags to be read"""
+
+    pass
+
+
+def plan_read_args(
+    tags: Optional[Iterable[str]] = None,
+    tag_values: Optional[Iterable[str]] = None,
+    fc_tags: Optional[Iterable[str]] = None,
+    fc_tag_values: Optional[Iterable[str]] = None,
+    tag_groups: Optional[Iterable[str]] = None,
+    all_tags: bool = False,
+    tag_match: Optional[Iterable[str]] = None,
+    format_templates: Optional[Iterable[str]] = None,
+    templates: Optional[Iterable[str]] = None,
+) -> Optional[List[str]]:
+    """Return the minimal list of exiftool arguments needed to read the requested tags
+
+    Args:
+        tags: tags used with --tag
+        tag_values: tags used with --tag-value
+        fc_tags: tags used with --fc
+        fc_tag_values: tags used with --fc-value
+        tag_groups: tag groups used with --tag-group
+        all_tags: True if --all-tags was used
+        tag_match: patterns used with --tag-match
+        format_templates: templates used to format a single tag (--tag-format, --fc-format);
+            {VALUE} in these refers to the tag being formatted which is already read
+        templates: templates rendered without a tag (--tag-template, --fc-template, --xattr-template)
+
+    Returns:
+        list of exiftool arguments, e.g. ["-IPTC:Keywords", "-ISO", "-EXIF:all"],
+        or None if all tags must be read
+    """
+    if all_tags or tag_match:
+        return None
+
+    read_args = []
+    for tag in [
+        *(tags or []),
+        *(tag_values or []),
+        *(fc_tags or []),
+        *(fc_tag_values or []),
+    ]:
+        read_args.append(f"-{tag}")
+
+    for group in tag_groups or []:
+        read_args.append(f"-{group}:all")
+
+    if not all(TAG_NAME_RE.match(arg[1:]) for arg in read_args):
+        return None
+
+    try:
+        for template in format_templates or []:
+            read_args.extend(_template_read_args(template, format_template=True))
+        for template in templates or []:
+            read_args.extend(_template_read_args(template, format_template=False))
+    except FullReadRequired:
+        return None
+
+    # remove duplicates but preserve order; exiftool tag names are case-insensitive
+    seen = set()
+    unique_args = []
+    for arg in read_args:
+        if arg.lower() not in seen:
+            seen.add(arg.lower())
+            unique_args.append(arg)
+    return unique_args
+
+
+def _template_read_args(template: str, format_template: bool) -> List[str]:
+    """Return list of exiftool arguments needed to render template
+
+    Raises:
+        FullReadRequired if template needs all tags or cannot be parsed
+    """
+    try:
+        model = PhotoTemplateParser().parse(template)
+    except TextXSyntaxError as e:
+        # let the renderer report the syntax error
+        raise FullReadRequired() from e
+    return _statement_read_args(model, format_template)
+
+
+def _statement_read_args(statement, format_template: bool) -> List[str]:
+    """Return list of exiftool arguments needed to render a parsed template statement"""
+    read_args = []
+    if not statement:
+        return read_args
+
+    for ts in statement.template_strings:
+        template = ts.template
+        if not template:
+            continue
+
+        read_args.extend(
+            _field_read_args(template.field, template.subfield, format_template)
+        )
+
+        # nested statements
+        for part in [template.bool, template.default, template.conditional]:
+            if part is not None and part.value is not None:
+                read_args.extend(_statement_read_args(part.value, format_template))
+
+    return read_args
+
+
+def _field_read_args(field: str, subfield: Optional[str], format_template: bool):
+    """Return list of exiftool arguments needed to render a single template field"""
+    field_stem = field.split(".")[0]
+    if field in SINGLE_VALUE_SUBSTITUTIONS or field_stem in SINGLE_VALUE_SUBSTITUTIONS:
+        if field_stem == "created":
+            return [f"-{tag}" for tag in CREATED_DATE_TAGS]
+        elif field_stem == "modified":
+            return [f"-{tag}" for tag in MODIFIED_DATE_TAGS]
+        return []
+    elif field in MULTI_VALUE_SUBSTITUTIONS:
+        if field == "VALUE":
+            if format_template:
+                # value of the tag being formatted, which is already being read
+                return []
+            raise FullReadRequired()
+        elif field == "detected_text":
+            return ["-Orientation"]
+        elif field in NO_METADATA_FIELDS:
+            return []
+        raise FullReadRequired()
+    elif field_stem in PATHLIB_SUBSTITUTIONS:
+        return []
+
+    # exiftool field in form "tag" or "group:tag", optionally with a date/time subfield, e.g. "EXIF:DateTimeOriginal.year"
+    exiftag = f"{field}:{subfield}" if subfield else f"{field}"
+    if "." in exiftag:
+        exiftag, tag_subfield = exiftag.split(".", 1)
+        if tag_subfield not in DATETIME_SUBFIELDS:
+            # invalid, let the renderer report the error
+            raise FullReadRequired()
+    if not TAG_NAME_RE.match(exiftag):
+        raise FullReadRequired()
+    return [f"-{exiftag}"]
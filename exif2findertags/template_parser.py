@@ -0,0 +1,275 @@
+""" Hand-written parser for the template language (OTL) grammar in phototemplate.tx
+
+Produces a model with the same shape as the textX parser built from phototemplate.tx
+(see PhotoTemplateParser.parse_textx) without the cost of building the textX metamodel.
+Each rule below mirrors the grammar rule of the same name and matches the same text:
+the regular expressions are copied from the grammar and rules are tried in the same
+order with the same PEG semantics (ordered choice, greedy repetition, no backtracking).
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+from textx import TextXSyntaxError
+
+NON_TEMPLATE_STRING = re.compile(r"[^\{\},\?]*")
+DELIM_WORD = re.compile(r"[^\{\}]*(?=\+\w)")
+FIELD_WORD = re.compile(r"[\.\w]+")
+SUBFIELD_WORD = re.compile(r"[\.\w:\/\-\~\'\"\%\@\#\^\’]+")
+SUBFIELD_ESCAPE = re.compile(r"\\\s")
+FILTER_WORD = re.compile(r"[\.\w:\/]+")
+FIND_WORD = re.compile(r"[^\[\]\|]*(?=\,)")
+REPLACE_WORD = re.compile(r"[^\[\]\|]*")
+NEGATION = "not "
+OPERATORS = [
+    "contains",
+    "matches",
+    "startswith",
+    "endswith",
+    "<=",
+    ">=",
+    "<",
+    ">",
+    "==",
+    "!=",
+]
+
+
+@dataclass
+class Statement:
+    template_strings: List["TemplateString"]
+
+
+@dataclass
+class TemplateString:
+    pre: Optional[str]
+    template: Optional["Template"]
+    post: Optional[str]
+
+
+@dataclass
+class Delim:
+    value: Optional[str]
+
+
+@dataclass
+class Filter:
+    value: List[str]
+
+
+@dataclass
+class FindReplacePair:
+    find: Optional[str]
+    replace: Optional[str]
+
+
+@dataclass
+class FindReplace:
+    pairs: List[FindReplacePair]
+
+
+@dataclass
+class Conditional:
+    negation: Optional[str]
+    operator: str
+    value: Optional[Statement]
+
+
+@dataclass
+class Boolean:
+    value: Optional[Statement]
+
+
+@dataclass
+class Default:
+    value: Optional[Statement]
+
+
+@dataclass
+class Template:
+    delim: Optional[Delim]
+    field: str
+    subfield: Optional[str]
+    filter: Optional[Filter]
+    findreplace: Optional[FindReplace]
+    conditional: Optional[Conditional]
+    bool: Optional[Boolean]
+    default: Optional[Default]
+
+
+def parse_template(text: str) -> Union[Statement, str]:
+    """Parse template string text
+
+    Returns: Statement or "" if text is empty (as returned by textX)
+
+    Raises: TextXSyntaxError if text is not a valid template
+    """
+    statement, pos = _statement(text, 0)
+    if pos != len(text):
+        line = text.count("\n", 0, pos) + 1
+        col = pos - text.rfind("\n", 0, pos)
+        raise TextXSyntaxError(
+            f"None:{line}:{col}: Expected '{{' or EOF => '{text[:pos]}*{text[pos:]}'",
+            line=line,
+            col=col,
+        )
+    return statement if statement is not None else ""
+
+
+def _match(regex, text, pos) -> Tuple[Optional[str], int]:
+    """Match regex at pos; returns (matched text or None if nothing matched, new position)"""
+    match = regex.match(text, pos)
+    if not match:
+        return None, pos
+    return match.group() or None, match.end()
+
+
+def _statement(text, pos) -> Tuple[Optional[Statement], int]:
+    template_strings = []
+    while True:
+        template_string, new_pos = _template_string(text, pos)
+        if new_pos == pos:
+            break
+        template_strings.append(template_string)
+        pos = new_pos
+    return (Statement(template_strings) if template_strings else None), pos
+
+
+def _template_string(text, pos) -> Tuple[TemplateString, int]:
+    pre, pos = _match(NON_TEMPLATE_STRING, text, pos)
+    template, pos = _template(text, pos)
+    post, pos = _match(NON_TEMPLATE_STRING, text, pos)
+    return TemplateString(pre, template, post), pos
+
+
+def _template(text, pos) -> Tuple[Optional[Template], int]:
+    if not text.startswith("{", pos):
+        return None, pos
+    start = pos
+    delim, pos = _delim(text, pos + 1)
+    field, pos = _match(FIELD_WORD, text, pos)
+    if field is None:
+        return None, start
+    subfield, pos = _subfield(text, pos)
+    filter_, pos = _filter(text, pos)
+    findreplace, pos = _findreplace(text, pos)
+    conditional, pos = _conditional(text, pos)
+    bool_, pos = _boolean(text, pos)
+    default, pos = _default(text, pos)
+    if not text.startswith("}", pos):
+        return None, start
+    template = Template(
+        delim, field, subfield, filter_, findreplace, conditional, bool_, default
+    )
+    return template, pos + 1
+
+
+def _delim(text, pos) -> Tuple[Optional[Delim], int]:
+    value, new_pos = _match(DELIM_WORD, text, pos)
+    if not text.startswith("+", new_pos):
+        return None, pos
+    return Delim(value), new_pos + 1
+
+
+def _subfield(text, pos) -> Tuple[Optional[str], int]:
+    if not text.startswith(":", pos):
+        return None, pos
+    words = []
+    new_pos = pos + 1
+    while match := SUBFIELD_WORD.match(text, new_pos):
+        words.append(match.group())
+        new_pos = match.end()
+        if escape := SUBFIELD_ESCAPE.match(text, new_pos):
+            words.append(escape.group())
+            new_pos = escape.end()
+    if not words:
+        return None, pos
+    return "".join(words), new_pos
+
+
+def _filter(text, pos) -> Tuple[Optional[Filter], int]:
+    if not text.startswith("|", pos):
+        return None, pos
+    pos += 1
+    values = []
+    if match := FILTER_WORD.match(text, pos):
+        values.append(match.group())
+        pos = match.end()
+        while text.startswith("|", pos) and (
+            match := FILTER_WORD.match(text, pos + 1)
+        ):
+            values.append(match.group())
+            pos = match.end()
+    # "|" with no filter matches nothing, as with textX
+    return (Filter(values) if values else None), pos
+
+
+def _findreplace(text, pos) -> Tuple[Optional[FindReplace], int]:
+    if not text.startswith("[", pos):
+        return None, pos
+    pairs = []
+    new_pos = pos + 1
+    pair, new_pos = _findreplace_pair(text, new_pos)
+    if pair:
+        pairs.append(pair)
+        while text.startswith("|", new_pos):
+            pair, pair_pos = _findreplace_pair(text, new_pos + 1)
+            if not pair:
+                break
+            pairs.append(pair)
+            new_pos = pair_pos
+    if not text.startswith("]", new_pos):
+        return None, pos
+    return FindReplace(pairs), new_pos + 1
+
+
+def _findreplace_pair(text, pos) -> Tuple[Optional[FindReplacePair], int]:
+    match = FIND_WORD.match(text, pos)
+    if not match:
+        return None, pos
+    # FIND_WORD is always followed by ","
+    replace, new_pos = _match(REPLACE_WORD, text, match.end() + 1)
+    return FindReplacePair(match.group() or None, replace), new_pos
+
+
+def _spaces(text, pos) -> int:
+    """Return position after one or more spaces at pos, or pos if there are none"""
+    while text.startswith(" ", pos):
+        pos += 1
+    return pos
+
+
+def _conditional(text, pos) -> Tuple[Optional[Conditional], int]:
+    new_pos = _spaces(text, pos)
+    if new_pos == pos:
+        return None, pos
+    negation = None
+    if text.startswith(NEGATION, new_pos):
+        negation = NEGATION
+        new_pos += len(NEGATION)
+    for operator in OPERATORS:
+        if text.startswith(operator, new_pos):
+            break
+    else:
+        return None, pos
+    new_pos += len(operator)
+    value_pos = _spaces(text, new_pos)
+    if value_pos == new_pos:
+        return None, pos
+    value, new_pos = _statement(text, value_pos)
+    return Conditional(negation, operator, value), new_pos
+
+
+def _boolean(text, pos) -> Tuple[Optional[Boolean], int]:
+    if not text.startswith("?", pos):
+        return None, pos
+    value, pos = _statement(text, pos + 1)
+    return Boolean(value), pos
+
+
+def _default(text, pos) -> Tuple[Optional[Default], int]:
+    if not text.startswith(",", pos):
+        return None, pos
+    value, pos = _statement(text, pos + 1)
+    return Default(value), pos
@@ -0,0 +1,109 @@
+""" Walk directory trees to find files to process """
+
+import os
+import pathlib
+from typing import Callable, Iterator, Optional, Set, Tuple
+
+from .file_filter import FileFilter
+from .shard import Shard
+
+
+def walk_files(
+    top,
+    seen: Optional[Set[Tuple[int, int]]] = None,
+    on_directory: Optional[Callable[[str], None]] = None,
+    on_error: Optional[Callable[[OSError], None]] = None,
+    file_filter: Optional[FileFilter] = None,
+    sort: bool = False,
+    shard: Optional[Shard] = None,
+) -> Iterator[pathlib.Path]:
+    """Walk directory tree top and yield path of each file as it is found
+
+    Each directory is scanned exactly once with os.scandir. Symbolic links are followed
+    but files and directories are identified by (st_dev, st_ino) so a file reachable via
+    more than one path (hard links, symlinks) is yielded only once and symlink loops are not followed.
+
+    Args:
+        top: path to directory to walk
+        seen: optional set of (st_dev, st_ino) of files and directories already visited;
+            pass the same set to multiple calls to avoid yielding a file more than once across calls
+        on_directory: optional callable called with path of each subdirectory of top before it is scanned
+        on_error: optional callable called with the OSError if a directory cannot be scanned;
+            by default errors are ignored
+        file_filter: optional FileFilter; files it rejects are not yielded and directories it rejects are not walked
+        sort: if True, entries of each directory are visited in order of name so the order files are
+            yielded does not depend on the order the file system returns them
+        shard: optional Shard; only files in the shard, by their path relative to top, are yielded
+
+    Yields:
+        pathlib.Path for each file
+    """
+    seen = set() if seen is None else seen
+    try:
+        stat = os.stat(top)
+    except OSError as e:
+        if on_error:
+            on_error(e)
+        return
+    if (stat.st_dev, stat.st_ino) in seen:
+        return
+    seen.add((stat.st_dev, stat.st_ino))
+
+    # directories still to scan as (path, st_dev)
+    top = os.fspath(top)
+    # length of the prefix removed from paths to make them relative to top
+    prefix_len = len(os.path.join(top, ""))
+    stack = [(top, stat.st_dev)]
+    while stack:
+        dirpath, dev = stack.pop()
+        if on_directory and dirpath != top:
+            on_directory(dirpath)
+        try:
+            with os.scandir(dirpath) as it:
+                entries = list(it)
+            if sort:
+                entries.sort(key=lambda entry: entry.name)
+        except OSError as e:
+            if on_error:
+                on_error(e)
+            continue
+
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_symlink():
+                    # identify the target of the link; raises if link is broken
+                    stat = entry.stat()
+                    key = (stat.st_dev, stat.st_ino)
+                    is_dir = entry.is_dir()
+                    entry_dev = stat.st_dev
+                elif entry.is_dir(follow_symlinks=False):
+                    # directories may be mount points on a different device
+                    stat = entry.stat(follow_symlinks=False)
+                    key = (stat.st_dev, stat.st_ino)
+                    is_dir = True
+                    entry_dev = stat.st_dev
+                else:
+                    # files are on the same device as their directory so no stat is needed
+                    key = (dev, entry.inode())
+                    is_dir = False
+            except OSError:
+                continue
+
+            if key in seen:
+                continue
+            seen.add(key)
+            if is_dir:
+                if file_filter is None or file_filter.match_directory(entry.path):
+                    subdirs.append((entry.path, entry_dev))
+            elif (
+                entry.is_file()
+                # the shard is a hash of the path so check it before file_filter,
+                # which may read the file, so each file is only read by its shard
+                and (shard is None or shard.contains(entry.path[prefix_len:]))
+                and (file_filter is None or file_filter.match_file(entry.path))
+            ):
+                yield pathlib.Path(entry.path)
+
+        # scan subdirectories in the order scandir returned them (or sorted)
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,391 @@
+""" Watch directories for new or changed files """
+
+import ctypes
+import ctypes.util
+import os
+import pathlib
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .file_filter import FileFilter
+from .shard import Shard
+from .walk import walk_files
+
+# seconds a file's size and modification time must be unchanged before it is processed
+DEFAULT_SETTLE_TIME = 2.0
+
+# seconds between scans of the watched directories by PollingWatcher
+DEFAULT_POLL_INTERVAL = 5.0
+
+# longest time to wait for events before checking whether watching was stopped
+_MAX_WAIT = 1.0
+
+# inotify event flags, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# events that mean a file may have been created or finished writing
+_INOTIFY_MASK = IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO
+
+# struct inotify_event header: int wd; uint32_t mask; uint32_t cookie; uint32_t len
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """Find new or changed files by periodically scanning directories and comparing
+    each file's size and modification time to the previous scan"""
+
+    def __init__(
+        self,
+        paths: Iterable,
+        file_filter: Optional[FileFilter] = None,
+        interval: float = DEFAULT_POLL_INTERVAL,
+        on_error: Optional[Callable[[OSError], None]] = None,
+        shard: Optional[Shard] = None,
+    ):
+        """Args:
+        paths: directories to watch, including their subdirectories
+        file_filter: optional FileFilter selecting which files are reported
+        interval: seconds between scans
+        on_error: optional callable called with the OSError if a directory cannot be scanned
+        shard: optional Shard; only files in the shard, by their path relative to the watched directory, are reported
+        """
+        self.paths = [pathlib.Path(path) for path in paths]
+        self.file_filter = file_filter
+        self.shard = shard
+        self.interval = interval
+        self.on_error = on_error
+        self._next_scan = time.monotonic() + interval
+        self._snapshot = self._scan()
+
+    def changes(self, timeout: float) -> Set[pathlib.Path]:
+        """Wait up to timeout seconds and return paths of files created or changed since the last call"""
+        wait = self._next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return set()
+        if wait > 0:
+            time.sleep(wait)
+        self._next_scan = time.monotonic() + self.interval
+        snapshot = self._scan()
+        changed = {
+            path
+            for path, signature in snapshot.items()
+            if self._snapshot.get(path) != signature
+        }
+        self._snapshot = snapshot
+        return changed
+
+    def accept(self, paths: List[pathlib.Path]) -> List[pathlib.Path]:
+        """Return the paths, which have stopped changing, that should be processed"""
+        # files were already filtered when scanned
+        return paths
+
+    def close(self):
+        """Stop watching"""
+        self._snapshot = {}
+
+    def _scan(self) -> Dict[pathlib.Path, Tuple[int, int]]:
+        """Return dict of path: (size, mtime_ns) for each file in the watched directories"""
+        snapshot = {}
+        seen = set()
+        for path in self.paths:
+            for filepath in walk_files(
+                path,
+                seen=seen,
+                on_error=self.on_error,
+                file_filter=self.file_filter,
+                shard=self.shard,
+            ):
+                if signature := _signature(filepath):
+                    snapshot[filepath] = signature
+        return snapshot
+
+
+class InotifyWatcher:
+    """Find new or changed files with Linux inotify; new subdirectories are watched as they are created"""
+
+    def __init__(
+        self,
+        paths: Iterable,
+        file_filter: Optional[FileFilter] = None,
+        on_error: Optional[Callable[[OSError], None]] = None,
+        shard: Optional[Shard] = None,
+    ):
+        """Args:
+        paths: directories to watch, including their subdirectories
+        file_filter: optional FileFilter selecting which files are reported
+        on_error: optional callable called with the OSError if a directory cannot be watched
+        shard: optional Shard; only files in the shard, by their path relative to the watched directory, are reported
+
+        Raises: OSError if inotify is not available
+        """
+        self.paths = [pathlib.Path(path) for path in paths]
+        self.file_filter = file_filter
+        self.shard = shard
+        self.on_error = on_error
+        self._libc = _load_libc()
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise _errno_error("inotify_init1")
+        # watch descriptor: directory path
+        self._watches = {}
+        for path in self.paths:
+            self._add_tree(path)
+
+    def changes(self, timeout: float) -> Set[pathlib.Path]:
+        """Wait up to timeout seconds and return paths of files created or written since the last call"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            changed |= self._parse_events(data)
+        return changed
+
+    def accept(self, paths: List[pathlib.Path]) -> List[pathlib.Path]:
+        """Return the paths, which have stopped changing, that should be processed"""
+        if self.shard is not None:
+            paths = [
+                path
+                for path in paths
+                if self.shard.contains(_relative_path(path, self.paths))
+            ]
+        # files are filtered once complete as the filter may look at their content
+        if self.file_filter is None:
+            return paths
+        return [path for path in paths if self.file_filter.match_file(str(path))]
+
+    def close(self):
+        """Stop watching"""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+            self._watches = {}
+
+    def _parse_events(self, data) -> Set[pathlib.Path]:
+        """Return paths of files in the inotify events in data, watching any new directories"""
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # events were lost; report every file (files already processed
+                # can be skipped with --stamp or --incremental)
+                for path in self.paths:
+                    changed.update(self._files_in(path))
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and (
+                    self.file_filter is None
+                    or self.file_filter.match_directory(str(path))
+                ):
+                    # files may have been added before the watch was in place
+                    self._add_tree(path)
+                    changed.update(self._files_in(path))
+            else:
+                changed.add(path)
+        return changed
+
+    def _add_tree(self, top):
+        """Watch directory top and all its subdirectories"""
+        self._add_watch(top)
+        for dirpath, dirnames, _ in os.walk(top, onerror=self.on_error):
+            if self.file_filter is not None:
+                dirnames[:] = [
+                    dirname
+                    for dirname in dirnames
+                    if self.file_filter.match_directory(os.path.join(dirpath, dirname))
+                ]
+            for dirname in dirnames:
+                self._add_watch(pathlib.Path(dirpath) / dirname)
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(path), _INOTIFY_MASK | IN_ONLYDIR
+        )
+        if wd < 0:
+            error = _errno_error(f"inotify_add_watch {path}")
+            if self.on_error:
+                self.on_error(error)
+            return
+        self._watches[wd] = pathlib.Path(path)
+
+    def _files_in(self, path):
+        """Return files in path and its subdirectories that are not in excluded directories"""
+        return walk_files(
+            path,
+            on_error=self.on_error,
+            file_filter=FileFilter(exclude_glob=self.file_filter.exclude_glob)
+            if self.file_filter
+            else None,
+        )
+
+
+class Debouncer:
+    """Hold changed files until their size and modification time stop changing"""
+
+    def __init__(self, settle_time: float = DEFAULT_SETTLE_TIME):
+        """Args:
+        settle_time: seconds a file must be unchanged before it is ready
+        """
+        self.settle_time = settle_time
+        # path: (size, mtime_ns, time the file was last seen to change)
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, paths: Iterable):
+        """Add files that were created or changed"""
+        now = time.monotonic()
+        for path in paths:
+            if signature := _signature(path):
+                self._pending[path] = (*signature, now)
+
+    def ready(self) -> List[pathlib.Path]:
+        """Return files that have not changed for settle_time seconds and stop tracking them;
+        files that were deleted are dropped"""
+        now = time.monotonic()
+        ready = []
+        for path, (size, mtime_ns, changed_at) in list(self._pending.items()):
+            signature = _signature(path)
+            if signature is None:
+                del self._pending[path]
+            elif signature != (size, mtime_ns):
+                self._pending[path] = (*signature, now)
+            elif now - changed_at >= self.settle_time:
+                del self._pending[path]
+                ready.append(path)
+        return ready
+
+
+def inotify_available() -> bool:
+    """Return True if the inotify backend can be used on this system"""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        _load_libc()
+    except OSError:
+        return False
+    return True
+
+
+def watch_directories(
+    paths: Iterable,
+    file_filter: Optional[FileFilter] = None,
+    settle_time: float = DEFAULT_SETTLE_TIME,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    polling: bool = False,
+    stop: Optional[threading.Event] = None,
+    on_error: Optional[Callable[[OSError], None]] = None,
+    shard: Optional[Shard] = None,
+) -> Iterator[List[pathlib.Path]]:
+    """Watch directories and yield lists of files that were created or changed
+    once they have stopped changing
+
+    Files that exist when watching starts are not reported unless they change.
+
+    Args:
+        paths: directories to watch, including their subdirectories
+        file_filter: optional FileFilter selecting which files are reported
+        settle_time: seconds a file's size and modification time must be unchanged before it is reported
+        poll_interval: seconds between scans when polling
+        polling: if True, scan directories for changes even if inotify is available
+        stop: optional threading.Event; watching stops when it is set
+        on_error: optional callable called with the OSError if a directory cannot be watched
+        shard: optional Shard; only files in the shard, by their path relative to the watched
+            directory as with walk_files(), are reported
+    """
+    stop = stop or threading.Event()
+    if shard is not None:
+        # polling rescans every file so keep the counts of watched files out of shard's counts
+        shard = Shard(shard.index, shard.count)
+    if polling or not inotify_available():
+        watcher = PollingWatcher(
+            paths,
+            file_filter=file_filter,
+            interval=poll_interval,
+            on_error=on_error,
+            shard=shard,
+        )
+    else:
+        watcher = InotifyWatcher(
+            paths, file_filter=file_filter, on_error=on_error, shard=shard
+        )
+    debouncer = Debouncer(settle_time)
+    try:
+        while not stop.is_set():
+            timeout = min(settle_time / 2, _MAX_WAIT) if debouncer else _MAX_WAIT
+            debouncer.add(watcher.changes(timeout))
+            if ready := watcher.accept(debouncer.ready()):
+                yield ready
+    finally:
+        watcher.close()
+
+
+def _relative_path(path: pathlib.Path, roots: List[pathlib.Path]) -> str:
+    """Return path relative to the first of the watched directories roots that contains it"""
+    for root in roots:
+        try:
+            return str(path.relative_to(root))
+        except ValueError:
+            continue
+    return str(path)
+
+
+def _signature(path) -> Optional[Tuple[int, int]]:
+    """Return (size, mtime_ns) of regular file path or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns) if stat.S_ISREG(st.st_mode) else None
+
+
+def _load_libc():
+    """Return libc with the inotify functions
+
+    Raises: OSError if libc or inotify is not available
+    """
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    try:
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except AttributeError as e:
+        raise OSError(f"inotify not available: {e}") from e
+    return libc
+
+
+def _errno_error(message):
+    errno = ctypes.get_errno()
+    return OSError(errno, f"{message}: {os.strerror(errno)}")
@@ -0,0 +1,270 @@
+""" File-backed queue of files to process, shared by a coordinator and any number of workers """
+
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .exiftool import ExifToolCaching
+
+# default number of seconds a worker holds a batch before it may be leased by another worker
+DEFAULT_LEASE_TIME = 300
+
+# number of times an item may be leased before it is marked failed, e.g. because it crashes exiftool
+MAX_ATTEMPTS = 3
+
+# seconds a worker waits before checking the queue again when there are no files to lease
+DEFAULT_QUEUE_POLL_INTERVAL = 1.0
+
+# number of paths inserted per transaction by publish()
+PUBLISH_BATCH_SIZE = 1000
+
+# item states
+PENDING = 0
+LEASED = 1
+DONE = 2
+FAILED = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    state INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (state, lease_expires);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def worker_id() -> str:
+    """Return id identifying this worker process, unique across machines"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class WorkQueue:
+    """Queue of files to process stored in a SQLite database on storage shared by all workers
+
+    A coordinator adds files with publish() then calls finish_publishing(). Workers lease
+    batches of files with lease(), process them, and acknowledge them with ack() or fail().
+    Leases expire after lease_time seconds so files leased by a worker that died are leased
+    again by another worker. The database uses SQLite's rollback journal rather than WAL
+    because WAL requires shared memory and does not work on network file systems.
+    """
+
+    def __init__(self, dbpath: str):
+        """Open or create queue database at dbpath"""
+        self.dbpath = str(dbpath)
+        self._conn = sqlite3.connect(self.dbpath, isolation_level=None, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.executescript(_SCHEMA)
+
+    def publish(self, paths: Iterable) -> int:
+        """Add files to the queue; files already in the queue are not added again
+
+        Returns: number of files added
+        """
+        added = 0
+        batch = []
+        for path in paths:
+            batch.append((os.path.abspath(os.fsdecode(path)),))
+            if len(batch) >= PUBLISH_BATCH_SIZE:
+                added += self._insert(batch)
+                batch = []
+        if batch:
+            added += self._insert(batch)
+        return added
+
+    def start_publishing(self):
+        """Record that the coordinator is adding files so workers wait for more files when the queue is empty"""
+        self._set_meta("publishing", "1")
+
+    def finish_publishing(self):
+        """Record that all files have been added so workers exit once the queue is empty"""
+        self._set_meta("publishing", "0")
+
+    @property
+    def publishing(self) -> bool:
+        """True if the coordinator may still add files"""
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'publishing'"
+        ).fetchone()
+        return row is None or row[0] == "1"
+
+    def lease(
+        self, owner: str, count: int, lease_time: float = DEFAULT_LEASE_TIME
+    ) -> List[Tuple[int, str]]:
+        """Lease up to count files that are pending or whose lease has expired
+
+        Args:
+            owner: id of the worker, see worker_id()
+            count: maximum number of files to lease
+            lease_time: seconds until the lease expires
+
+        Returns: list of (item id, path)
+        """
+        now = time.time()
+        with self._conn:
+            # take the write lock before reading so two workers cannot lease the same item
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "UPDATE items SET state = ?, owner = NULL, error = 'lease expired too many times' "
+                "WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, LEASED, now, MAX_ATTEMPTS),
+            )
+            items = self._conn.execute(
+                "SELECT id, path FROM items "
+                "WHERE state = ? OR (state = ? AND lease_expires < ?) LIMIT ?",
+                (PENDING, LEASED, now, count),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE items SET state = ?, owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                [(LEASED, owner, now + lease_time, item_id) for item_id, _ in items],
+            )
+        return items
+
+    def renew(
+        self, owner: str, ids: Iterable[int], lease_time: float = DEFAULT_LEASE_TIME
+    ):
+        """Extend the lease on files still leased by owner"""
+        self._update(
+            "UPDATE items SET lease_expires = ? WHERE id = ? AND state = ? AND owner = ?",
+            [(time.time() + lease_time, item_id, LEASED, owner) for item_id in ids],
+        )
+
+    def ack(self, ids: Iterable[int]):
+        """Mark files as done"""
+        self._update(
+            "UPDATE items SET state = ?, owner = NULL, error = NULL WHERE id = ?",
+            [(DONE, item_id) for item_id in ids],
+        )
+
+    def fail(self, item_id: int, error: str):
+        """Mark file as failed with error message"""
+        self._update(
+            "UPDATE items SET state = ?, owner = NULL, error = ? WHERE id = ?",
+            [(FAILED, error, item_id)],
+        )
+
+    def outstanding(self) -> int:
+        """Return number of files pending or leased"""
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM items WHERE state IN (?, ?)", (PENDING, LEASED)
+        ).fetchone()[0]
+
+    def stats(self) -> Dict:
+        """Return dict with number of files in each state"""
+        counts = dict(
+            self._conn.execute("SELECT state, COUNT(*) FROM items GROUP BY state")
+        )
+        return {
+            "pending": counts.get(PENDING, 0),
+            "leased": counts.get(LEASED, 0),
+            "done": counts.get(DONE, 0),
+            "failed": counts.get(FAILED, 0),
+        }
+
+    def failures(self) -> List[Tuple[str, str]]:
+        """Return list of (path, error) for failed files"""
+        return self._conn.execute(
+            "SELECT path, error FROM items WHERE state = ? ORDER BY path", (FAILED,)
+        ).fetchall()
+
+    def close(self):
+        """Close the queue database"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _insert(self, rows) -> int:
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO items (path) VALUES (?)", rows
+            )
+            return self._conn.total_changes - before
+
+    def _update(self, sql, rows):
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(sql, rows)
+
+    def _set_meta(self, key, value):
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+
+def process_queue(
+    e2f,
+    queue: WorkQueue,
+    batch_size: int,
+    lease_time: float = DEFAULT_LEASE_TIME,
+    poll_interval: float = DEFAULT_QUEUE_POLL_INTERVAL,
+    owner: Optional[str] = None,
+    on_error: Optional[Callable[[str, str], None]] = None,
+) -> int:
+    """Lease batches of files from queue and process them with ExifToFinder e2f until the
+    coordinator has finished publishing and no files are pending or leased
+
+    Args:
+        e2f: ExifToFinder used to process files
+        queue: WorkQueue to lease files from
+        batch_size: number of files leased at a time, read with a single exiftool call
+        lease_time: seconds until a lease expires; leases are renewed while a batch is processed
+        poll_interval: seconds to wait when no files are available to lease
+        owner: id of this worker, default worker_id()
+        on_error: optional callable called with (filename, error message) for each file that could not be processed
+
+    Returns: number of files updated
+    """
+    owner = owner or worker_id()
+    on_error = on_error or (lambda filename, error: None)
+    files_updated = 0
+    while True:
+        items = queue.lease(owner, batch_size, lease_time)
+        if not items:
+            if not queue.publishing and not queue.outstanding():
+                break
+            # files leased by other workers may yet be released if those workers die
+            time.sleep(poll_interval)
+            continue
+
+        ids = {path: item_id for item_id, path in items}
+        filenames = e2f.unprocessed_files([path for _, path in items])
+        try:
+            ExifToolCaching.prefetch(
+                filenames, exiftool=e2f.exiftool_path, read_args=e2f.read_args
+            )
+        except OSError as e:
+            # files will be read individually
+            e2f.verbose(f"Error reading metadata with exiftool: {e}")
+
+        renew_at = time.monotonic() + lease_time / 2
+        done = set(ids.values())
+        for filename in filenames:
+            e2f.verbose(f"Processing file {filename}")
+            try:
+                files_updated += e2f.process_file(filename)
+            except Exception as e:
+                done.discard(ids[filename])
+                queue.fail(ids[filename], str(e))
+                on_error(filename, str(e))
+            if time.monotonic() >= renew_at:
+                queue.renew(owner, ids.values(), lease_time)
+                renew_at = time.monotonic() + lease_time / 2
+        # files skipped by unprocessed_files() are done too
+        queue.ack(done)
+    return files_updated
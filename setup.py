@@ -63,6 +63,7 @@ setup(
         "pyobjc-framework-Vision>=9.0,<10.0",
         "rich>=12.6.0,<13.0",
         "textx>=3.0.0,<4.0",
+        "xattr>=0.9.9,<0.10.0",
         "yaspin>=2.2.0,<3.0",
     ],
     python_requires=">=3.9",
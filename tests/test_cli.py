@@ -233,6 +233,43 @@ def test_walk(tmp_dir):
     md2.tags = []
 
 
+def test_walk_batch_size(tmp_dir):
+    """test --walk with --batch-size"""
+    from exif2findertags.cli import cli
+
+    file1 = str(tmp_dir / "photos" / pathlib.Path(TEST_IMAGE).name)
+    file2 = str(tmp_dir / "videos" / pathlib.Path(TEST_VIDEO).name)
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--tag",
+            "Make",
+            "--tag",
+            "DisplayName",
+            "--batch-size",
+            "1",
+            "--verbose",
+            "--walk",
+            str(tmp_dir),
+        ],
+    )
+    assert result.exit_code == 0
+
+    md1 = osxmetadata.OSXMetaData(file1)
+    tags = [t.name for t in md1.tags]
+    assert "Make: Apple" in tags
+
+    md2 = osxmetadata.OSXMetaData(file2)
+    tags = [t.name for t in md2.tags]
+    assert "DisplayName: Jellyfish" in tags
+
+    # reset tags for next test
+    md1.tags = []
+    md2.tags = []
+
+
 def test_verbose(tmp_image):
     """test --verbose"""
     from exif2findertags.cli import cli
@@ -691,6 +728,19 @@ def test_xattr_template_invalid(tmp_image):
     assert "Invalid extended attribute" in result.output
 
 
+def test_tag_template_invalid(tmp_image):
+    """test invalid template syntax is reported before any file is processed"""
+    from exif2findertags.cli import cli
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        ["--tag-template", "Camera: {Make", "--walk", str(tmp_image)],
+    )
+    assert result.exit_code != 0
+    assert "Invalid template syntax for template 'Camera: {Make'" in result.output
+
+
 def test_xattr_template_detected_text(tmp_image_vision):
     """test --xattr-template with {detected_text} template"""
     from exif2findertags.cli import cli
@@ -712,3 +762,413 @@ def test_xattr_template_detected_text(tmp_image_vision):
 
     # reset comments for next test
     md.comment = None
+
+
+def test_walk_nested_directories(tmp_dir):
+    """test --walk processes each file once when a directory and its subdirectory are both specified"""
+    from exif2findertags.cli import cli
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        ["--tag", "Make", "--walk", str(tmp_dir), str(tmp_dir / "photos")],
+    )
+    assert result.exit_code == 0
+    assert "Updated metadata for 2 files" in result.output
+
+    # reset tags for next test
+    for file in [
+        tmp_dir / "photos" / pathlib.Path(TEST_IMAGE).name,
+        tmp_dir / "videos" / pathlib.Path(TEST_VIDEO).name,
+    ]:
+        osxmetadata.OSXMetaData(str(file)).tags = []
+
+
+def test_walk_jobs(tmp_dir):
+    """test --walk with --jobs"""
+    from exif2findertags.cli import cli
+
+    file1 = str(tmp_dir / "photos" / pathlib.Path(TEST_IMAGE).name)
+    file2 = str(tmp_dir / "videos" / pathlib.Path(TEST_VIDEO).name)
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--tag",
+            "Make",
+            "--tag",
+            "DisplayName",
+            "--batch-size",
+            "1",
+            "--jobs",
+            "2",
+            "--walk",
+            str(tmp_dir),
+        ],
+    )
+    assert result.exit_code == 0
+    assert "Updated metadata for 2 files" in result.output
+
+    md1 = osxmetadata.OSXMetaData(file1)
+    tags = [t.name for t in md1.tags]
+    assert "Make: Apple" in tags
+
+    md2 = osxmetadata.OSXMetaData(file2)
+    tags = [t.name for t in md2.tags]
+    assert "DisplayName: Jellyfish" in tags
+
+    # reset tags for next test
+    md1.tags = []
+    md2.tags = []
+
+
+def test_walk_staged(tmp_dir):
+    """test --walk with --staged"""
+    from exif2findertags.cli import cli
+
+    file1 = str(tmp_dir / "photos" / pathlib.Path(TEST_IMAGE).name)
+    file2 = str(tmp_dir / "videos" / pathlib.Path(TEST_VIDEO).name)
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--tag",
+            "Make",
+            "--tag",
+            "DisplayName",
+            "--batch-size",
+            "1",
+            "--staged",
+            "--render-workers",
+            "2",
+            "--verbose",
+            "--walk",
+            str(tmp_dir),
+        ],
+    )
+    assert result.exit_code == 0
+    assert "Stage read: 2 files" in result.output
+    assert "Stage write: 2 files" in result.output
+    assert "Updated metadata for 2 files" in result.output
+
+    md1 = osxmetadata.OSXMetaData(file1)
+    tags = [t.name for t in md1.tags]
+    assert "Make: Apple" in tags
+
+    md2 = osxmetadata.OSXMetaData(file2)
+    tags = [t.name for t in md2.tags]
+    assert "DisplayName: Jellyfish" in tags
+
+    # reset tags for next test
+    md1.tags = []
+    md2.tags = []
+
+
+def test_walk_file_filter(tmp_dir):
+    """test --walk with --include-ext and --media-only"""
+    from exif2findertags.cli import cli
+
+    not_media = tmp_dir / "photos" / "notes.jpeg"
+    not_media.write_text("not a jpeg")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--tag",
+            "Make",
+            "--include-ext",
+            "jpeg",
+            "--media-only",
+            "--verbose",
+            "--walk",
+            str(tmp_dir),
+        ],
+    )
+    assert result.exit_code == 0
+    assert "Skipped 2 files not matching file filters" in result.output
+    assert "Updated metadata for 1 file" in result.output
+
+    # reset tags for next test
+    not_media.unlink()
+    osxmetadata.OSXMetaData(
+        str(tmp_dir / "photos" / pathlib.Path(TEST_IMAGE).name)
+    ).tags = []
+
+
+def test_incremental(tmp_path):
+    """test --incremental skips unchanged files and reprocesses files when settings change"""
+    from exif2findertags.cli import cli
+
+    test_file = copyfile(TEST_IMAGE, tmp_path / pathlib.Path(TEST_IMAGE).name)
+    state = str(tmp_path / "state.db")
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--tag", "Make", "--incremental", state, str(test_file)])
+    assert result.exit_code == 0
+    assert "Updated metadata for 1 file" in result.output
+
+    result = runner.invoke(cli, ["--tag", "Make", "--incremental", state, str(test_file)])
+    assert result.exit_code == 0
+    assert "Updated metadata for 0 files" in result.output
+
+    result = runner.invoke(
+        cli, ["--tag", "Make", "--tag", "ISO", "--incremental", state, str(test_file)]
+    )
+    assert result.exit_code == 0
+    assert "Updated metadata for 1 file" in result.output
+
+    md = osxmetadata.OSXMetaData(str(test_file))
+    tags = [t.name for t in md.tags]
+    assert "Make: Apple" in tags
+    assert "ISO: 20" in tags
+
+
+def test_stamp(tmp_path):
+    """test --stamp skips files that have not changed since they were processed"""
+    from exif2findertags.cli import cli
+
+    test_file = copyfile(TEST_IMAGE, tmp_path / pathlib.Path(TEST_IMAGE).name)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--tag", "Make", "--stamp", str(test_file)])
+    assert result.exit_code == 0
+    assert "Updated metadata for 1 file" in result.output
+
+    result = runner.invoke(
+        cli, ["--tag", "Make", "--stamp", "--verbose", str(test_file)]
+    )
+    assert result.exit_code == 0
+    assert "Processing stamps: skipped 1 unchanged files" in result.output
+    assert "Updated metadata for 0 files" in result.output
+
+
+def test_resume(tmp_dir, tmp_path):
+    """test --resume skips files completed in an earlier run"""
+    from exif2findertags.cli import cli
+
+    journal = str(tmp_path / "journal")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["--tag", "Make", "--resume", journal, "--walk", str(tmp_dir / "photos")]
+    )
+    assert result.exit_code == 0
+    assert "Updated metadata for 1 file" in result.output
+
+    result = runner.invoke(
+        cli, ["--tag", "Make", "--resume", journal, "--verbose", "--walk", str(tmp_dir)]
+    )
+    assert result.exit_code == 0
+    assert "Journal: skipped 1 completed files, 2 files completed" in result.output
+
+    # reset tags for next test
+    for file in [
+        tmp_dir / "photos" / pathlib.Path(TEST_IMAGE).name,
+        tmp_dir / "videos" / pathlib.Path(TEST_VIDEO).name,
+    ]:
+        osxmetadata.OSXMetaData(str(file)).tags = []
+
+
+def test_resume_jobs(tmp_dir, tmp_path):
+    """test --resume with --jobs loads the journal once and workers append to it"""
+    from exif2findertags.cli import cli
+
+    image = str(tmp_dir / "photos" / pathlib.Path(TEST_IMAGE).name)
+    video = str(tmp_dir / "videos" / pathlib.Path(TEST_VIDEO).name)
+    journal = tmp_path / "journal"
+    journal.write_bytes(image.encode() + b"\0/photos/incompl")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--tag",
+            "DisplayName",
+            "--resume",
+            str(journal),
+            "--jobs",
+            "2",
+            "--verbose",
+            "--walk",
+            str(tmp_dir),
+        ],
+    )
+    assert result.exit_code == 0
+    assert "Journal: skipped 1 completed files" in result.output
+    assert "Updated metadata for 1 file" in result.output
+    assert journal.read_bytes() == image.encode() + b"\0" + video.encode() + b"\0"
+
+    # reset tags for next test
+    osxmetadata.OSXMetaData(video).tags = []
+
+
+def test_files_from(tmp_dir):
+    """test --files-from with paths read from stdin"""
+    from exif2findertags.cli import cli
+
+    file1 = str(tmp_dir / "photos" / pathlib.Path(TEST_IMAGE).name)
+    file2 = str(tmp_dir / "videos" / pathlib.Path(TEST_VIDEO).name)
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        ["--tag", "Make", "--tag", "DisplayName", "--files-from", "-", "-0"],
+        input=f"{file1}\0{file2}\0{tmp_dir / 'missing.jpeg'}\0",
+    )
+    assert result.exit_code == 0
+    assert "File not found" in result.output
+    assert "Updated metadata for 2 files" in result.output
+
+    md1 = osxmetadata.OSXMetaData(file1)
+    tags = [t.name for t in md1.tags]
+    assert "Make: Apple" in tags
+
+    md2 = osxmetadata.OSXMetaData(file2)
+    tags = [t.name for t in md2.tags]
+    assert "DisplayName: Jellyfish" in tags
+
+    # reset tags for next test
+    md1.tags = []
+    md2.tags = []
+
+
+def test_shard(tmp_dir):
+    """test --shard processes each file in exactly one shard"""
+    from exif2findertags.cli import cli
+
+    runner = CliRunner()
+    files_updated = 0
+    for index in range(1, 4):
+        result = runner.invoke(
+            cli,
+            ["--tag", "Make", "--shard", f"{index}/3", "--dry-run", "--walk", str(tmp_dir)],
+        )
+        assert result.exit_code == 0
+        assert "files found were in this shard" in result.output
+        files_updated += int(result.output.split("Shard ")[1].split()[1])
+    assert files_updated == 2
+
+    result = runner.invoke(cli, ["--tag", "Make", "--shard", "4/3", str(tmp_dir)])
+    assert result.exit_code != 0
+    assert "invalid shard" in result.output
+
+
+def test_work_queue(tmp_dir, tmp_path):
+    """test --publish and --work process each file through a work queue"""
+    from exif2findertags.cli import cli
+    from exif2findertags.work_queue import WorkQueue
+
+    queue_db = str(tmp_path / "queue.db")
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--publish", queue_db, "--walk", str(tmp_dir)])
+    assert result.exit_code == 0
+    assert f"Published 2 files to {queue_db}" in result.output
+
+    result = runner.invoke(cli, ["--tag", "Make", "--work", queue_db])
+    assert result.exit_code == 0
+    assert "Updated metadata for 2 files" in result.output
+    queue = WorkQueue(queue_db)
+    assert queue.stats()["done"] == 2
+    queue.close()
+
+    # files already in the queue are not published again
+    result = runner.invoke(cli, ["--publish", queue_db, "--walk", str(tmp_dir)])
+    assert result.exit_code == 0
+    assert "Published 0 files" in result.output
+
+    result = runner.invoke(
+        cli, ["--tag", "Make", "--work", queue_db, "--publish", queue_db]
+    )
+    assert result.exit_code != 0
+
+
+def test_work_queue_publish_fails(tmp_dir, tmp_path, monkeypatch):
+    """test workers exit once the files published are done if --publish fails partway through"""
+    import exif2findertags.cli
+    import exif2findertags.work_queue
+    from exif2findertags.cli import cli
+    from exif2findertags.work_queue import WorkQueue
+
+    test_file = str(tmp_dir / "photos" / pathlib.Path(TEST_IMAGE).name)
+
+    def _iter_files(*args, **kwargs):
+        yield test_file
+        raise OSError("network share disconnected")
+
+    monkeypatch.setattr(exif2findertags.cli, "iter_files", _iter_files)
+    monkeypatch.setattr(exif2findertags.work_queue, "PUBLISH_BATCH_SIZE", 1)
+
+    queue_db = str(tmp_path / "queue.db")
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--publish", queue_db, "--walk", str(tmp_dir)])
+    assert result.exit_code != 0
+    queue = WorkQueue(queue_db)
+    assert not queue.publishing
+    assert queue.stats()["pending"] == 1
+    queue.close()
+
+    result = runner.invoke(cli, ["--tag", "Make", "--work", queue_db])
+    assert result.exit_code == 0
+    queue = WorkQueue(queue_db)
+    assert queue.stats()["done"] == 1
+    queue.close()
+
+
+def test_cache(tmp_path):
+    """test --cache and --cache-prune"""
+    from exif2findertags.cli import cli
+    from exif2findertags.exiftool import ExifToolCaching
+
+    test_file = copyfile(TEST_IMAGE, tmp_path / pathlib.Path(TEST_IMAGE).name)
+    cache = str(tmp_path / "cache.db")
+
+    runner = CliRunner()
+    for _ in range(2):
+        # simulate a new run
+        ExifToolCaching.clear()
+        result = runner.invoke(
+            cli, ["--tag", "Make", "--cache", cache, "--verbose", str(test_file)]
+        )
+        assert result.exit_code == 0
+    assert "Metadata cache: 1 hits, 0 misses" in result.output
+
+    md = osxmetadata.OSXMetaData(str(test_file))
+    tags = [t.name for t in md.tags]
+    assert "Make: Apple" in tags
+
+    test_file.unlink()
+    result = runner.invoke(cli, ["--cache", cache, "--cache-prune"])
+    assert result.exit_code == 0
+    assert "Pruned 1 entry from metadata cache, 0 entries remaining." in result.output
+
+
+def test_process_watched_changed_file(tmp_path, monkeypatch):
+    """test a watched file that changes twice is processed with its new metadata each time"""
+    import exif2findertags.cli
+    from exif2findertags.exiftofinder import ExifToFinder
+    from exif2findertags.exiftool import ExifTool
+
+    test_file = copyfile(TEST_IMAGE, tmp_path / pathlib.Path(TEST_IMAGE).name)
+
+    def _watch_directories(dirs, **kwargs):
+        for make in ["Apple", "Foo", "Bar"]:
+            if make != "Apple":
+                ExifTool(test_file).setvalue("EXIF:Make", make)
+            yield [test_file]
+            tags = [t.name for t in osxmetadata.OSXMetaData(str(test_file)).tags]
+            assert tags == [f"Make: {make}"]
+
+    monkeypatch.setattr(exif2findertags.cli, "watch_directories", _watch_directories)
+    e2f = ExifToFinder(
+        tags=["Make"],
+        tag_values=[],
+        fc_tags=[],
+        fc_tag_values=[],
+        xattr_template=[],
+        verbose=lambda *args, **kwargs: None,
+        overwrite_tags=True,
+    )
+    assert exif2findertags.cli.process_watched(e2f, [tmp_path]) == 3
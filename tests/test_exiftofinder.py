@@ -0,0 +1,81 @@
+""" Test ExifToFinder, requires exiftool to be installed (https://exiftool.org/)"""
+
+import asyncio
+import pathlib
+import threading
+from shutil import copyfile
+
+import osxmetadata
+
+from exif2findertags.exiftofinder import ExifToFinder
+
+TEST_IMAGE = "tests/apples.jpeg"
+TEST_VIDEO = "tests/Jellyfish.mov"
+
+
+def test_process_files_async(tmp_path):
+    """test ExifToFinder.process_files_async"""
+    files = [
+        copyfile(TEST_IMAGE, tmp_path / pathlib.Path(TEST_IMAGE).name),
+        copyfile(TEST_VIDEO, tmp_path / pathlib.Path(TEST_VIDEO).name),
+    ]
+
+    threads = set()
+
+    async def _test():
+        e2f = ExifToFinder(
+            tags=["Make", "DisplayName"],
+            tag_values=[],
+            fc_tags=[],
+            fc_tag_values=[],
+            xattr_template=[],
+            verbose=lambda *args, **kwargs: None,
+            batch_size=1,
+        )
+        write_file = e2f.write_file
+
+        def _write_file(filename, rendered):
+            # files are written off the event loop's thread
+            threads.add(threading.current_thread())
+            return write_file(filename, rendered)
+
+        e2f.write_file = _write_file
+        try:
+            return await e2f.process_files_async(files)
+        finally:
+            await e2f.aclose()
+
+    assert asyncio.run(_test()) == 2
+    assert threads and threading.main_thread() not in threads
+    tags = [t.name for t in osxmetadata.OSXMetaData(str(files[0])).tags]
+    assert "Make: Apple" in tags
+    tags = [t.name for t in osxmetadata.OSXMetaData(str(files[1])).tags]
+    assert "DisplayName: Jellyfish" in tags
+
+
+def test_submit_batch_pipeline_killed(tmp_path):
+    """test submit_batch replaces the exiftool pipeline if its process is killed mid-run"""
+    files = [copyfile(TEST_IMAGE, tmp_path / f"{i}.jpeg") for i in range(4)]
+    e2f = ExifToFinder(
+        tags=["Make"],
+        tag_values=[],
+        fc_tags=[],
+        fc_tag_values=[],
+        xattr_template=[],
+        verbose=lambda *args, **kwargs: None,
+        batch_size=1,
+    )
+    files_updated = e2f.submit_batch([files[0]])
+    pipeline = e2f._pipeline
+    pipeline._proc.process.kill()
+    pipeline._proc.process.wait()
+    for filename in files[1:]:
+        files_updated += e2f.submit_batch([filename])
+    files_updated += e2f.flush()
+    assert e2f._pipeline is not pipeline
+    e2f.close()
+
+    assert files_updated == 4
+    for filename in files:
+        tags = [t.name for t in osxmetadata.OSXMetaData(str(filename)).tags]
+        assert "Make: Apple" in tags
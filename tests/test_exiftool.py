@@ -0,0 +1,254 @@
+""" Test exiftool wrapper, requires exiftool to be installed (https://exiftool.org/)"""
+
+import asyncio
+import pathlib
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from shutil import copyfile
+
+import pytest
+
+from exif2findertags.exiftool import (
+    EXIFTOOL_CACHE_MAX_BYTES,
+    EXIFTOOL_CACHE_MAX_ENTRIES,
+    AsyncExifTool,
+    ExifTool,
+    ExifToolCaching,
+    ExifToolPipeline,
+    ExifToolPool,
+    _split_exiftool_output,
+    exiftool_read_batch,
+)
+
+TEST_IMAGE = "tests/apples.jpeg"
+TEST_VIDEO = "tests/Jellyfish.mov"
+
+
+def test_exiftool_read_batch():
+    """test exiftool_read_batch"""
+    files = [TEST_IMAGE, TEST_VIDEO]
+    results = exiftool_read_batch(files)
+    assert sorted(results.keys()) == sorted(files)
+    assert results[TEST_IMAGE]["EXIF:Make"] == "Apple"
+    assert results[TEST_VIDEO]["SourceFile"] == TEST_VIDEO
+    assert results[TEST_IMAGE] == ExifTool(TEST_IMAGE).asdict()
+
+
+def test_exiftool_read_batch_missing_file():
+    """test exiftool_read_batch with a file that does not exist"""
+    results = exiftool_read_batch([TEST_IMAGE, "tests/does_not_exist.jpeg"])
+    assert list(results.keys()) == [TEST_IMAGE]
+
+
+def test_exiftool_read_batch_unicode(tmp_path):
+    """test exiftool_read_batch matches files whose names differ in Unicode normalization"""
+    nfc_name = "café.jpeg"
+    nfd_name = "café.jpeg"
+    copyfile(TEST_IMAGE, tmp_path / nfc_name)
+    for name in [nfc_name, nfd_name]:
+        filepath = str(tmp_path / name)
+        if not pathlib.Path(filepath).exists():
+            # filesystem does not normalize Unicode file names
+            continue
+        results = exiftool_read_batch([filepath])
+        assert list(results.keys()) == [filepath]
+
+
+def test_exiftool_caching_prefetch(tmp_path):
+    """test ExifToolCaching.prefetch"""
+    filepath = tmp_path / pathlib.Path(TEST_IMAGE).name
+    copyfile(TEST_IMAGE, filepath)
+    ExifToolCaching.prefetch([filepath])
+    exiftool = ExifToolCaching(filepath)
+    assert exiftool.asdict()["EXIF:Make"] == "Apple"
+    assert exiftool.asdict(tag_groups=False)["Make"] == "Apple"
+
+
+def test_exiftool_pool_threads():
+    """test ExifToolPool with multiple threads reading concurrently"""
+    pool = ExifToolPool()
+    files = [TEST_IMAGE, TEST_VIDEO] * 8
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda f: ExifTool(f).asdict(), files))
+    assert [r["SourceFile"] for r in results] == files
+    assert len(pool._procs) <= pool.size
+
+
+def test_exiftool_pool_restart():
+    """test ExifToolPool restarts an exiftool process that has died"""
+    pool = ExifToolPool()
+    with pool.checkout() as proc:
+        proc.process.kill()
+        proc.process.wait()
+    assert ExifTool(TEST_IMAGE).asdict()["EXIF:Make"] == "Apple"
+
+
+def test_exiftool_caching_views(tmp_path):
+    """test ExifToolCaching derives all asdict views from a single read"""
+    filepath = tmp_path / pathlib.Path(TEST_IMAGE).name
+    copyfile(TEST_IMAGE, filepath)
+    exiftool = ExifToolCaching(filepath)
+    exifdict = exiftool.asdict()
+
+    # any further reads would fail
+    exiftool.run_commands = None
+
+    assert exiftool.asdict(tag_groups=False)["Make"] == exifdict["EXIF:Make"]
+    assert exiftool.asdict(normalized=True)["exif:make"] == exifdict["EXIF:Make"]
+    assert exiftool.asdict(tag_groups=False, normalized=True)["make"] == "Apple"
+    merged = exiftool.asdict_merged()
+    assert merged["Make"] == merged["EXIF:Make"] == "Apple"
+    assert (
+        exiftool.asdict_merged(normalized=True)["iptc:keywords"] == merged["Keywords"]
+    )
+    assert exiftool.asdict(tag_groups=False) is exiftool.asdict(tag_groups=False)
+    assert exiftool.asdict_merged() == ExifTool(filepath).asdict_merged()
+
+
+def test_split_exiftool_output():
+    """test _split_exiftool_output separates warnings and errors from output"""
+    buffer = bytearray(b"  [{}]\n{ready}\n")
+    assert _split_exiftool_output(buffer, buffer.find(b"{ready}")) == (
+        b"[{}]",
+        b"",
+        b"",
+    )
+
+    buffer = bytearray(
+        b'Warning: foo\n[{\n  "ExifTool:Warning": "bar"\n}]\nError: baz\n{ready}\n'
+    )
+    output, warning, error = _split_exiftool_output(buffer, buffer.find(b"{ready}"))
+    assert output == b'[{\n  "ExifTool:Warning": "bar"\n}]'
+    assert warning == b"Warning: foo"
+    assert error == b"Error: baz"
+
+
+def test_exiftool_caching_canonical_path(tmp_path):
+    """test ExifToolCaching uses a single cache entry for str and Path to the same file"""
+    filepath = tmp_path / pathlib.Path(TEST_IMAGE).name
+    copyfile(TEST_IMAGE, filepath)
+    ExifToolCaching.clear()
+    exiftool = ExifToolCaching(filepath)
+    assert ExifToolCaching(str(filepath)) is exiftool
+    assert ExifToolCaching(f"{tmp_path}/./{filepath.name}") is exiftool
+    assert ExifToolCaching.cache_stats()["entries"] == 1
+
+    assert ExifToolCaching.evict(str(filepath)) == 1
+    assert ExifToolCaching(filepath) is not exiftool
+
+
+def test_exiftool_caching_lru(tmp_path):
+    """test ExifToolCaching evicts least recently used files"""
+    files = []
+    for i in range(3):
+        filepath = tmp_path / f"apples{i}.jpeg"
+        copyfile(TEST_IMAGE, filepath)
+        files.append(filepath)
+
+    ExifToolCaching.clear()
+    ExifToolCaching.configure_cache(max_entries=2)
+    try:
+        exiftool0 = ExifToolCaching(files[0])
+        exiftool1 = ExifToolCaching(files[1])
+        assert ExifToolCaching(files[0]) is exiftool0
+        ExifToolCaching(files[2])
+        stats = ExifToolCaching.cache_stats()
+        assert stats["entries"] == 2
+        assert stats["evictions"] == 1
+        assert ExifToolCaching(files[0]) is exiftool0
+        assert ExifToolCaching(files[1]) is not exiftool1
+
+        # byte budget
+        nbytes = ExifToolCaching.cache_stats()["bytes"]
+        assert nbytes > 0
+        ExifToolCaching.configure_cache(max_entries=0, max_bytes=nbytes // 2)
+        assert ExifToolCaching.cache_stats()["entries"] == 1
+    finally:
+        ExifToolCaching.configure_cache(
+            max_entries=EXIFTOOL_CACHE_MAX_ENTRIES, max_bytes=EXIFTOOL_CACHE_MAX_BYTES
+        )
+        ExifToolCaching.clear()
+
+
+def test_exiftool_pipeline():
+    """test ExifToolPipeline with multiple commands in flight"""
+    with ExifToolPipeline(depth=2) as pipeline:
+        futures = [
+            pipeline.read_batch([TEST_IMAGE]),
+            pipeline.read_batch([TEST_VIDEO], read_args=["-QuickTime:all"]),
+            pipeline.read_batch([TEST_IMAGE, TEST_VIDEO]),
+            pipeline.submit(b"-ver\n"),
+        ]
+        assert futures[0].result()[TEST_IMAGE] == ExifTool(TEST_IMAGE).asdict()
+        assert all(
+            key.startswith("QuickTime:") or key == "SourceFile"
+            for key in futures[1].result()[TEST_VIDEO]
+        )
+        assert sorted(futures[2].result()) == sorted([TEST_IMAGE, TEST_VIDEO])
+        output, _, _ = futures[3].result()
+        assert output.decode("utf-8") == ExifTool(TEST_IMAGE).version
+
+
+def test_exiftool_pipeline_failed():
+    """test ExifToolPipeline fails pending commands if exiftool dies"""
+    pipeline = ExifToolPipeline()
+    pipeline._proc.process.kill()
+    pipeline._proc.process.wait()
+    assert not pipeline.failed
+    with pytest.raises(OSError):
+        pipeline.read_batch([TEST_IMAGE]).result()
+    assert pipeline.failed
+    with pytest.raises(OSError):
+        pipeline.read_batch([TEST_IMAGE])
+    pipeline.close()
+
+
+def test_exiftool_caching_prefetch_async(tmp_path):
+    """test ExifToolCaching.prefetch_async"""
+    filepath = tmp_path / pathlib.Path(TEST_IMAGE).name
+    copyfile(TEST_IMAGE, filepath)
+    ExifToolCaching.clear()
+    with ExifToolPipeline() as pipeline:
+        ExifToolCaching.prefetch_async([filepath], pipeline).result()
+    assert ExifToolCaching.cache_stats()["entries"] == 1
+    exiftool = ExifToolCaching(filepath)
+    exiftool.run_commands = None
+    assert exiftool.asdict()["EXIF:Make"] == "Apple"
+
+
+def test_async_exiftool():
+    """test AsyncExifTool"""
+
+    async def _test():
+        async with AsyncExifTool(size=2) as exiftool:
+            exifdict = await exiftool.asdict(TEST_IMAGE)
+            assert exifdict == ExifTool(TEST_IMAGE).asdict()
+            assert (await exiftool.asdict(TEST_IMAGE, tag_groups=False))[
+                "Make"
+            ] == "Apple"
+            assert await exiftool.version() == ExifTool(TEST_IMAGE).version
+
+            files = [TEST_IMAGE, TEST_VIDEO, "tests/does_not_exist.jpeg"]
+            results = await exiftool.read_many(files * 3, batch_size=2)
+            assert sorted(results) == sorted(files[:2])
+            assert results[TEST_IMAGE] == exifdict
+            assert len(exiftool._procs) <= 2
+
+    asyncio.run(_test())
+
+
+def test_exiftool_caching_aprefetch(tmp_path):
+    """test ExifToolCaching.aprefetch"""
+    filepath = tmp_path / pathlib.Path(TEST_IMAGE).name
+    copyfile(TEST_IMAGE, filepath)
+    missing = tmp_path / "does_not_exist.jpeg"
+
+    async def _test():
+        async with AsyncExifTool() as exiftool:
+            await ExifToolCaching.aprefetch([filepath, missing], exiftool)
+
+    ExifToolCaching.clear()
+    asyncio.run(_test())
+    assert ExifToolCaching.cache_stats()["entries"] == 2
+    assert ExifToolCaching(filepath).asdict()["EXIF:Make"] == "Apple"
+    assert ExifToolCaching(missing).asdict() == {}
@@ -0,0 +1,67 @@
+"""Test FileFilter"""
+
+from exif2findertags.file_filter import FileFilter, is_media_file
+from exif2findertags.walk import walk_files
+
+TEST_IMAGE = "tests/apples.jpeg"
+TEST_VIDEO = "tests/Jellyfish.mov"
+
+
+def test_is_media_file(tmp_path):
+    """test is_media_file recognizes media by content"""
+    assert is_media_file(TEST_IMAGE)
+    assert is_media_file(TEST_VIDEO)
+    not_media = tmp_path / "image.jpeg"
+    not_media.write_bytes(b"not a jpeg")
+    assert not is_media_file(not_media)
+    assert not is_media_file(tmp_path / "does_not_exist.jpeg")
+
+
+def test_file_filter_ext():
+    """test FileFilter with include_ext and exclude_ext"""
+    file_filter = FileFilter(include_ext=["jpg", ".HEIC"])
+    assert file_filter
+    assert file_filter.match_file("/photos/IMG_0001.JPG")
+    assert file_filter.match_file("/photos/IMG_0002.heic")
+    assert not file_filter.match_file("/photos/IMG_0001.aae")
+    assert not file_filter.match_file("/photos/.DS_Store")
+    assert file_filter.rejected == 2
+
+    file_filter = FileFilter(exclude_ext=["aae"])
+    assert file_filter.match_file("/photos/IMG_0001.jpg")
+    assert not file_filter.match_file("/photos/IMG_0001.AAE")
+
+
+def test_file_filter_glob():
+    """test FileFilter with include_glob and exclude_glob"""
+    file_filter = FileFilter(include_glob=["IMG_*"], exclude_glob=["*/Render Files/*"])
+    assert file_filter.match_file("/photos/IMG_0001.jpg")
+    assert not file_filter.match_file("/photos/DSC_0001.jpg")
+    assert not file_filter.match_file("/photos/Render Files/IMG_0001.mov")
+
+    file_filter = FileFilter(exclude_glob=["*.fcpcache"])
+    assert not file_filter.match_directory("/library/Render.fcpcache")
+    assert file_filter.match_directory("/library/Original Media")
+
+
+def test_file_filter_empty():
+    """test FileFilter with no filters matches everything"""
+    file_filter = FileFilter()
+    assert not file_filter
+    assert file_filter.match_file("/photos/.DS_Store")
+    assert file_filter.match_directory("/photos")
+
+
+def test_walk_files_file_filter(tmp_path):
+    """test walk_files with a FileFilter"""
+    (tmp_path / "cache.fcpcache").mkdir()
+    (tmp_path / "cache.fcpcache" / "1.jpeg").write_bytes(b"\xff\xd8\xff\xe0")
+    (tmp_path / "2.jpeg").write_bytes(b"\xff\xd8\xff\xe0")
+    (tmp_path / "3.jpeg").write_bytes(b"not a jpeg")
+    (tmp_path / "4.txt").write_bytes(b"text")
+    (tmp_path / ".DS_Store").write_bytes(b"\x00\x00\x00\x01Bud1")
+
+    file_filter = FileFilter(exclude_glob=["*.fcpcache"], media_only=True)
+    files = list(walk_files(tmp_path, file_filter=file_filter))
+    assert [f.name for f in files] == ["2.jpeg"]
+    assert file_filter.rejected == 3
@@ -0,0 +1,32 @@
+"""Test reading lists of paths with read_paths"""
+
+import io
+
+import pytest
+
+from exif2findertags import files_from
+from exif2findertags.files_from import read_paths
+
+
+@pytest.mark.parametrize(
+    "data,null",
+    [
+        (b"/a/1.jpeg\n/a/2 with space.jpeg\r\n\n/b/3.mov", False),
+        (b"/a/1.jpeg\0/a/2 with space.jpeg\0\0/b/3.mov\0", True),
+    ],
+)
+def test_read_paths(data, null):
+    """test read_paths with newline and NUL separated lists"""
+    assert list(read_paths(io.BytesIO(data), null=null)) == [
+        "/a/1.jpeg",
+        "/a/2 with space.jpeg",
+        "/b/3.mov",
+    ]
+
+
+def test_read_paths_chunks(monkeypatch):
+    """test read_paths with paths split across reads"""
+    monkeypatch.setattr(files_from, "READ_SIZE", 3)
+    paths = [f"/photos/IMG_{i:04}.jpeg" for i in range(100)]
+    data = io.BufferedReader(io.BytesIO("\n".join(paths).encode()))
+    assert list(read_paths(data)) == paths
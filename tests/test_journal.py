@@ -0,0 +1,52 @@
+"""Test Journal"""
+
+import pathlib
+
+from exif2findertags.journal import Journal
+
+
+def test_journal(tmp_path):
+    """test Journal records completed files and loads them when reopened"""
+    path = tmp_path / "journal"
+    journal = Journal(path, flush_interval=2)
+    assert not journal.completed(tmp_path / "1.jpeg")
+    journal.record(tmp_path / "1.jpeg")
+    journal.record(str(tmp_path / "1.jpeg"))
+    journal.record(tmp_path / "2.jpeg")
+    journal.record(tmp_path / "3.jpeg")
+    assert journal.completed(str(tmp_path / "1.jpeg"))
+    assert len(journal) == 3
+
+    # entries are flushed in batches
+    assert len(Journal(path)) == 2
+    journal.close()
+
+    journal = Journal(path)
+    assert journal.loaded == 3
+    assert journal.completed(tmp_path / "3.jpeg")
+    assert not journal.completed(tmp_path / "4.jpeg")
+    assert journal.skipped == 1
+    journal.close()
+
+
+def test_journal_incomplete_entry(tmp_path):
+    """test Journal ignores an entry that was not completely written"""
+    path = tmp_path / "journal"
+    path.write_bytes(b"/photos/1.jpeg\0/photos/2.jp")
+    journal = Journal(path)
+    assert journal.completed(pathlib.Path("/photos/1.jpeg"))
+    assert not journal.completed(pathlib.Path("/photos/2.jpeg"))
+    journal.record(pathlib.Path("/photos/3.jpeg"))
+    journal.close()
+    assert path.read_bytes() == b"/photos/1.jpeg\0/photos/3.jpeg\0"
+
+
+def test_journal_append_only(tmp_path):
+    """test Journal opened with load=False appends without reading or changing existing entries"""
+    path = tmp_path / "journal"
+    path.write_bytes(b"/photos/1.jpeg\0")
+    journal = Journal(path, load=False)
+    assert not journal.completed(pathlib.Path("/photos/1.jpeg"))
+    journal.record(pathlib.Path("/photos/2.jpeg"))
+    journal.close()
+    assert path.read_bytes() == b"/photos/1.jpeg\0/photos/2.jpeg\0"
@@ -0,0 +1,117 @@
+""" Test persistent metadata cache, requires exiftool to be installed (https://exiftool.org/)"""
+
+import os
+import pathlib
+import sqlite3
+from shutil import copyfile
+
+import pytest
+
+import exif2findertags.metadata_cache
+from exif2findertags.exiftool import ExifToolCaching, exiftool_read_batch
+from exif2findertags.metadata_cache import MetadataCache
+
+TEST_IMAGE = "tests/apples.jpeg"
+TEST_VIDEO = "tests/Jellyfish.mov"
+
+
+@pytest.fixture
+def tmp_image(tmp_path):
+    return copyfile(TEST_IMAGE, tmp_path / pathlib.Path(TEST_IMAGE).name)
+
+
+def test_metadata_cache_get_set(tmp_path, tmp_image):
+    """test MetadataCache stores metadata per read profile and exiftool version"""
+    exifdict = exiftool_read_batch([tmp_image])[tmp_image]
+    cache = MetadataCache(tmp_path / "cache.db", "12.00")
+    assert cache.get(tmp_image) is None
+    cache.set(tmp_image, exifdict)
+    assert cache.get(tmp_image) == exifdict
+    assert cache.get(tmp_image, read_args=["-Make"]) is None
+    cache.close()
+
+    # cache persists between runs but not between exiftool versions
+    cache = MetadataCache(tmp_path / "cache.db", "12.00")
+    assert cache.get(tmp_image) == exifdict
+    assert cache.stats()["hits"] == 1
+    cache.close()
+    cache = MetadataCache(tmp_path / "cache.db", "12.01")
+    assert cache.get(tmp_image) is None
+    cache.close()
+
+
+def test_metadata_cache_file_changed(tmp_path, tmp_image):
+    """test MetadataCache ignores entries for files that have changed"""
+    cache = MetadataCache(tmp_path / "cache.db", "12.00")
+    cache.set(tmp_image, {"EXIF:Make": "Apple"})
+    stat = os.stat(tmp_image)
+    os.utime(tmp_image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.get(tmp_image) is None
+    assert cache.prune() == 1
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+
+def test_metadata_cache_evict(tmp_path):
+    """test MetadataCache evicts least recently used entries"""
+    files = []
+    for i in range(3):
+        filepath = tmp_path / f"file{i}.jpeg"
+        filepath.write_bytes(b"")
+        files.append(filepath)
+
+    cache = MetadataCache(tmp_path / "cache.db", "12.00")
+    for filepath in files:
+        cache.set(filepath, {"SourceFile": str(filepath), "Data": "x" * 1000})
+    cache.get(files[0])
+    size = cache.stats()["size"]
+    cache.close()
+
+    cache = MetadataCache(tmp_path / "cache.db", "12.00", max_size=size * 2 // 3)
+    assert cache.prune() == 1
+    assert cache.get(files[0]) is not None
+    assert cache.get(files[1]) is None
+    assert cache.get(files[2]) is not None
+    cache.close()
+
+
+def test_metadata_cache_locked(tmp_path, monkeypatch):
+    """test MetadataCache treats a database locked by another process as a cache miss"""
+    monkeypatch.setattr(exif2findertags.metadata_cache, "CACHE_BUSY_TIMEOUT", 0.1)
+    filepath = tmp_path / "file.jpeg"
+    filepath.write_bytes(b"")
+    exifdict = {"SourceFile": str(filepath), "EXIF:Make": "Apple"}
+    cache = MetadataCache(tmp_path / "cache.db", "12.00")
+
+    # another worker holds the write lock
+    other = sqlite3.connect(tmp_path / "cache.db", isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    cache.set(filepath, exifdict)
+    assert cache.stats()["size"] == 0
+    other.execute("ROLLBACK")
+    other.close()
+
+    assert cache.get(filepath) is None
+    cache.set(filepath, exifdict)
+    assert cache.get(filepath) == exifdict
+    cache.close()
+
+
+def test_exiftool_caching_metadata_cache(tmp_path, tmp_image):
+    """test ExifToolCaching reads from and writes to the persistent metadata cache"""
+    cache = MetadataCache(tmp_path / "cache.db", "12.00")
+    ExifToolCaching.set_metadata_cache(cache)
+    try:
+        ExifToolCaching.prefetch([tmp_image])
+        assert cache.stats()["entries"] == 1
+
+        # metadata for a new path to the same file is read from the cache
+        ExifToolCaching.clear()
+        cache.set(tmp_image, {"SourceFile": str(tmp_image), "EXIF:Make": "Cached"})
+        assert ExifToolCaching(tmp_image).asdict()["EXIF:Make"] == "Cached"
+        ExifToolCaching.prefetch([str(tmp_image)])
+        assert ExifToolCaching(str(tmp_image)).asdict()["EXIF:Make"] == "Cached"
+    finally:
+        ExifToolCaching.set_metadata_cache(None)
+        ExifToolCaching.clear()
+        cache.close()
@@ -0,0 +1,61 @@
+"""Test MetadataView"""
+
+from exif2findertags.exiftool import _exifdict_merged, _exifdict_view
+from exif2findertags.metadata_view import MetadataView
+
+EXIFDICT = {
+    "SourceFile": "tests/apples.jpeg",
+    "EXIF:Make": "Apple",
+    "EXIF:ISO": 100,
+    "IPTC:Keywords": ["Travel", "Fruit"],
+    "XMP:Subject": ["Travel", "(Binary data 0 bytes, use -b option to extract)"],
+    "XMP:Description": "(Binary data 0 bytes, use -b option to extract)",
+    "EXIF:ImageDescription": "First",
+    "XMP:ImageDescription": "Second",
+}
+
+
+def test_metadata_view_lookup():
+    """test tags are found with or without group in any case with values as str"""
+    metadata = MetadataView(EXIFDICT)
+    assert metadata.values("EXIF:Make") == ["Apple"]
+    assert metadata.values("make") == ["Apple"]
+    assert metadata.values("exif:iso") == ["100"]
+    assert metadata.value("ISO") == 100
+    assert metadata.values("Keywords") == ["Travel", "Fruit"]
+    assert metadata.tag_name("keywords") == "Keywords"
+    assert metadata.tag_name("iptc:keywords") == "IPTC:Keywords"
+    assert "IPTC:KEYWORDS" in metadata
+    assert "Foo" not in metadata
+    assert metadata.values("Foo") == []
+    assert metadata.value("Foo") is None
+    assert metadata.tag_name("Foo") is None
+
+
+def test_metadata_view_binary_data():
+    """test binary data placeholders are filtered out of values"""
+    metadata = MetadataView(EXIFDICT)
+    assert metadata.values("Subject") == ["Travel"]
+    assert metadata.values("XMP:Description") == []
+    assert "XMP:Description" in metadata
+
+
+def test_metadata_view_matches_asdict_merged():
+    """test lookups return the same values as ExifTool.asdict_merged(normalized=True)"""
+    metadata = MetadataView(EXIFDICT)
+    merged = _exifdict_merged(
+        _exifdict_view(EXIFDICT, tag_groups=False, normalized=True),
+        _exifdict_view(EXIFDICT, tag_groups=True, normalized=True),
+    )
+    for tag, value in merged.items():
+        assert metadata.value(tag) == value
+    # last group wins for bare tag names
+    assert metadata.values("ImageDescription") == ["Second"]
+
+
+def test_metadata_view_grouped_items():
+    """test grouped_items returns tags with groups in exiftool order"""
+    metadata = MetadataView(EXIFDICT)
+    assert [tag for tag, _ in metadata.grouped_items()] == list(EXIFDICT)
+    assert dict(metadata.grouped_items())["IPTC:Keywords"] == ["Travel", "Fruit"]
+    assert len(metadata) == len(EXIFDICT)
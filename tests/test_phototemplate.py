@@ -4,7 +4,14 @@ import pathlib
 from os import getcwd
 
 import pytest
-from exif2findertags.phototemplate import PhotoTemplate, RenderOptions
+from exif2findertags.exiftool import _exifdict_merged, _exifdict_view
+from exif2findertags.metadata_view import MetadataView
+from exif2findertags.phototemplate import (
+    NONE_STR_SENTINEL,
+    PhotoTemplate,
+    PhotoTemplateParser,
+    RenderOptions,
+)
 
 TEST_IMAGE = "tests/apples.jpeg"
 
@@ -18,6 +25,101 @@ TEMPLATES = {
     "Foo={XMP:Foo}": [],
 }
 
+# metadata used to render templates without exiftool
+EXIFDICT = {
+    "SourceFile": TEST_IMAGE,
+    "EXIF:Make": "Apple",
+    "EXIF:Model": "iPhone SE (2nd generation)",
+    "EXIF:ISO": 100,
+    "EXIF:FNumber": 1.8,
+    "EXIF:Flash": 24,
+    "EXIF:ModifyDate": "2021:08:22 11:43:56",
+    "IPTC:Keywords": ["Travel", "Fruit", " Apple "],
+    "XMP:Subject": ["Travel", "Fruit"],
+    "XMP:Description": "(Binary data 0 bytes, use -b option to extract)",
+    "Composite:SubSecDateTimeOriginal": "2021:08:22 11:43:56.359-04:00",
+}
+
+# templates rendered by both the compiled renderer and the reference renderer
+COMPILER_TEMPLATES = [
+    "",
+    "plain text",
+    "{Make}",
+    "{EXIF:Make}",
+    "{make}",
+    "{Foo}",
+    "{Foo,}",
+    "{Foo,none}",
+    "{Foo,{Make}}",
+    "Keyword={IPTC:Keywords}",
+    "{Keywords}-{Subject}",
+    "{XMP:Description}",
+    "{,+Keywords}",
+    "{+Keywords}",
+    "{; +Keywords|lower}",
+    "{Keywords|lower|braces}",
+    "{Keywords|upper|parens}",
+    "{Keywords|strip|brackets}",
+    "{Keywords|titlecase}{comma}{Model|capitalize}",
+    "{Keywords|shell_quote}",
+    "{Keywords[Fruit,Vegetable|Travel,]}",
+    "{Keywords|lower[fruit,]}",
+    "{Keywords contains Fru?yes,no}",
+    "{Keywords not contains Fru?yes,no}",
+    "{Keywords matches Fruit|Pie?yes,no}",
+    "{Keywords startswith Tr?yes,no}",
+    "{Keywords endswith it?yes,no}",
+    "{Make == Apple?yes,no}",
+    "{Make != Apple?yes,no}",
+    "{ISO < 200?low,high}",
+    "{ISO <= 100?low,high}",
+    "{ISO > 200?high,low}",
+    "{FNumber >= 1.8?wide,narrow}",
+    "{ISO not > 200?low,high}",
+    "{Make?has make,no make}",
+    "{Foo?has foo,no foo}",
+    "{Make?}",
+    "{Foo?yes}",
+    "{Foo?yes}{Make}",
+    "{created}",
+    "{created.year}-{created.mm}-{created.dd}",
+    "{created.strftime,%Y-%U}",
+    "{created.strftime}",
+    "{modified.month}",
+    "{modified.date}",
+    "{today.year}",
+    "{comma}{semicolon}{pipe}{questionmark}{newline}{cr}{crlf}",
+    "{openbrace}{closebrace}{openparens}{closeparens}{openbracket}{closebracket}",
+    "{filepath.name}",
+    "{filepath.stem|upper}",
+    "{GROUP} - {TAG} = {VALUE}",
+    "{GROUP|lower} - {TAG|lower} = {VALUE|upper}",
+    "{strip, {Make} }",
+    "{ModifyDate}",
+    "{Make|foo}",
+    "{Keywords < 10?yes,no}",
+    "{Make > 10?yes,no}",
+]
+
+
+class FakeExifTool:
+    """Stand-in for ExifToolCaching that returns metadata from EXIFDICT"""
+
+    def __init__(self, exifdict):
+        self.exifdict = exifdict
+
+    def asdict(self, tag_groups=True, normalized=False):
+        return _exifdict_view(self.exifdict, tag_groups=tag_groups, normalized=normalized)
+
+    def asdict_merged(self, normalized=False):
+        return _exifdict_merged(
+            self.asdict(tag_groups=False, normalized=normalized),
+            self.asdict(tag_groups=True, normalized=normalized),
+        )
+
+    def metadata_view(self):
+        return MetadataView(self.exifdict)
+
 
 def test_phototemplate_1():
     """Test PhotoTemplate"""
@@ -46,3 +148,114 @@ def test_phototemplate_tag_filter():
     options = RenderOptions(tag="EXIF:Make")
     rendered, _ = t.render("{GROUP|lower} - {TAG|lower} = {VALUE|upper}", options)
     assert rendered == ["exif - make = APPLE"]
+
+
+def test_phototemplate_parser_cache():
+    """Test PhotoTemplateParser caches parsed templates"""
+    parser = PhotoTemplateParser()
+    stats = parser.cache_stats()
+    model = parser.parse("{Make|lower} {Model}")
+    assert parser.parse("{Make|lower} {Model}") is model
+    new_stats = parser.cache_stats()
+    assert new_stats["hits"] == stats["hits"] + 1
+    assert new_stats["misses"] == stats["misses"] + 1
+
+
+def test_phototemplate_parser_cache_evict():
+    """Test PhotoTemplateParser evicts least recently used templates"""
+    parser = PhotoTemplateParser()
+    max_entries = parser.max_entries
+    parser.max_entries = 2
+    try:
+        model = parser.parse("{ISO}")
+        parser.parse("{FNumber}")
+        parser.parse("{ISO}")
+        parser.parse("{ExposureTime}")
+        assert parser.parse("{ISO}") is model
+        assert parser.cache_stats()["entries"] == 2
+    finally:
+        parser.max_entries = max_entries
+
+
+def test_phototemplate_parser_validate():
+    """Test PhotoTemplateParser.validate raises ValueError for invalid templates"""
+    parser = PhotoTemplateParser()
+    parser.validate("{Make}")
+    with pytest.raises(ValueError, match="Invalid template syntax"):
+        parser.validate("{Make")
+
+
+def _render_reference(phototemplate, template):
+    """Render template with the reference renderer that walks the parsed model"""
+    model = PhotoTemplateParser().parse(template)
+    if not model:
+        return [], []
+    rendered, unmatched = phototemplate._render_statement(model)
+    return [r for r in rendered if NONE_STR_SENTINEL not in r], unmatched
+
+
+def _render_or_error(render, *args):
+    """Return result of render(*args) or the error if it raised an exception"""
+    try:
+        return render(*args)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+@pytest.mark.parametrize("template", COMPILER_TEMPLATES + list(TEMPLATES))
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"tag": "EXIF:Make"},
+        {"tag": "IPTC:Keywords", "expand_inplace": True},
+        {"filename": True},
+        {"dirname": True, "strip": True},
+    ],
+)
+def test_phototemplate_compiled(template, options):
+    """Test compiled templates render the same as the reference renderer"""
+    test_image = pathlib.Path(getcwd()) / TEST_IMAGE
+    t = PhotoTemplate(test_image)
+    options = RenderOptions(
+        exiftool=FakeExifTool(EXIFDICT), filepath=str(test_image), **options
+    )
+    compiled = _render_or_error(t.render, template, options)
+    reference = _render_or_error(_render_reference, t, template)
+    assert compiled == reference
+
+
+def test_phototemplate_render_many():
+    """Test render_many renders each (template, tag) pair as render() would"""
+    test_image = str(pathlib.Path(getcwd()) / TEST_IMAGE)
+    exiftool = FakeExifTool(EXIFDICT)
+    templates = [
+        ("{TAG}: {VALUE}", "Make"),
+        ("{GROUP}:{TAG}={VALUE}", "IPTC:Keywords"),
+        ("{created.year}-{modified.month}", None),
+        ("{Foo}", None),
+        ("{VALUE}", "XMP:Description"),
+    ]
+    t = PhotoTemplate(test_image)
+    rendered = t.render_many(
+        templates, RenderOptions(exiftool=exiftool, filepath=test_image)
+    )
+    expected = [
+        PhotoTemplate(test_image).render(
+            template,
+            RenderOptions(tag=tag, exiftool=exiftool, filepath=test_image),
+        )[0]
+        for template, tag in templates
+    ]
+    assert rendered == expected
+    assert rendered[0] == ["Make: Apple"]
+    assert rendered[2] == ["2021-August"]
+
+
+def test_phototemplate_render_many_error():
+    """Test render_many reports the template that could not be rendered"""
+    test_image = str(pathlib.Path(getcwd()) / TEST_IMAGE)
+    t = PhotoTemplate(test_image)
+    options = RenderOptions(exiftool=FakeExifTool(EXIFDICT), filepath=test_image)
+    with pytest.raises(ValueError, match="for template '{Make.foo}'"):
+        t.render_many([("{Make}", None), ("{Make.foo}", None)], options)
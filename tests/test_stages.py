@@ -0,0 +1,73 @@
+"""Test StagedPipeline"""
+
+import threading
+
+import pytest
+
+from exif2findertags.exiftool import ExifToolCaching
+from exif2findertags.stages import StagedPipeline
+
+
+class FakeExifToFinder:
+    """Stand-in for ExifToFinder that records the files rendered and written"""
+
+    exiftool_path = None
+    read_args = None
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.written = []
+        self._lock = threading.Lock()
+
+    def unprocessed_files(self, filenames):
+        return list(filenames)
+
+    def render_file(self, filename):
+        if filename == self.fail_on:
+            raise ValueError(f"Invalid template for {filename}")
+        return f"rendered {filename}"
+
+    def write_file(self, filename, rendered):
+        assert rendered == f"rendered {filename}"
+        with self._lock:
+            self.written.append(filename)
+        return filename % 2
+
+
+@pytest.fixture
+def prefetched(monkeypatch):
+    """replace ExifToolCaching.prefetch so no exiftool is needed; returns list of batches read"""
+    batches = []
+    monkeypatch.setattr(
+        ExifToolCaching,
+        "prefetch",
+        lambda filepaths, exiftool=None, read_args=None: batches.append(filepaths),
+    )
+    return batches
+
+
+def test_staged_pipeline(prefetched):
+    """test StagedPipeline reads, renders, and writes every file"""
+    e2f = FakeExifToFinder()
+    pipeline = StagedPipeline(e2f, read_workers=2, render_workers=3, write_workers=2)
+    assert pipeline.run(iter(range(25)), batch_size=4) == 12
+    assert sorted(e2f.written) == list(range(25))
+    assert sorted(len(batch) for batch in prefetched) == [1, 4, 4, 4, 4, 4, 4]
+    assert [stats.name for stats in pipeline.stats] == ["read", "render", "write"]
+    assert all(stats.files == 25 for stats in pipeline.stats)
+
+
+def test_staged_pipeline_error(prefetched):
+    """test StagedPipeline stops and raises the error when a stage fails"""
+    e2f = FakeExifToFinder(fail_on=5)
+    pipeline = StagedPipeline(e2f, queue_size=1)
+    with pytest.raises(ValueError, match="Invalid template for 5"):
+        pipeline.run(iter(range(1000)), batch_size=2)
+    assert 5 not in e2f.written
+    assert len(e2f.written) < 1000
+
+
+def test_staged_pipeline_workers():
+    """test StagedPipeline requires at least one worker per stage"""
+    with pytest.raises(ValueError):
+        StagedPipeline(FakeExifToFinder(), render_workers=0)
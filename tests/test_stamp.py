@@ -0,0 +1,30 @@
+"""Test processing stamps"""
+
+import os
+import pathlib
+from shutil import copy2, copyfile
+
+from exif2findertags.stamp import is_stamped, read_stamp, write_stamp
+
+TEST_IMAGE = "tests/apples.jpeg"
+
+
+def test_stamp(tmp_path):
+    """test write_stamp and is_stamped"""
+    image = copyfile(TEST_IMAGE, tmp_path / pathlib.Path(TEST_IMAGE).name)
+    assert read_stamp(image) is None
+    assert not is_stamped(image, "config1")
+
+    write_stamp(image, "config1")
+    assert read_stamp(image)["config"] == "config1"
+    assert is_stamped(image, "config1")
+    assert not is_stamped(image, "config2")
+
+    # stamp is copied with the file
+    copy = copy2(image, tmp_path / "copy.jpeg")
+    assert is_stamped(copy, "config1")
+
+    # changed file is not stamped
+    stat = os.stat(image)
+    os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert not is_stamped(image, "config1")
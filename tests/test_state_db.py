@@ -0,0 +1,48 @@
+"""Test ProcessedFilesDB"""
+
+import os
+import pathlib
+from shutil import copyfile
+
+from exif2findertags.state_db import ProcessedFilesDB, config_hash
+
+TEST_IMAGE = "tests/apples.jpeg"
+TEST_VIDEO = "tests/Jellyfish.mov"
+
+
+def test_config_hash():
+    """test config_hash is stable and changes with the configuration"""
+    config = {"tags": ["Make"], "tag_template": None}
+    assert config_hash(config) == config_hash(dict(reversed(list(config.items()))))
+    assert config_hash(config) != config_hash({"tags": ["Make", "ISO"]})
+
+
+def test_processed_files_db(tmp_path):
+    """test ProcessedFilesDB skips unchanged files processed with the same configuration"""
+    image = copyfile(TEST_IMAGE, tmp_path / pathlib.Path(TEST_IMAGE).name)
+    video = copyfile(TEST_VIDEO, tmp_path / pathlib.Path(TEST_VIDEO).name)
+    dbpath = tmp_path / "state.db"
+
+    db = ProcessedFilesDB(dbpath, "config1")
+    assert db.unprocessed([image, video]) == [image, video]
+    db.record(image)
+    db.record(video)
+    db.close()
+
+    # state persists between runs
+    db = ProcessedFilesDB(dbpath, "config1")
+    assert db.unprocessed([image, video, tmp_path / "missing.jpeg"]) == [
+        tmp_path / "missing.jpeg"
+    ]
+    assert db.stats() == {"entries": 2, "skipped": 2, "recorded": 0}
+
+    # changed file is processed again
+    stat = os.stat(image)
+    os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert db.unprocessed([image, video]) == [image]
+    db.close()
+
+    # changed configuration invalidates all files
+    db = ProcessedFilesDB(dbpath, "config2")
+    assert db.unprocessed([image, video]) == [image, video]
+    db.close()
@@ -0,0 +1,53 @@
+"""Test tag_planner"""
+
+import pytest
+
+from exif2findertags.phototemplate import CREATED_DATE_TAGS
+from exif2findertags.tag_planner import plan_read_args
+
+
+def test_plan_read_args_tags():
+    """Test plan_read_args with --tag, --tag-value, --fc, --fc-value, --tag-group"""
+    read_args = plan_read_args(
+        tags=["Keywords", "ISO"],
+        tag_values=["IPTC:Keywords"],
+        fc_tags=["iso"],
+        fc_tag_values=["Make"],
+        tag_groups=["EXIF"],
+    )
+    assert read_args == ["-Keywords", "-ISO", "-IPTC:Keywords", "-Make", "-EXIF:all"]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"all_tags": True},
+        {"tags": ["Make"], "tag_match": ["Exposure"]},
+        {"templates": ["{VALUE}"]},
+        {"tags": ["Keywords=Foo"]},
+        {"templates": ["{Make"]},
+    ],
+)
+def test_plan_read_args_full_read(kwargs):
+    """Test plan_read_args falls back to reading all tags"""
+    assert plan_read_args(**kwargs) is None
+
+
+def test_plan_read_args_templates():
+    """Test plan_read_args with templates"""
+    read_args = plan_read_args(
+        format_templates=["{GROUP}-{TAG}={VALUE|lower}"],
+        templates=[
+            "Camera: {Make|titlecase}{comma} {EXIF:Model}",
+            "{ISO contains 20?{XMP:Title},{IPTC:Keywords}}",
+            "{created.year}",
+        ],
+    )
+    assert read_args == [
+        "-Make",
+        "-EXIF:Model",
+        "-ISO",
+        "-XMP:Title",
+        "-IPTC:Keywords",
+        *[f"-{tag}" for tag in CREATED_DATE_TAGS],
+    ]
@@ -0,0 +1,142 @@
+"""Test parse_template produces the same model as the textX parser"""
+
+import dataclasses
+import random
+
+import pytest
+from textx import TextXSyntaxError
+
+from exif2findertags.phototemplate import PhotoTemplateParser
+from exif2findertags.template_parser import parse_template
+
+TEMPLATES = [
+    "",
+    "abc",
+    "{Make}",
+    "{EXIF:Make}",
+    "a{b}c{d}e",
+    "{Make}{Model}",
+    "Keyword={IPTC:Keywords}",
+    "{+Keywords}",
+    "{,+Keywords}",
+    "{; +Keywords|lower}",
+    "{a+b+c}",
+    "{Make,a+b}",
+    "{Make|}",
+    "{Make|lower|upper}",
+    "{x|lower:foo|bar}",
+    "{Make||lower}",
+    "{Make[]}",
+    "{Make[,x]}",
+    "{Make[a,b|c,]}",
+    "{x[a,b,c|d,e]}",
+    "{Keywords|lower[fruit,x|a,b]}",
+    "{Make[a,b}",
+    "{Make?}",
+    "{Make,}",
+    "{Make?,x}",
+    "{Make?yes,no}",
+    "{Foo,a,b}",
+    "{Foo,{Make}}",
+    "{Foo,{Make}{Model}x}",
+    "a{b,c{d}e}f",
+    "{a:}",
+    "{a:b\\ c}",
+    "{a:b:c}",
+    "{detected_text:0.5}",
+    "{created.strftime,%Y-%m-%d}",
+    "{filepath.stem|upper}",
+    "{Make contains Fru?yes,no}",
+    "{Make not contains Fru?yes,no}",
+    "{Make not == a}",
+    "{Make == ?yes}",
+    "{Make ==  x}",
+    "{Make  contains x}",
+    "{Make == {Model}}",
+    "{ISO <= 100?low,high}",
+    "{ISO < 100?low,high}",
+    "{ISO >= 100}",
+    "{Make startswith A|B?yes}",
+    "{Make endswith e}",
+    "{Make matches Apple}",
+    "{Make != Apple}",
+    "{Make not x}",
+    "{Make }",
+    "a,b",
+    "?",
+    "}",
+    "{",
+    "{Make}}",
+    "{{Make}}",
+    "{GROUP} - {TAG} = {VALUE}",
+    "{strip, {Make} }",
+    "{comma}{newline}{openbrace}",
+    "Camera: {Make|titlecase}{comma} {Model|titlecase}",
+    "{Title}{newline}{ImageDescription}",
+    "café {Make|lower} ’{Model}’",
+]
+
+# characters used to generate random templates that exercise the grammar
+FUZZ_TOKENS = list("{}|,?[]+: .aB1\\-%") + [
+    "{",
+    "}",
+    "Make",
+    "not ",
+    " contains ",
+    " == ",
+    " < ",
+    "<=",
+]
+
+
+def dump(model):
+    """Return model as nested tuples of (class name, attributes) for comparison"""
+    if isinstance(model, list):
+        return [dump(item) for item in model]
+    if hasattr(model, "_tx_attrs"):
+        return (
+            type(model).__name__,
+            {name: dump(getattr(model, name)) for name in model._tx_attrs},
+        )
+    if dataclasses.is_dataclass(model):
+        return (
+            type(model).__name__,
+            {
+                field.name: dump(getattr(model, field.name))
+                for field in dataclasses.fields(model)
+            },
+        )
+    return model
+
+
+def parse_both(template):
+    """Return (textX model, parse_template model) for template, or the exceptions they raise"""
+    results = []
+    for parse in (PhotoTemplateParser().parse_textx, parse_template):
+        try:
+            results.append(dump(parse(template)))
+        except TextXSyntaxError:
+            results.append(TextXSyntaxError)
+    return results
+
+
+@pytest.mark.parametrize("template", TEMPLATES)
+def test_parse_template(template):
+    """test parse_template returns the same model as textX or fails the same way"""
+    textx_model, model = parse_both(template)
+    assert model == textx_model
+
+
+def test_parse_template_fuzz():
+    """test parse_template and textX agree on random templates"""
+    rng = random.Random(42)
+    for _ in range(3000):
+        template = "".join(rng.choices(FUZZ_TOKENS, k=rng.randint(1, 12)))
+        textx_model, model = parse_both(template)
+        assert model == textx_model, template
+
+
+def test_parse_template_syntax_error():
+    """test PhotoTemplateParser reports syntax errors from textX"""
+    with pytest.raises(ValueError, match="Expected"):
+        PhotoTemplateParser().validate("{Make")
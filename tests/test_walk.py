@@ -0,0 +1,120 @@
+"""Test walk_files"""
+
+import os
+import pathlib
+
+from exif2findertags.file_filter import FileFilter
+from exif2findertags.shard import Shard
+from exif2findertags.walk import walk_files
+
+
+def _make_tree(root):
+    """create test directory tree in root"""
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "c").mkdir()
+    for path in ["1.jpeg", "a/2.jpeg", "a/b/3.jpeg", "c/4.mov"]:
+        (root / path).write_bytes(b"")
+
+
+def test_walk_files(tmp_path):
+    """test walk_files yields each file once"""
+    _make_tree(tmp_path)
+    directories = []
+    files = list(walk_files(tmp_path, on_directory=directories.append))
+    assert all(isinstance(f, pathlib.Path) for f in files)
+    assert sorted(str(f.relative_to(tmp_path)) for f in files) == [
+        "1.jpeg",
+        "a/2.jpeg",
+        "a/b/3.jpeg",
+        "c/4.mov",
+    ]
+    assert sorted(directories) == [
+        str(tmp_path / "a"),
+        str(tmp_path / "a" / "b"),
+        str(tmp_path / "c"),
+    ]
+
+
+def test_walk_files_links(tmp_path):
+    """test walk_files with hard links, symlinks and symlink loops"""
+    _make_tree(tmp_path)
+    os.link(tmp_path / "1.jpeg", tmp_path / "c" / "hardlink.jpeg")
+    os.symlink(tmp_path / "a" / "2.jpeg", tmp_path / "c" / "symlink.jpeg")
+    os.symlink(tmp_path, tmp_path / "a" / "b" / "loop")
+    os.symlink(tmp_path / "does_not_exist", tmp_path / "broken")
+    files = list(walk_files(tmp_path))
+    assert len(files) == 4
+    assert len({os.stat(f).st_ino for f in files}) == 4
+
+
+def test_walk_files_seen(tmp_path):
+    """test walk_files with seen shared between calls"""
+    _make_tree(tmp_path)
+    seen = set()
+    assert len(list(walk_files(tmp_path / "a", seen=seen))) == 2
+    assert len(list(walk_files(tmp_path, seen=seen))) == 2
+    assert list(walk_files(tmp_path / "c", seen=seen)) == []
+
+
+def test_walk_files_sort(tmp_path):
+    """test walk_files with sort=True yields files in order of name"""
+    for name in ["b", "a", "c"]:
+        (tmp_path / name).mkdir()
+        for filename in ["2.jpeg", "1.jpeg"]:
+            (tmp_path / name / filename).write_bytes(b"")
+    (tmp_path / "0.jpeg").write_bytes(b"")
+    files = [str(f.relative_to(tmp_path)) for f in walk_files(tmp_path, sort=True)]
+    assert files == [
+        "0.jpeg",
+        "a/1.jpeg",
+        "a/2.jpeg",
+        "b/1.jpeg",
+        "b/2.jpeg",
+        "c/1.jpeg",
+        "c/2.jpeg",
+    ]
+
+
+def test_walk_files_shard(tmp_path):
+    """test walk_files with shards covers each file exactly once"""
+    _make_tree(tmp_path)
+    for i in range(20):
+        (tmp_path / "c" / f"{i}.jpeg").write_bytes(b"")
+    shards = [Shard(i, 3) for i in range(1, 4)]
+    files = [f for shard in shards for f in walk_files(tmp_path, shard=shard)]
+    assert sorted(files) == sorted(walk_files(tmp_path))
+    assert all(shard.found == 24 for shard in shards)
+    assert sum(shard.assigned for shard in shards) == 24
+
+
+def test_walk_files_shard_filter(tmp_path):
+    """test walk_files only passes files in the shard to file_filter"""
+    _make_tree(tmp_path)
+    for i in range(20):
+        (tmp_path / "c" / f"{i}.txt").write_bytes(b"")
+    file_filters = [FileFilter(exclude_ext=["txt"]) for _ in range(3)]
+    files = [
+        f
+        for index, file_filter in enumerate(file_filters, 1)
+        for f in walk_files(tmp_path, shard=Shard(index, 3), file_filter=file_filter)
+    ]
+    assert sorted(files) == sorted(
+        walk_files(tmp_path, file_filter=FileFilter(exclude_ext=["txt"]))
+    )
+    # each file is checked by the file filter of one shard only
+    assert sum(file_filter.rejected for file_filter in file_filters) == 20
+
+
+def test_walk_files_shard_relative(tmp_path):
+    """test shard of a file depends only on its path relative to top"""
+    for root in ["x", "y/z"]:
+        (tmp_path / root).mkdir(parents=True)
+        _make_tree(tmp_path / root)
+    for index in range(1, 4):
+        assert [
+            f.relative_to(tmp_path / "x")
+            for f in walk_files(tmp_path / "x", shard=Shard(index, 3), sort=True)
+        ] == [
+            f.relative_to(tmp_path / "y" / "z")
+            for f in walk_files(tmp_path / "y" / "z", shard=Shard(index, 3), sort=True)
+        ]
@@ -0,0 +1,114 @@
+"""Test watching directories for new files"""
+
+import threading
+import time
+
+import pytest
+
+from exif2findertags.file_filter import FileFilter
+from exif2findertags.shard import Shard
+from exif2findertags.watch import Debouncer, inotify_available, watch_directories
+
+
+def _watch_for(tmp_path, polling, actions, **kwargs):
+    """watch_directories on tmp_path, running actions in a thread, and return sorted names of the files reported"""
+    stop = threading.Event()
+    found = []
+
+    def _run_actions():
+        time.sleep(0.2)
+        for action in actions:
+            action()
+            time.sleep(0.1)
+        time.sleep(1.5)
+        stop.set()
+
+    thread = threading.Thread(target=_run_actions)
+    thread.start()
+    for batch in watch_directories(
+        [tmp_path], settle_time=0.3, poll_interval=0.1, polling=polling, stop=stop, **kwargs
+    ):
+        found.extend(batch)
+    thread.join()
+    return sorted(path.relative_to(tmp_path).as_posix() for path in found)
+
+
+@pytest.mark.parametrize(
+    "polling",
+    [
+        True,
+        pytest.param(
+            False,
+            marks=pytest.mark.skipif(
+                not inotify_available(), reason="inotify not available"
+            ),
+        ),
+    ],
+)
+def test_watch(tmp_path, polling):
+    """test watch_directories reports new and changed files once they stop changing"""
+    (tmp_path / "existing.jpeg").write_bytes(b"old")
+    (tmp_path / "unchanged.jpeg").write_bytes(b"old")
+
+    def _make_subdir():
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "2.jpeg").write_bytes(b"new")
+
+    found = _watch_for(
+        tmp_path,
+        polling,
+        [
+            lambda: (tmp_path / "1.jpeg").write_bytes(b"new"),
+            lambda: (tmp_path / "existing.jpeg").write_bytes(b"changed"),
+            lambda: (tmp_path / "notes.txt").write_bytes(b"new"),
+            _make_subdir,
+        ],
+        file_filter=FileFilter(exclude_ext=["txt"]),
+    )
+    assert found == ["1.jpeg", "existing.jpeg", "sub/2.jpeg"]
+
+
+@pytest.mark.parametrize(
+    "polling",
+    [
+        True,
+        pytest.param(
+            False,
+            marks=pytest.mark.skipif(
+                not inotify_available(), reason="inotify not available"
+            ),
+        ),
+    ],
+)
+def test_watch_shard(tmp_path, polling):
+    """test watch_directories only reports files in the shard, as walk_files does"""
+    names = [f"{i}.jpeg" for i in range(6)]
+    shards = [Shard(index, 2) for index in (1, 2)]
+    expected = [
+        sorted(name for name in names if shard.contains(name)) for shard in shards
+    ]
+    for shard, shard_names in zip(shards, expected):
+        # each shard gets its own directory so files are new to each watch
+        shard_path = tmp_path / str(shard.index)
+        shard_path.mkdir()
+        actions = [
+            lambda path=shard_path / name: path.write_bytes(b"new") for name in names
+        ]
+        assert _watch_for(shard_path, polling, actions, shard=shard) == shard_names
+    assert sorted(expected[0] + expected[1]) == sorted(names)
+
+
+def test_debouncer(tmp_path):
+    """test Debouncer holds files until they stop changing"""
+    path = tmp_path / "1.jpeg"
+    path.write_bytes(b"1")
+    debouncer = Debouncer(settle_time=0.2)
+    debouncer.add([path, tmp_path / "missing.jpeg"])
+    assert len(debouncer) == 1
+    assert debouncer.ready() == []
+    time.sleep(0.1)
+    path.write_bytes(b"12")
+    assert debouncer.ready() == []
+    time.sleep(0.25)
+    assert debouncer.ready() == [path]
+    assert len(debouncer) == 0
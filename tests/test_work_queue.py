@@ -0,0 +1,160 @@
+"""Test WorkQueue"""
+
+import multiprocessing
+import time
+
+import pytest
+
+from exif2findertags.exiftool import ExifToolCaching
+from exif2findertags.work_queue import MAX_ATTEMPTS, WorkQueue, process_queue
+
+
+class FakeExifToFinder:
+    """Stand-in for ExifToFinder that records the files processed"""
+
+    exiftool_path = None
+    read_args = None
+
+    def __init__(self, fail_on=None, skip=None):
+        self.fail_on = fail_on
+        self.skip = skip
+        self.processed = []
+
+    def verbose(self, *args):
+        pass
+
+    def unprocessed_files(self, filenames):
+        return [filename for filename in filenames if filename != self.skip]
+
+    def process_file(self, filename):
+        if filename == self.fail_on:
+            raise ValueError(f"Invalid template for {filename}")
+        self.processed.append(filename)
+        return 1
+
+
+@pytest.fixture
+def prefetched(monkeypatch):
+    """replace ExifToolCaching.prefetch so no exiftool is needed"""
+    monkeypatch.setattr(
+        ExifToolCaching,
+        "prefetch",
+        lambda filepaths, exiftool=None, read_args=None: None,
+    )
+
+
+def test_work_queue_lease(tmp_path):
+    """test files are leased by one worker at a time and leased again after the lease expires"""
+    queue = WorkQueue(tmp_path / "queue.db")
+    assert queue.publish(["/a", "/b", "/c"]) == 3
+    assert queue.publish(["/a", "/d"]) == 1
+
+    first = queue.lease("worker1", 3, lease_time=60)
+    assert [path for _, path in first] == ["/a", "/b", "/c"]
+    second = queue.lease("worker2", 3, lease_time=0.01)
+    assert [path for _, path in second] == ["/d"]
+    assert queue.lease("worker3", 3) == []
+
+    # worker2 died; its lease expires and the file is leased by worker3
+    time.sleep(0.05)
+    assert queue.lease("worker3", 3) == second
+
+    queue.ack([item_id for item_id, _ in first[:2]])
+    queue.fail(first[2][0], "bad file")
+    assert queue.stats() == {"pending": 0, "leased": 1, "done": 2, "failed": 1}
+    assert queue.failures() == [("/c", "bad file")]
+    assert queue.outstanding() == 1
+    queue.close()
+
+
+def test_work_queue_renew(tmp_path):
+    """test renewing a lease stops the files being leased by another worker"""
+    queue = WorkQueue(tmp_path / "queue.db")
+    queue.publish(["/a"])
+    items = queue.lease("worker1", 1, lease_time=0.01)
+    queue.renew("worker1", [item_id for item_id, _ in items], lease_time=60)
+    time.sleep(0.05)
+    assert queue.lease("worker2", 1) == []
+    queue.close()
+
+
+def test_work_queue_max_attempts(tmp_path):
+    """test a file whose lease keeps expiring is marked failed"""
+    queue = WorkQueue(tmp_path / "queue.db")
+    queue.publish(["/a"])
+    for attempt in range(MAX_ATTEMPTS):
+        assert queue.lease(f"worker{attempt}", 1, lease_time=0.01)
+        time.sleep(0.05)
+    assert queue.lease("worker", 1) == []
+    assert queue.failures() == [("/a", "lease expired too many times")]
+    queue.close()
+
+
+def test_work_queue_publishing(tmp_path):
+    """test workers see whether the coordinator is still adding files"""
+    queue = WorkQueue(tmp_path / "queue.db")
+    assert queue.publishing
+    queue.start_publishing()
+    worker_queue = WorkQueue(tmp_path / "queue.db")
+    assert worker_queue.publishing
+    queue.finish_publishing()
+    assert not worker_queue.publishing
+    worker_queue.close()
+    queue.close()
+
+
+def test_process_queue(tmp_path, prefetched):
+    """test process_queue processes every file and acks or fails it"""
+    queue = WorkQueue(tmp_path / "queue.db")
+    queue.publish([f"/{i}.jpeg" for i in range(10)])
+    queue.finish_publishing()
+    e2f = FakeExifToFinder(fail_on="/3.jpeg", skip="/4.jpeg")
+    errors = []
+    files_updated = process_queue(
+        e2f,
+        queue,
+        batch_size=3,
+        on_error=lambda filename, error: errors.append(filename),
+    )
+    assert files_updated == 8
+    assert sorted(e2f.processed) == sorted(
+        f"/{i}.jpeg" for i in range(10) if i not in (3, 4)
+    )
+    assert errors == ["/3.jpeg"]
+    assert queue.stats() == {"pending": 0, "leased": 0, "done": 9, "failed": 1}
+    queue.close()
+
+
+def _drain(dbpath, owner, results):
+    """lease and ack files until the queue is empty, recording each file leased"""
+    queue = WorkQueue(dbpath)
+    while items := queue.lease(owner, 5):
+        results.extend([(owner, path) for _, path in items])
+        queue.ack(item_id for item_id, _ in items)
+    queue.close()
+
+
+def test_work_queue_processes(tmp_path):
+    """test several worker processes sharing a queue each lease different files"""
+    dbpath = str(tmp_path / "queue.db")
+    queue = WorkQueue(dbpath)
+    queue.publish(f"/{i}.jpeg" for i in range(500))
+    queue.finish_publishing()
+
+    with multiprocessing.Manager() as manager:
+        results = manager.list()
+        workers = [
+            multiprocessing.Process(target=_drain, args=(dbpath, f"worker{i}", results))
+            for i in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        results = list(results)
+
+    assert sorted(path for _, path in results) == sorted(
+        f"/{i}.jpeg" for i in range(500)
+    )
+    assert queue.stats()["done"] == 500
+    queue.close()